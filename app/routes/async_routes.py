@@ -0,0 +1,231 @@
+# === File: app/routes/async_routes.py ===
+# Native asyncio routes for the LLM-bound endpoints.
+# These are mounted in asgi.py ahead of the Flask app, so LLM calls are awaited on the
+# shared AsyncOpenAI client instead of holding a WSGI thread for the whole completion.
+
+import os
+import logging
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.templating import Jinja2Templates
+
+from app.services.seo_generator import run_seo_agent_async, stream_seo_agent_async
+from app.services.marketing_agent import generate_marketing_post_async
+from app.services.google_docs import create_google_doc
+from app.services.agentic_rag import agentic_rag_with_usage_async
+from app.services.rag_pipeline import classic_rag_async, agentic_rag_async as agentic_rag_ui_async
+from app.services.content_agent import agentic_content_generator_async
+from app.utils.sse import sse_event, wants_stream
+from app.services.job_queue import submit_job, wants_background
+from app.routes.jobs import job_accepted
+from app.utils.artifacts import STATIC_MAX_AGE, serve_artifact
+from app.utils.file_writer import OUTPUT_DIR
+from app.utils.output_catalog import get_output_catalog, logical_name
+
+STATIC_ROOT = os.path.realpath("static")
+OUTPUTS_ROOT = os.path.realpath(OUTPUT_DIR)
+
+templates = Jinja2Templates(directory="templates")
+
+
+def _read_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def run_agent(request):
+    """
+    Endpoint to run the SEO agent.
+    - GET: Returns a readiness message.
+    - POST: Expects a JSON payload and runs the SEO agent.
+      With {"stream": true} or ?stream=1 the article is streamed as Server-Sent Events.
+      With {"async": true} or ?async=1 it runs as a background job (202 with the job id).
+    """
+    try:
+        if request.method == "POST":
+            try:
+                payload = await request.json()
+            except ValueError:
+                payload = None
+            if payload is None:
+                return JSONResponse({"error": "Missing or invalid JSON payload"}, status_code=400)
+            if wants_background(payload, request.query_params):
+                job_id = await run_in_threadpool(submit_job, "seo_article", payload)
+                if isinstance(job_id, dict):
+                    return JSONResponse(job_id, status_code=400)
+                return JSONResponse(job_accepted(job_id), status_code=202)
+            if wants_stream(payload, request.query_params):
+                async def events():
+                    async for event, data in stream_seo_agent_async(payload):
+                        yield sse_event(event, data)
+                return StreamingResponse(
+                    events(),
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
+            result = await run_seo_agent_async(payload)
+            file_content = ""
+            if "filename" in result:
+                try:
+                    file_content = await run_in_threadpool(_read_file, result["filename"])
+                except Exception as file_err:
+                    file_content = f"Could not read file: {file_err}"
+            return JSONResponse({**result, "file_content": file_content}, status_code=200)
+        return JSONResponse({"message": "Agent is ready. Send a POST request with JSON payload to run."}, status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def rag_endpoint(request):
+    """
+    RAG endpoint: Given a query, retrieve relevant docs and generate an answer.
+    Expects JSON: { "query": "your question" } (or a form with rag_query)
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if data:
+        query = data.get("query")
+    else:
+        form = await request.form()
+        query = form.get("rag_query")
+    if not query:
+        return JSONResponse({"error": "Missing query"}, status_code=400)
+
+    answer, usage = await agentic_rag_with_usage_async(query)
+    return JSONResponse({"answer": answer, "context_tokens": usage["context_tokens"], "retrieval": usage["retrieval"], "cached": usage["cached"]})
+
+
+async def rag_ui(request):
+    rag_answer = None
+    retrieved_files = []
+    context_tokens = None
+    if request.method == "POST":
+        form = await request.form()
+        use_agentic = form.get("use_agentic") == "on"
+        query = form.get("rag_query")
+        if use_agentic:
+            rag_answer = await agentic_rag_ui_async(query)
+        else:
+            rag_answer, retrieved_files, context_stats = await classic_rag_async(query)
+            context_tokens = context_stats["tokens"]
+    return templates.TemplateResponse(
+        request, "rag.html",
+        {"rag_answer": rag_answer, "retrieved_files": retrieved_files, "context_tokens": context_tokens}
+    )
+
+
+async def content_generator(request):
+    output = None
+    download_url = None
+    agent_steps = None
+
+    if request.method == "POST":
+        form = await request.form()
+        use_agentic = form.get("use_agentic") == "on"
+        payload = {
+            "agent": "seo_generator",
+            "no_cache": form.get("no_cache") == "on",
+            "input": {
+                "topic": form.get("topic"),
+                "style": form.get("style"),
+                "length": form.get("length"),
+                "FAQ'S": form.get("faqs"),
+                "LIMIT": form.get("limit"),
+                "EXISTING DATA TO BE USED ": form.get("context")
+            }
+        }
+        if wants_background(None, request.query_params):
+            job_id = await run_in_threadpool(submit_job, "content_generator", {**payload, "use_agentic": use_agentic})
+            if isinstance(job_id, dict):
+                return JSONResponse(job_id, status_code=400)
+            return JSONResponse(job_accepted(job_id), status_code=202)
+        try:
+            if use_agentic:
+                agent_result = await agentic_content_generator_async(payload)
+                output = agent_result["content"]
+                agent_steps = agent_result["steps"]
+            else:
+                result = await run_seo_agent_async(payload)
+                output = result["content"].replace("[Company Name]", "WB White Insurance")
+                download_url = result.get("download_url")
+        except Exception as e:
+            output = f"Exception: {e}"
+
+    return templates.TemplateResponse(
+        request, "index.html", {"output": output, "download_url": download_url, "agent_steps": agent_steps}
+    )
+
+
+async def marketing_post(request):
+    post = None
+    doc_url = None
+    error = None
+
+    if request.method == "POST":
+        form = await request.form()
+        topic = form.get("topic")
+        style = form.get("style", "Engaging")
+        length = form.get("length", "Short")
+        if wants_background(None, request.query_params):
+            job_id = await run_in_threadpool(submit_job, "marketing_post", {
+                "topic": topic, "style": style, "length": length, "no_cache": form.get("no_cache") == "on"
+            })
+            if isinstance(job_id, dict):
+                return JSONResponse(job_id, status_code=400)
+            return JSONResponse(job_accepted(job_id), status_code=202)
+        post = await generate_marketing_post_async(topic, style, length, no_cache=form.get("no_cache") == "on")
+        try:
+            # The Google API client is blocking, so it runs on the thread pool
+            doc_url = await run_in_threadpool(create_google_doc, f"WB WHITE INSURANCE - {topic}", post)
+        except Exception as e:
+            logging.error(f"Google Docs error: {e}")
+            error = f"Google Docs error: {e}"
+
+    return templates.TemplateResponse(
+        request, "marketing_post.html", {"post": post, "doc_url": doc_url, "error": error}
+    )
+
+
+async def download_file(request):
+    """
+    Download a generated output by filename (resolved through the output catalog).
+    Supports If-None-Match (304), Range requests and compressed storage.
+    """
+    filename = request.path_params["filename"]
+    # Catalog scan and artifact stat/etag lookups touch the disk: thread pool
+    file_path = await run_in_threadpool(get_output_catalog(OUTPUT_DIR).resolve, filename)
+    if file_path is None:
+        return JSONResponse({"error": f"File not found: {filename}"}, status_code=404)
+    response = await run_in_threadpool(serve_artifact, request, file_path, attachment_name=logical_name(file_path))
+    if response.status_code == 404:
+        return JSONResponse({"error": f"File not found: {filename}"}, status_code=404)
+    return response
+
+
+async def static_file(request):
+    """
+    Serves files under static/ (replaces the StaticFiles mount): precompressed
+    variants, ETag/304 and Range. Generated outputs revalidate on every request.
+    """
+    full_path = os.path.realpath(os.path.join(STATIC_ROOT, request.path_params["path"]))
+    if not full_path.startswith(STATIC_ROOT + os.sep):
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    if full_path.startswith(OUTPUTS_ROOT + os.sep):
+        cache_control = "no-cache"
+    else:
+        cache_control = f"public, max-age={STATIC_MAX_AGE}"
+    return await run_in_threadpool(serve_artifact, request, full_path, cache_control=cache_control)
+
+
+routes = [
+    Route("/run-agent", run_agent, methods=["GET", "POST"]),
+    Route("/rag", rag_endpoint, methods=["POST"]),
+    Route("/rag-ui", rag_ui, methods=["GET", "POST"]),
+    Route("/content-generator", content_generator, methods=["GET", "POST"]),
+    Route("/marketing-post", marketing_post, methods=["GET", "POST"]),
+    Route("/download/{filename}", download_file, methods=["GET", "HEAD"]),
+    Route("/static/{path:path}", static_file, methods=["GET", "HEAD"], name="static"),
+]
@@ -0,0 +1,82 @@
+# === File: app/routes/embeddings.py ===
+# Maintenance endpoints for the embeddings store: delete, update, consistency check, rebuild
+
+from flask import Blueprint, request, jsonify
+from app.services.ann_index import INDEX_KINDS
+from app.services.embedding_store import check_index, delete_embeddings, get_store, update_embeddings
+from app.services.job_queue import submit_job
+from app.routes.jobs import job_accepted
+
+embeddings_bp = Blueprint("embeddings", __name__)
+
+
+@embeddings_bp.route("/embeddings", methods=["GET"])
+def embeddings_info():
+    """Index type, vector counts and pending WAL rows/removals."""
+    store = get_store()
+    if not store.exists():
+        return jsonify({"error": "No embeddings index found."}), 404
+    return jsonify(store.describe()), 200
+
+
+@embeddings_bp.route("/embeddings", methods=["DELETE"])
+def delete_embeddings_endpoint():
+    """
+    Removes vectors and their metadata from the index.
+    Expects JSON: {"file": "path"} | {"topic": "topic"} | {"ids": [1, 2, 3]}
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        return jsonify({"error": "'ids' must be a list of integers"}), 400
+    if not (data.get("file") or data.get("topic") or ids is not None):
+        return jsonify({"error": "Missing 'file', 'topic' or 'ids' in request"}), 400
+    result = delete_embeddings(data.get("file"), data.get("topic"), ids)
+    if "error" in result:
+        return jsonify(result), 404 if result["error"] == "No embeddings index found." else 500
+    return jsonify(result), 200
+
+
+@embeddings_bp.route("/embeddings", methods=["PUT"])
+def update_embeddings_endpoint():
+    """
+    Re-embeds a file, replacing its stored vectors.
+    Expects JSON: {"file": "path"} or {"topic": "topic"} (latest file of the topic)
+    """
+    data = request.get_json(silent=True) or {}
+    if not (data.get("file") or data.get("topic")):
+        return jsonify({"error": "Missing 'file' or 'topic' in request"}), 400
+    result = update_embeddings(data.get("file"), data.get("topic"))
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result), 200
+
+
+@embeddings_bp.route("/embeddings/check", methods=["GET", "POST"])
+def check_embeddings():
+    """
+    Consistency report of the index against the metadata and the files on disk.
+    POST with {"fix": true} also removes orphan vectors, dangling metadata and the
+    entries of files missing on disk.
+    """
+    fix = request.method == "POST" and bool((request.get_json(silent=True) or {}).get("fix"))
+    report = check_index(fix=fix)
+    if "error" in report:
+        return jsonify(report), 404
+    return jsonify(report), 200
+
+
+@embeddings_bp.route("/embeddings/rebuild", methods=["POST"])
+def rebuild_embeddings():
+    """
+    Queues an online rebuild of the index (searches keep running on the current one
+    until the new one is swapped in). Optional JSON: {"kind": "flat" | "hnsw" | "ivfpq" | "auto"}.
+    Returns 202 with the job id; poll /jobs/<job_id> for the result.
+    """
+    kind = (request.get_json(silent=True) or {}).get("kind") or "auto"
+    if kind not in INDEX_KINDS + ("auto",):
+        return jsonify({"error": f"Unknown index type '{kind}'"}), 400
+    job_id = submit_job("reindex", {"kind": kind})
+    if isinstance(job_id, dict):
+        return jsonify(job_id), 400
+    return jsonify(job_accepted(job_id)), 202
@@ -1,9 +1,19 @@
 # === File: app/routes/health.py ===
 # Health check route to confirm server is running
 from flask import Blueprint
+from app.services.generation_cache import cache_stats
+from app.services.answer_cache import answer_cache_stats
 
 health_bp = Blueprint("health", __name__)
 
 @health_bp.route("/health", methods=["GET"])
 def health():
     return {"status": "OK"}, 200
+
+
+@health_bp.route("/cache-stats", methods=["GET"])
+def cache_stats_endpoint():
+    """
+    Hit/miss counters of the generation cache and the RAG answer cache (per worker process).
+    """
+    return {"generation_cache": cache_stats(), "answer_cache": answer_cache_stats()}, 200
@@ -0,0 +1,91 @@
+# === File: app/routes/jobs.py ===
+# Submit long-running agent generations as background jobs and poll for their results
+
+from flask import Blueprint, request, jsonify
+from app.services.job_queue import STATUSES, get_job_queue, submit_job
+from app.services.batch_generator import BATCH_MAX_ITEMS
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+def job_accepted(job_id):
+    """Body of the 202 response returned for a queued job."""
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }
+
+
+@jobs_bp.route("/jobs", methods=["POST"])
+def create_job():
+    """
+    Queues a job and returns 202 with its id right away.
+    Expects JSON: {"kind": "seo_article" | "content_generator" | "marketing_post", "payload": {...}}
+    """
+    data = request.get_json(silent=True)
+    if not data or not data.get("kind"):
+        return jsonify({"error": "Missing or invalid JSON payload (kind and payload are required)"}), 400
+    job_id = submit_job(data["kind"], data.get("payload") or {})
+    if isinstance(job_id, dict):
+        return jsonify(job_id), 400
+    return jsonify(job_accepted(job_id)), 202
+
+
+@jobs_bp.route("/jobs", methods=["GET"])
+def list_jobs():
+    """
+    Lists recent jobs, newest first. Optional ?status=queued|running|succeeded|failed and ?limit=N.
+    """
+    status = request.args.get("status")
+    if status and status not in STATUSES:
+        return jsonify({"error": f"Unknown status '{status}'"}), 400
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    job_queue = get_job_queue()
+    return jsonify({"jobs": job_queue.list(status, limit), "counts": job_queue.stats()}), 200
+
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Status of one job; includes the result once it has succeeded."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(job), 200
+
+
+@jobs_bp.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """
+    The job's result: 200 when it succeeded, 202 while it is queued or running,
+    500 with the error when it failed.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    if job["status"] == "succeeded":
+        return jsonify(job["result"]), 200
+    if job["status"] == "failed":
+        return jsonify({"error": job.get("error", "Job failed")}), 500
+    return jsonify({"job_id": job_id, "status": job["status"]}), 202
+
+
+@jobs_bp.route("/batch-generate", methods=["POST"])
+def batch_generate():
+    """
+    Queues a bulk SEO generation as one background job.
+    Expects JSON: {"payloads": [<run-agent payload>, ...], "concurrency": 8,
+    "requests_per_minute": 500, "tokens_per_minute": 160000, "embed": true}
+    (all but payloads optional). Poll /jobs/<job_id> for progress; the result holds
+    one entry per payload and a throughput summary.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("payloads"), list) or not data["payloads"]:
+        return jsonify({"error": "Expected JSON with a non-empty 'payloads' list"}), 400
+    if len(data["payloads"]) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many payloads ({len(data['payloads'])}); the limit is {BATCH_MAX_ITEMS}"}), 400
+    job_id = submit_job("seo_batch", data)
+    if isinstance(job_id, dict):
+        return jsonify(job_id), 400
+    return jsonify({**job_accepted(job_id), "items": len(data["payloads"])}), 202
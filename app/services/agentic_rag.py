@@ -1,5 +1,10 @@
-import openai
-from app.services.embedding_store import search_embeddings
+import time
+import asyncio
+from app.services.embedding_store import search_embeddings, search_embeddings_async
+from app.services.context_builder import build_context
+from app.services.reranker import RERANK_CANDIDATES, RERANK_TOP_K, select_results
+from app.services.answer_cache import lookup_answer, lookup_answer_async, store_answer, store_answer_async
+from models.openai_client import chat_completion, chat_completion_async
 
 def extract_suggested_query(answer):
     # Simple extraction logic; improve as needed
@@ -7,37 +12,109 @@ def extract_suggested_query(answer):
     match = re.search(r"suggested query:\s*(.*)", answer, re.IGNORECASE)
     return match.group(1).strip() if match else None
 
-def agentic_rag(query):
-    results = search_embeddings(query, top_k=3)
-    context = "\n---\n".join([open(r["file"], encoding="utf-8").read() for r in results])
+def _read_context(results, usage):
+    """
+    Builds the token-budgeted context, adds its token count to usage["context_tokens"]
+    and its files to usage["files"].
+    """
+    # search_embeddings returns {"error": ...} when nothing can be retrieved
+    if isinstance(results, dict):
+        return ""
+    context, stats = build_context(results)
+    usage["context_tokens"] += stats["tokens"]
+    usage["files"] = list(dict.fromkeys(usage["files"] + stats["files"]))
+    return context
+
+def _search(query, usage):
+    """Over-fetches candidates, reranks them to RERANK_TOP_K and records the retrieval stats in usage."""
+    start = time.perf_counter()
+    results = search_embeddings(query, top_k=RERANK_CANDIDATES)
+    results, stats = select_results(results, RERANK_TOP_K, time.perf_counter() - start)
+    usage["retrieval"].append(stats)
+    return results
+
+async def _search_async(query, usage):
+    start = time.perf_counter()
+    results = await search_embeddings_async(query, top_k=RERANK_CANDIDATES)
+    results, stats = await asyncio.to_thread(select_results, results, RERANK_TOP_K, time.perf_counter() - start)
+    usage["retrieval"].append(stats)
+    return results
 
-    prompt = f"""You are an expert assistant. Here is the context:
+def _first_prompt(context, query):
+    return f"""You are an expert assistant. Here is the context:
 {context}
 
 User question: {query}
 
 If the context is enough to answer, answer the question. If not, suggest a new search query to get more info.
 Answer or suggest a new query:"""
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    answer = response.choices[0].message.content
 
-    if "suggested query:" in answer.lower():
-        new_query = extract_suggested_query(answer)
-        new_results = search_embeddings(new_query, top_k=3)
-        new_context = "\n---\n".join([open(r["file"], encoding="utf-8").read() for r in new_results])
-        prompt2 = f"""Here is more context:
+def _followup_prompt(new_context, query):
+    return f"""Here is more context:
 {new_context}
 
 Original question: {query}
 Now answer the question:"""
-        response2 = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt2}]
-        )
-        final_answer = response2.choices[0].message.content
-        return final_answer
+
+def _new_usage():
+    return {"context_tokens": 0, "retrieval": [], "files": [], "cached": False}
+
+def _cached_usage(hit):
+    return {**_new_usage(), "files": hit["files"], "cached": True}
+
+def agentic_rag(query):
+    return agentic_rag_with_usage(query)[0]
+
+def agentic_rag_with_usage(query):
+    """
+    Runs agentic RAG and returns (answer, usage) where usage["context_tokens"] is the
+    number of context tokens sent to the LLM for this request and usage["retrieval"]
+    holds the candidate counts and search/rerank timings of each retrieval.
+    Answers come from the answer cache when an equivalent query was answered from the
+    same, unchanged sources (usage["cached"] is then True).
+    """
+    hit, query_embedding = lookup_answer("agentic", query)
+    if hit:
+        return hit["answer"], _cached_usage(hit)
+    usage = _new_usage()
+    results = _search(query, usage)
+    context = _read_context(results, usage)
+
+    prompt = _first_prompt(context, query)
+    answer = chat_completion(prompt)
+
+    if "suggested query:" in answer.lower():
+        new_query = extract_suggested_query(answer)
+        new_results = _search(new_query, usage)
+        new_context = _read_context(new_results, usage)
+        prompt2 = _followup_prompt(new_context, query)
+        final_answer = chat_completion(prompt2)
+        store_answer("agentic", query, query_embedding, final_answer, usage["files"])
+        return final_answer, usage
+    else:
+        store_answer("agentic", query, query_embedding, answer, usage["files"])
+        return answer, usage
+
+async def agentic_rag_async(query):
+    return (await agentic_rag_with_usage_async(query))[0]
+
+async def agentic_rag_with_usage_async(query):
+    hit, query_embedding = await lookup_answer_async("agentic", query)
+    if hit:
+        return hit["answer"], _cached_usage(hit)
+    usage = _new_usage()
+    results = await _search_async(query, usage)
+    # build_context reads the source files: worker thread
+    context = await asyncio.to_thread(_read_context, results, usage)
+    answer = await chat_completion_async(_first_prompt(context, query))
+
+    if "suggested query:" in answer.lower():
+        new_query = extract_suggested_query(answer)
+        new_results = await _search_async(new_query, usage)
+        new_context = await asyncio.to_thread(_read_context, new_results, usage)
+        final_answer = await chat_completion_async(_followup_prompt(new_context, query))
+        await store_answer_async("agentic", query, query_embedding, final_answer, usage["files"])
+        return final_answer, usage
     else:
-        return answer
\ No newline at end of file
+        await store_answer_async("agentic", query, query_embedding, answer, usage["files"])
+        return answer, usage
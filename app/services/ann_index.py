@@ -0,0 +1,168 @@
+# === File: app/services/ann_index.py ===
+# FAISS index factory: exact (Flat) and approximate (IVF-PQ, HNSW) index types.
+# All indexes use inner product over L2-normalized vectors, i.e. cosine similarity,
+# and are wrapped in an IndexIDMap2 so vectors keep stable ids across deletions.
+
+import os
+import math
+import logging
+import faiss
+import numpy as np
+
+# "auto" keeps IndexFlat until ANN_THRESHOLD vectors, then switches to ANN_KIND.
+# "flat", "ivfpq" or "hnsw" force that type regardless of size.
+# Expected recall@5 against Flat (scripts/faiss_index_tool.py recall --synthetic 12000,
+# 1536 dims, defaults): hnsw ~1.0; ivfpq ~0.98 with the exact re-ranking of
+# FAISS_IVFPQ_REFINE_K, only ~0.37 on PQ codes alone (FAISS_IVFPQ_REFINE_K=0). The
+# re-ranking keeps the full vectors in memory too. Run `recall` on the real store
+# before switching kinds.
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto")
+ANN_KIND = os.getenv("FAISS_ANN_KIND", "hnsw")
+ANN_THRESHOLD = int(os.getenv("FAISS_ANN_THRESHOLD", "20000"))
+
+# HNSW parameters
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+
+# IVF-PQ parameters (nlist defaults to ~4*sqrt(n))
+IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "48"))  # sub-quantizers; must divide the dimension
+PQ_NBITS = 8
+# IVF-PQ re-ranks k * FAISS_IVFPQ_REFINE_K PQ candidates by exact inner product (0 disables)
+IVFPQ_REFINE_K = int(os.getenv("FAISS_IVFPQ_REFINE_K", "8"))
+# IVF-PQ training needs ~39 points per PQ centroid (2**PQ_NBITS)
+IVF_MIN_TRAIN = 39 * 2 ** PQ_NBITS
+
+INDEX_KINDS = ("flat", "hnsw", "ivfpq")
+METRIC = faiss.METRIC_INNER_PRODUCT
+
+
+def base_index(index):
+    """The index inside an id map and/or refinement wrapper (the index itself if it is not wrapped)."""
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexRefine):
+        index = faiss.downcast_index(index.base_index)
+    return index
+
+
+def has_id_map(index):
+    return isinstance(index, faiss.IndexIDMap2)
+
+
+def index_ids(index):
+    """Ids of the vectors in insertion order (positions for indexes without an id map)."""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map).astype("int64")
+    return np.arange(index.ntotal, dtype="int64")
+
+
+def supports_remove(index):
+    """
+    True if vectors can be removed in place. Only Flat keeps its id map consistent
+    after remove_ids (HNSW cannot remove, IVF leaves stale list ids), so other types
+    hide removed ids until the next compaction rebuilds them.
+    """
+    return has_id_map(index) and index_kind(index) == "flat"
+
+
+def index_kind(index):
+    """Returns "flat", "hnsw" or "ivfpq" for a FAISS index (wrapped or not)."""
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+
+def is_cosine_index(index):
+    """True if the index scores by inner product (and so expects normalized vectors)."""
+    return index.metric_type == METRIC
+
+
+def normalize_vectors(vectors):
+    """
+    Returns a float32 copy of vectors scaled to unit length, so inner product equals
+    cosine similarity. Zero rows are left as zeros.
+    """
+    vectors = np.array(vectors, dtype="float32", copy=True, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def choose_index_kind(ntotal, index_type=None):
+    """
+    Picks the index type for a store holding ntotal vectors.
+    IVF-PQ falls back to HNSW while there are too few vectors to train it.
+    """
+    index_type = index_type or INDEX_TYPE
+    if index_type == "auto":
+        index_type = "flat" if ntotal < ANN_THRESHOLD else ANN_KIND
+    if index_type == "ivfpq" and ntotal < IVF_MIN_TRAIN:
+        index_type = "hnsw"
+    if index_type not in INDEX_KINDS:
+        logging.error(f"Unknown FAISS index type '{index_type}', using flat")
+        index_type = "flat"
+    return index_type
+
+
+def _pq_m(dim):
+    m = min(PQ_M, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def build_index(vectors, kind, ids=None):
+    """
+    Builds (and trains, for IVF-PQ) an inner-product index of the given kind over
+    vectors (normalized float32 array, one row per vector) and adds them all under
+    ids (int64, one per row; default 0..n-1) through an IndexIDMap2.
+    IVF-PQ goes inside an IndexRefineFlat unless IVFPQ_REFINE_K is 0.
+    """
+    dim = vectors.shape[1]
+    n = vectors.shape[0]
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, METRIC)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif kind == "ivfpq":
+        nlist = IVF_NLIST or max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_m(dim), PQ_NBITS, METRIC)
+        if IVFPQ_REFINE_K > 0:
+            index = faiss.IndexRefineFlat(index)
+        index.train(vectors)
+    else:
+        index = faiss.IndexFlatIP(dim)
+    index = faiss.IndexIDMap2(index)
+    if n:
+        ids = np.arange(n, dtype="int64") if ids is None else np.asarray(ids, dtype="int64")
+        index.add_with_ids(vectors, ids)
+    configure_search(index)
+    return index
+
+
+def configure_search(index):
+    """Applies the search-time parameters (efSearch / nprobe / refine k_factor); they are not stored in the index file."""
+    inner = base_index(index)
+    kind = index_kind(inner)
+    if kind == "hnsw":
+        inner.hnsw.efSearch = HNSW_EF_SEARCH
+    elif kind == "ivfpq":
+        inner.nprobe = IVF_NPROBE
+        refine = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(refine, faiss.IndexRefine):
+            refine.k_factor = max(1, IVFPQ_REFINE_K)
+    return index
+
+
+def read_vectors(path, dim):
+    """Loads the raw float32 vector log written next to the index (one row per vector)."""
+    if not os.path.exists(path):
+        return np.zeros((0, dim), dtype="float32")
+    return np.fromfile(path, dtype="float32").reshape(-1, dim)
+
@@ -0,0 +1,276 @@
+# === File: app/services/answer_cache.py ===
+# Semantic cache of RAG answers, keyed on the similarity of the query embeddings
+
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import logging
+import threading
+import faiss
+import numpy as np
+from app.services.ann_index import normalize_vectors
+from app.services.embedding_store import embed_texts, embed_texts_async, get_store
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join("data", "answer_cache.sqlite3"))
+# Minimum cosine similarity between a new query and a cached one to reuse its answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))  # seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+# Nearest cached queries checked per lookup (several may belong to another kind or be stale)
+_CANDIDATES = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT NOT NULL,
+    query         TEXT NOT NULL,
+    embedding     BLOB NOT NULL,
+    answer        TEXT NOT NULL,
+    files         TEXT NOT NULL,  -- JSON {path: [mtime_ns, size]} of the source files
+    index_version TEXT NOT NULL,
+    created       REAL NOT NULL
+);
+"""
+
+
+def _file_signatures(files):
+    """{path: [mtime_ns, size]} for files, or None if one of them cannot be stat()ed."""
+    signatures = {}
+    for path in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        signatures[path] = [st.st_mtime_ns, st.st_size]
+    return signatures
+
+
+class SemanticAnswerCache:
+    """
+    Past RAG answers in SQLite (shared by all workers) with an in-memory FAISS index of
+    their normalized query embeddings per worker, kept in step by reading rows with a
+    higher id than the last one seen.
+
+    A lookup returns the answer of the most similar cached query of the same kind if the
+    similarity reaches the threshold and the entry is still valid: not expired, built
+    against the current embeddings index version and with every source file unchanged.
+    Invalid entries are deleted when they are found.
+    """
+
+    def __init__(self, path, threshold, ttl, max_entries):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._index = None
+        self._kinds = {}  # id -> kind, for the ids in the in-memory index
+        self._last_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+            self._index = None
+            self._kinds = {}
+            self._last_id = 0
+        return self._conn
+
+    def _sync(self):
+        """Adds entries stored (by any worker) since the last sync to the in-memory index."""
+        rows = self._connection().execute(
+            "SELECT id, kind, embedding FROM answers WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        vectors = np.vstack([np.frombuffer(row[2], dtype="float32") for row in rows])
+        if self._index is None or self._index.d != vectors.shape[1]:
+            self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vectors.shape[1]))
+            self._kinds = {}
+        self._index.add_with_ids(vectors, np.array([row[0] for row in rows], dtype="int64"))
+        self._kinds.update((row[0], row[1]) for row in rows)
+        self._last_id = rows[-1][0]
+
+    def _remove(self, entry_ids):
+        with self._conn:
+            self._conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in entry_ids])
+        self._forget(entry_ids)
+
+    def _forget(self, entry_ids):
+        self._index.remove_ids(np.array(entry_ids, dtype="int64"))
+        for entry_id in entry_ids:
+            self._kinds.pop(entry_id, None)
+
+    def _is_valid(self, row, index_version):
+        created, version, files = row[3], row[4], json.loads(row[2])
+        if time.time() - created > self.ttl or version != index_version:
+            return False
+        return _file_signatures(files) == files
+
+    def lookup(self, kind, embedding, index_version):
+        """
+        Returns {"answer", "files", "query", "similarity"} for the closest valid cached
+        query of this kind within the threshold, or None.
+        """
+        query = normalize_vectors(np.asarray(embedding, dtype="float32").reshape(1, -1))
+        with self._lock:
+            self._sync()
+            if self._index is None or self._index.ntotal == 0 or self._index.d != query.shape[1]:
+                self.misses += 1
+                return None
+            D, I = self._index.search(query, min(_CANDIDATES, self._index.ntotal))
+            for similarity, entry_id in zip(D[0].tolist(), I[0].tolist()):
+                if entry_id < 0 or similarity < self.threshold:
+                    break
+                if self._kinds.get(entry_id) != kind:
+                    continue
+                row = self._conn.execute(
+                    "SELECT query, answer, files, created, index_version FROM answers WHERE id = ?", (entry_id,)
+                ).fetchone()
+                if row is None:
+                    self._forget([entry_id])  # deleted by another worker
+                    continue
+                if not self._is_valid(row, index_version):
+                    self._remove([entry_id])
+                    self.invalidations += 1
+                    continue
+                self.hits += 1
+                return {"answer": row[1], "files": list(json.loads(row[2])), "query": row[0], "similarity": similarity}
+            self.misses += 1
+            return None
+
+    def store(self, kind, query, embedding, answer, files, index_version):
+        """Caches answer for query; skipped when a source file cannot be stat()ed."""
+        signatures = _file_signatures(dict.fromkeys(files))
+        if signatures is None:
+            return
+        vector = normalize_vectors(np.asarray(embedding, dtype="float32").reshape(1, -1))[0]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO answers (kind, query, embedding, answer, files, index_version, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (kind, query, vector.tobytes(), answer, json.dumps(signatures), index_version, time.time())
+                )
+                # Keep the newest max_entries rows
+                conn.execute(
+                    "DELETE FROM answers WHERE id <= (SELECT MAX(id) FROM answers) - ?", (self.max_entries,)
+                )
+            self.stores += 1
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM answers")
+            self._index = None
+            self._kinds = {}
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "entries": self._connection().execute("SELECT COUNT(*) FROM answers").fetchone()[0],
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Returns the process-wide SemanticAnswerCache, or None when it is disabled."""
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticAnswerCache(ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+def _index_version():
+    store = get_store()
+    store.refresh()
+    return store.version
+
+
+def _lookup(cache, kind, query, embedding):
+    hit = cache.lookup(kind, embedding, _index_version())
+    if hit:
+        logging.info(f"Answer cache hit ({kind}, similarity {hit['similarity']:.3f}): {query!r} ~ {hit['query']!r}")
+    return hit
+
+
+def lookup_answer(kind, query):
+    """
+    Embeds query (through the embedding cache) and looks for a cached answer.
+    Returns (hit or None, embedding); embedding is None when the cache is disabled or
+    the query could not be embedded. Errors are logged and treated as misses.
+    """
+    cache = get_answer_cache()
+    if cache is None:
+        return None, None
+    try:
+        embedding = embed_texts([query])[0]
+        return _lookup(cache, kind, query, embedding), embedding
+    except Exception as e:
+        logging.error(f"Answer cache lookup failed: {e}")
+        return None, None
+
+
+async def lookup_answer_async(kind, query):
+    cache = get_answer_cache()
+    if cache is None:
+        return None, None
+    try:
+        embedding = (await embed_texts_async([query]))[0]
+        # Index refresh and SQLite reads run on a worker thread
+        return await asyncio.to_thread(_lookup, cache, kind, query, embedding), embedding
+    except Exception as e:
+        logging.error(f"Answer cache lookup failed: {e}")
+        return None, None
+
+
+def store_answer(kind, query, embedding, answer, files):
+    """Caches a successful answer with the files its context came from. Errors are logged and ignored."""
+    cache = get_answer_cache()
+    if cache is None or embedding is None or not answer or answer.startswith("Exception:"):
+        return
+    try:
+        cache.store(kind, query, embedding, answer, files, _index_version())
+    except Exception as e:
+        logging.error(f"Answer cache store failed: {e}")
+
+
+async def store_answer_async(kind, query, embedding, answer, files):
+    await asyncio.to_thread(store_answer, kind, query, embedding, answer, files)
+
+
+def answer_cache_stats():
+    cache = get_answer_cache()
+    if cache is None:
+        return {"enabled": False}
+    return cache.stats()
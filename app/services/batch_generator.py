@@ -0,0 +1,219 @@
+# === File: app/services/batch_generator.py ===
+# Bulk SEO article generation: bounded concurrency, RPM/TPM rate limits, 429 backoff
+# and embedding of each article as it completes
+
+import os
+import time
+import random
+import asyncio
+import logging
+import openai
+from app.services.seo_generator import build_seo_prompt, save_seo_output, generation_key, bypass_cache
+from app.services.generation_cache import cached_lookup, cached_store
+from app.services.embedding_store import store_embeddings_bulk
+from app.utils.file_writer import OUTPUT_DIR
+from app.utils.output_catalog import get_output_catalog
+from app.utils.rate_limiter import RateLimiter
+from app.utils.tokens import count_tokens
+from models.openai_client import DEFAULT_MODEL, SYSTEM_PROMPT, generate_content_with_usage_async, new_async_client
+
+# Articles generated at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# Account limits to stay under (0 = no limit)
+BATCH_REQUESTS_PER_MINUTE = int(os.getenv("BATCH_REQUESTS_PER_MINUTE", "500"))
+BATCH_TOKENS_PER_MINUTE = int(os.getenv("BATCH_TOKENS_PER_MINUTE", "160000"))
+# Retries of one article after 429 / timeouts / 5xx, with exponential backoff
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "6"))
+BATCH_BACKOFF_BASE = float(os.getenv("BATCH_BACKOFF_BASE", "1.0"))
+BATCH_BACKOFF_MAX = float(os.getenv("BATCH_BACKOFF_MAX", "60"))
+# Upper bound on the number of payloads accepted by one batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+# Completion tokens assumed per word of the article's LIMIT, until the real usage is known
+TOKENS_PER_WORD = 1.4
+_RETRYABLE = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def estimate_tokens(prompt, payload):
+    """Prompt tokens plus the completion the article's word limit allows, for the TPM bucket."""
+    try:
+        word_limit = int(str(payload.get("input", {}).get("LIMIT", "1000")).strip() or 1000)
+    except ValueError:
+        word_limit = 1000
+    return count_tokens(SYSTEM_PROMPT + prompt, DEFAULT_MODEL) + int(word_limit * TOKENS_PER_WORD)
+
+
+def _retry_after(error):
+    """Seconds the server asked us to wait, if the error carries a Retry-After header."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt):
+    return min(BATCH_BACKOFF_MAX, BATCH_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _BatchRun:
+    """State of one batch: limiter, client, embedding queue and counters."""
+
+    def __init__(self, concurrency, requests_per_minute, tokens_per_minute, embed, on_progress):
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.client = new_async_client(max_retries=0)  # retries are done here, in step with the limiter
+        self.embed = embed
+        self.embed_queue = asyncio.Queue()
+        self.on_progress = on_progress
+        self.latencies = []
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.retries = 0
+        self.rate_limited = 0
+        self.embedded_chunks = 0
+        self.embed_errors = []
+        self.done = 0
+
+    async def _complete(self, prompt, estimate):
+        attempt = 0
+        while True:
+            await self.limiter.acquire(estimate)
+            try:
+                content, usage = await generate_content_with_usage_async(prompt, client=self.client)
+            except _RETRYABLE as e:
+                if attempt >= BATCH_MAX_RETRIES:
+                    raise
+                delay = _retry_after(e) or _backoff(attempt)
+                if isinstance(e, openai.RateLimitError):
+                    self.rate_limited += 1
+                    self.limiter.pause(delay)  # everyone slows down, not only this request
+                self.retries += 1
+                attempt += 1
+                logging.warning(f"Batch LLM call failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.limiter.adjust(usage["total_tokens"] - estimate)
+            return content, usage
+
+    async def generate(self, index, payload):
+        async with self.semaphore:
+            start = time.perf_counter()
+            item = {"index": index, "topic": payload.get("input", {}).get("topic", "")}
+            try:
+                prompt, topic, context = build_seo_prompt(payload)
+                key = generation_key(prompt)
+                cached = await asyncio.to_thread(cached_lookup, key, bypass_cache(payload))
+                if cached is not None:
+                    item.update(status="cached", download_url=cached.get("download_url"))
+                else:
+                    content, usage = await self._complete(prompt, estimate_tokens(prompt, payload))
+                    result = await asyncio.to_thread(save_seo_output, payload, prompt, topic, context, content)
+                    await asyncio.to_thread(cached_store, key, result)
+                    for name in self.usage:
+                        self.usage[name] += usage[name]
+                    item.update(status="succeeded", download_url=result["download_url"], tokens=usage["total_tokens"])
+                    if self.embed:
+                        await self.embed_queue.put((result["download_url"].rsplit("/", 1)[-1], topic))
+            except Exception as e:
+                logging.error(f"Batch item {index} ({item['topic']}) failed: {e}")
+                item.update(status="failed", error=str(e))
+            item["seconds"] = round(time.perf_counter() - start, 2)
+            if item["status"] == "succeeded":
+                self.latencies.append(item["seconds"])
+            self.done += 1
+            if self.on_progress:
+                self.on_progress(self.done, item)
+            return item
+
+    async def embed_worker(self):
+        """
+        Embeds finished articles while generation continues. Whatever completed while the
+        previous embedding call ran is embedded together, as one bulk add.
+        """
+        catalog = get_output_catalog(OUTPUT_DIR)
+        while True:
+            items = [await self.embed_queue.get()]
+            while not self.embed_queue.empty():
+                items.append(self.embed_queue.get_nowait())
+            stop = None in items
+            items = [item for item in items if item is not None]
+            if items:
+                paths = [catalog.resolve(filename) for filename, _ in items]
+                found = [(path, topic) for path, (_, topic) in zip(paths, items) if path]
+                result = await asyncio.to_thread(
+                    store_embeddings_bulk, [p for p, _ in found], [t for _, t in found]
+                )
+                if "error" in result:
+                    self.embed_errors.append(result["error"])
+                else:
+                    self.embedded_chunks += result["chunks"]
+                    self.embed_errors.extend(e["error"] for e in result["errors"])
+            if stop:
+                return
+
+
+async def run_batch_async(payloads, concurrency=BATCH_CONCURRENCY, requests_per_minute=BATCH_REQUESTS_PER_MINUTE,
+                          tokens_per_minute=BATCH_TOKENS_PER_MINUTE, embed=True, on_progress=None):
+    """
+    Generates one SEO article per run_seo_agent payload, at most concurrency at a time and
+    within the RPM/TPM limits. Cached articles are not regenerated. With embed=True each new
+    article is added to the FAISS index as it completes.
+    on_progress(done_count, item) is called after every item.
+    Returns {"items": [...], "summary": {...throughput...}}, or {"error": ...}.
+    """
+    if not isinstance(payloads, list) or not payloads:
+        return {"error": "payloads must be a non-empty list of run-agent payloads"}
+    if len(payloads) > BATCH_MAX_ITEMS:
+        return {"error": f"Too many payloads ({len(payloads)}); the limit is {BATCH_MAX_ITEMS}"}
+
+    run = _BatchRun(concurrency, requests_per_minute, tokens_per_minute, embed, on_progress)
+    start = time.perf_counter()
+    embedder = asyncio.create_task(run.embed_worker()) if embed else None
+    try:
+        items = await asyncio.gather(*(run.generate(i, payload) for i, payload in enumerate(payloads)))
+        generated_seconds = time.perf_counter() - start
+        if embedder is not None:
+            await run.embed_queue.put(None)
+            await embedder
+    finally:
+        await run.client.close()
+    elapsed = time.perf_counter() - start
+
+    counts = {status: sum(1 for item in items if item["status"] == status) for status in ("succeeded", "cached", "failed")}
+    total_tokens = run.usage["prompt_tokens"] + run.usage["completion_tokens"]
+    minutes = max(generated_seconds, 1e-9) / 60
+    summary = {
+        **counts,
+        "total": len(items),
+        "elapsed_seconds": round(elapsed, 1),
+        "articles_per_minute": round(counts["succeeded"] / minutes, 1),
+        "tokens_per_minute": round(total_tokens / minutes),
+        **run.usage,
+        "latency_p50_seconds": _percentile(run.latencies, 0.5),
+        "latency_p95_seconds": _percentile(run.latencies, 0.95),
+        "retries": run.retries,
+        "rate_limited": run.rate_limited,
+        "rate_limit_wait_seconds": round(run.limiter.waited, 1),
+        "embedded_chunks": run.embedded_chunks,
+        "embed_errors": run.embed_errors,
+        "concurrency": concurrency,
+    }
+    logging.warning(
+        f"Batch of {len(items)}: {counts['succeeded']} generated, {counts['cached']} cached, "
+        f"{counts['failed']} failed in {elapsed:.1f}s ({summary['articles_per_minute']} articles/min)"
+    )
+    return {"items": items, "summary": summary}
+
+
+def run_batch(payloads, **kwargs):
+    """Synchronous entry point (job workers, CLI); runs the batch on its own event loop."""
+    return asyncio.run(run_batch_async(payloads, **kwargs))
@@ -0,0 +1,61 @@
+# === File: app/services/chunking.py ===
+# Splits generated output files into overlapping chunks for chunk-level embeddings
+
+import os
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Chunk size/overlap in characters (~300/50 tokens with the default values)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+
+# Section markers written by app/utils/file_writer.write_output_file
+OUTPUT_HEADER = "📈 GPT-Generated Output\n------------------------\n"
+OUTPUT_FOOTER = "\n========================\n📁 File generated on:"
+
+_splitter = None
+
+
+def get_splitter():
+    global _splitter
+    if _splitter is None:
+        _splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            add_start_index=True,
+        )
+    return _splitter
+
+
+def extract_generated_section(text):
+    """
+    Returns (section, offset): the GPT-generated part of an output file and its
+    character offset in the file. The request payload and prompt boilerplate are
+    left out. Files without the markers are returned whole.
+    """
+    start = text.find(OUTPUT_HEADER)
+    if start == -1:
+        return text, 0
+    start += len(OUTPUT_HEADER)
+    end = text.find(OUTPUT_FOOTER, start)
+    if end == -1:
+        end = len(text)
+    return text[start:end], start
+
+
+def chunk_output_file(text):
+    """
+    Splits the generated section of an output file into overlapping chunks.
+    Returns a list of dicts: {"chunk": n, "start": offset, "end": offset, "text": chunk},
+    with start/end as character offsets into the full file text.
+    """
+    section, offset = extract_generated_section(text)
+    chunks = []
+    for n, doc in enumerate(get_splitter().create_documents([section])):
+        start = offset + doc.metadata["start_index"]
+        chunks.append({
+            "chunk": n,
+            "start": start,
+            "end": start + len(doc.page_content),
+            "text": doc.page_content,
+        })
+    return chunks
@@ -0,0 +1,118 @@
+# === File: app/services/content_agent.py ===
+# Agentic content generator (LLM self-reflection), sync and async
+
+import json
+import time
+import logging
+from models.openai_client import chat_completion, chat_completion_async
+
+# Asked after the draft, in the same conversation, so the model sees what it wrote
+REFLECTION_PROMPT = """Review the content you just wrote against the original request.
+Reply with JSON only, in this form:
+{"sufficient": true or false, "missing": ["short description of each missing or unclear point"]}"""
+
+
+def _prompt_from_payload(payload):
+    """
+    If payload is a dict with a 'content' key, use that as the prompt.
+    If payload is anything else, use its string form directly as the prompt.
+    """
+    if isinstance(payload, dict) and "content" in payload:
+        return payload["content"]
+    return str(payload)
+
+def _completion_prompt(missing):
+    points = "\n".join(f"- {point}" for point in missing)
+    return f"""Write the additional sections that cover these points, so they can be appended to your content above.
+Match its tone and formatting and do not repeat what is already there.
+{points}"""
+
+def _needs_more(reflection):
+    return "add" in reflection.lower() or "clarify" in reflection.lower()
+
+def parse_reflection(text):
+    """
+    Reads the reflection reply as {"sufficient": bool, "missing": [str]}.
+    Tolerates code fences around the JSON; a reply that is not JSON falls back to a
+    keyword check, with the whole reply as the single missing point.
+    """
+    cleaned = (text or "").strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        cleaned = cleaned[cleaned.find("{"):] if "{" in cleaned else cleaned
+    try:
+        data = json.loads(cleaned)
+        missing = [str(point) for point in data.get("missing") or [] if str(point).strip()]
+        return {"sufficient": bool(data.get("sufficient")) or not missing, "missing": missing}
+    except (ValueError, AttributeError):
+        logging.warning("Reflection reply was not JSON; using the keyword check")
+        if _needs_more(cleaned):
+            return {"sufficient": False, "missing": [cleaned]}
+        return {"sufficient": True, "missing": []}
+
+
+def _result(content, reflection, steps, start):
+    total = time.perf_counter() - start
+    logging.info("Agentic content generator: " + ", ".join(f"{s['step']} {s['seconds']}s" for s in steps) + f", total {total:.2f}s")
+    return {
+        "content": content,
+        "reflection": reflection,
+        "steps": steps,
+        "total_seconds": round(total, 2),
+    }
+
+
+# Agentic Content Generator (LLM self-reflection)
+def agentic_content_generator(payload):
+    """
+    Draft, reflect and (only if the reflection lists missing points) complete, as one
+    conversation: each call sends the earlier messages, so the model works on its own draft.
+    Returns {"content", "reflection": {"sufficient", "missing"}, "steps": [{"step", "seconds"}],
+    "total_seconds"}.
+    """
+    start = time.perf_counter()
+    steps = []
+    messages = [{"role": "user", "content": _prompt_from_payload(payload)}]
+
+    # Step 1: Generate initial content
+    t = time.perf_counter()
+    content = chat_completion(messages).strip()
+    steps.append({"step": "draft", "seconds": round(time.perf_counter() - t, 2)})
+    messages += [{"role": "assistant", "content": content}, {"role": "user", "content": REFLECTION_PROMPT}]
+
+    # Step 2: Structured self-review of the draft
+    t = time.perf_counter()
+    reply = chat_completion(messages, response_format={"type": "json_object"})
+    reflection = parse_reflection(reply)
+    steps.append({"step": "reflection", "seconds": round(time.perf_counter() - t, 2)})
+
+    # Step 3: Only when something is missing, add it in the same conversation
+    if not reflection["sufficient"]:
+        messages += [{"role": "assistant", "content": reply}, {"role": "user", "content": _completion_prompt(reflection["missing"])}]
+        t = time.perf_counter()
+        content += "\n\n" + chat_completion(messages).strip()
+        steps.append({"step": "completion", "seconds": round(time.perf_counter() - t, 2)})
+    return _result(content, reflection, steps, start)
+
+async def agentic_content_generator_async(payload):
+    """Async variant of agentic_content_generator; same conversation and result."""
+    start = time.perf_counter()
+    steps = []
+    messages = [{"role": "user", "content": _prompt_from_payload(payload)}]
+
+    t = time.perf_counter()
+    content = (await chat_completion_async(messages)).strip()
+    steps.append({"step": "draft", "seconds": round(time.perf_counter() - t, 2)})
+    messages += [{"role": "assistant", "content": content}, {"role": "user", "content": REFLECTION_PROMPT}]
+
+    t = time.perf_counter()
+    reply = await chat_completion_async(messages, response_format={"type": "json_object"})
+    reflection = parse_reflection(reply)
+    steps.append({"step": "reflection", "seconds": round(time.perf_counter() - t, 2)})
+
+    if not reflection["sufficient"]:
+        messages += [{"role": "assistant", "content": reply}, {"role": "user", "content": _completion_prompt(reflection["missing"])}]
+        t = time.perf_counter()
+        content += "\n\n" + (await chat_completion_async(messages)).strip()
+        steps.append({"step": "completion", "seconds": round(time.perf_counter() - t, 2)})
+    return _result(content, reflection, steps, start)
@@ -0,0 +1,76 @@
+# === File: app/services/context_builder.py ===
+# Assembles RAG prompt context from search results within a token budget
+
+import os
+import re
+import hashlib
+import logging
+from app.services.embedding_store import read_result_text, rank_results, result_files
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+# Maximum number of context tokens sent to the LLM per RAG prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# Model whose tokenizer is used for counting
+CONTEXT_MODEL = "gpt-3.5-turbo"
+# Partial documents shorter than this are not worth including
+MIN_PARTIAL_TOKENS = 100
+
+SEPARATOR = "\n---\n"
+
+
+def _fingerprint(text):
+    return hashlib.sha1(re.sub(r"\s+", " ", text).strip().lower().encode("utf-8")).hexdigest()
+
+
+def build_context(results, token_budget=None, separator=SEPARATOR):
+    """
+    Builds the context string for a RAG prompt.
+
+    Results are taken in score order (best first); each one's text is read through the
+    file cache, duplicates (same normalized text) are skipped, and texts are added until
+    the token budget is used up. The last text may be truncated to fit.
+
+    Returns (context, stats) where stats reports tokens used, the budget, how many
+    results were included or skipped as duplicates/over budget, and the files used.
+    """
+    if token_budget is None:
+        token_budget = CONTEXT_TOKEN_BUDGET
+    separator_tokens = count_tokens(separator, CONTEXT_MODEL)
+    parts = []
+    used_results = []
+    seen = set()
+    stats = {"tokens": 0, "budget": token_budget, "included": 0, "duplicates": 0, "over_budget": 0, "truncated": 0}
+
+    for result in rank_results(results):
+        try:
+            text = read_result_text(result)
+        except Exception as e:
+            logging.error(f"Error reading file {result.get('file')}: {e}")
+            continue
+        fingerprint = _fingerprint(text)
+        if not text.strip() or fingerprint in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(fingerprint)
+
+        remaining = token_budget - stats["tokens"] - separator_tokens
+        tokens = count_tokens(text, CONTEXT_MODEL)
+        if tokens > remaining:
+            if remaining < MIN_PARTIAL_TOKENS:
+                stats["over_budget"] += 1
+                continue
+            text = truncate_to_tokens(text, remaining, CONTEXT_MODEL)
+            tokens = count_tokens(text, CONTEXT_MODEL)
+            stats["truncated"] += 1
+
+        parts.append(separator + text)
+        used_results.append(result)
+        stats["tokens"] += tokens + separator_tokens
+        stats["included"] += 1
+
+    stats["files"] = result_files(used_results)
+    logging.warning(
+        f"RAG context: {stats['tokens']}/{token_budget} tokens, {stats['included']} included, "
+        f"{stats['duplicates']} duplicates, {stats['over_budget']} over budget"
+    )
+    return "".join(parts), stats
@@ -0,0 +1,116 @@
+# === File: app/services/dedup.py ===
+# Duplicate and version detection for ingestion: content hashes, MinHash over word shingles
+
+import os
+import re
+import hashlib
+import numpy as np
+from app.utils.output_catalog import logical_name, parse_output_name
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+# Estimated Jaccard similarity of the word shingles at which two files are near-duplicates
+DEDUP_NEAR_THRESHOLD = float(os.getenv("DEDUP_NEAR_THRESHOLD", "0.9"))
+# A newer output file of a topic replaces the vectors of the older ones
+DEDUP_SUPERSEDE_VERSIONS = os.getenv("DEDUP_SUPERSEDE_VERSIONS", "1") == "1"
+# Words per shingle, and MinHash permutations (signature length)
+SHINGLE_WORDS = int(os.getenv("DEDUP_SHINGLE_WORDS", "5"))
+MINHASH_PERMUTATIONS = 128
+
+_WORD = re.compile(r"[\w&]+")
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; fixed seed so
+# signatures stored in the metadata database stay comparable
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20250626)
+_A = _rng.integers(1, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def normalize_text(text):
+    """Lowercased text with runs of whitespace collapsed, so formatting changes do not count."""
+    return " ".join(text.lower().split())
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def shingle_hashes(text, size=SHINGLE_WORDS):
+    """32-bit hashes of the distinct size-word shingles of text (the whole text if shorter)."""
+    words = _WORD.findall(text.lower())
+    shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+        dtype=np.uint64
+    )
+
+
+def minhash(text):
+    """MinHash signature (MINHASH_PERMUTATIONS uint64 values) of the word shingles of text."""
+    hashes = shingle_hashes(text)
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+
+def similarity(signature, signatures):
+    """Estimated Jaccard similarity of signature to each row of signatures."""
+    return (signatures == signature).mean(axis=1)
+
+
+def fingerprint(path, text):
+    """
+    Identity of an output file for deduplication: its version key (topic part of the
+    filename, shared by all versions of a topic), timestamp, content hash and MinHash.
+    text is the part of the file that gets embedded.
+    """
+    key, stamp = parse_output_name(logical_name(path))
+    return {
+        "file": path,
+        "version_key": key,
+        "stamp": stamp,
+        "content_hash": content_hash(text),
+        "minhash": minhash(text),
+    }
+
+
+def _is_version_of(doc, other):
+    return DEDUP_SUPERSEDE_VERSIONS and doc["stamp"] and other["stamp"] and doc["version_key"] == other["version_key"]
+
+
+def classify(doc, known):
+    """
+    Decides what ingestion does with the fingerprinted file doc, given the fingerprints
+    of the files already in the index (known, {file: fingerprint}).
+    Returns {"action", "duplicate_of", "similarity", "supersedes", "stale"} where action is
+    "superseded" (a newer version of the topic is stored), "unchanged" (same file, same
+    content), "duplicate" (same content as another file), "near_duplicate" (shingle
+    similarity at or above DEDUP_NEAR_THRESHOLD), "changed" (same file, new content)
+    or "new". supersedes lists the stored older versions that doc replaces; "stale"
+    is True when the vectors already stored for the file itself must go (changed
+    content, or a stored file that a newer version supersedes).
+    """
+    decision = {"action": "new", "duplicate_of": None, "similarity": None, "supersedes": [], "stale": False}
+    stored = known.get(doc["file"])
+    others = [other for path, other in known.items() if path != doc["file"]]
+    for other in others:
+        if _is_version_of(doc, other) and other["stamp"] > doc["stamp"]:
+            return {**decision, "action": "superseded", "duplicate_of": other["file"], "stale": stored is not None}
+    if stored is not None:
+        if stored["content_hash"] == doc["content_hash"]:
+            return {**decision, "action": "unchanged", "duplicate_of": doc["file"], "similarity": 1.0}
+        decision.update(action="changed", stale=True)
+
+    for other in others:
+        if other["content_hash"] == doc["content_hash"]:
+            return {**decision, "action": "duplicate", "duplicate_of": other["file"], "similarity": 1.0}
+
+    decision["supersedes"] = [other["file"] for other in others if _is_version_of(doc, other) and other["stamp"] < doc["stamp"]]
+    # Older versions being replaced are expected to be similar; compare with the rest
+    candidates = [other for other in others if other["file"] not in decision["supersedes"]]
+    if candidates and decision["action"] == "new":
+        scores = similarity(doc["minhash"], np.vstack([other["minhash"] for other in candidates]))
+        best = int(np.argmax(scores))
+        if scores[best] >= DEDUP_NEAR_THRESHOLD:
+            return {
+                **decision, "action": "near_duplicate", "duplicate_of": candidates[best]["file"],
+                "similarity": round(float(scores[best]), 3), "supersedes": []
+            }
+    return decision
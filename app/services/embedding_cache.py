@@ -0,0 +1,186 @@
+# === File: app/services/embedding_cache.py ===
+# Persistent, content-addressed cache of embeddings keyed by (model, sha256(text))
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+from app.utils.file_lock import file_lock
+
+DIGEST_SIZE = 32
+
+
+def cache_key(model, text):
+    """Returns the 32-byte cache key for text embedded with model."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache shared by all workers.
+
+    Layout in `directory`:
+      - vectors.f32   memory-mapped float32 matrix (capacity x dim), one row per slot
+      - digests.u8    memory-mapped (capacity x 32) key of the vector stored in each slot
+      - access.i64    memory-mapped last-use time (ns) of each slot, 0 for a free slot
+      - slots.gen     rewritten after every store, so other workers rebuild their key index
+      - cache.json    dim and capacity
+
+    Lookups run under the shared file lock and stores under the exclusive one, so a
+    slot is never read while another worker reuses it; a hit also records its use
+    time in access.i64. When the cache is full, the slot used least recently by any
+    worker is overwritten.
+    """
+
+    def __init__(self, directory, capacity=50000):
+        self.directory = directory
+        self.capacity = capacity
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._digests = None
+        self._access = None
+        self._slots = None  # digest -> slot, built on first use
+        self._generation_mtime = None
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, "cache.lock")
+        self._info_path = os.path.join(directory, "cache.json")
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._digests_path = os.path.join(directory, "digests.u8")
+        self._access_path = os.path.join(directory, "access.i64")
+        self._generation_path = os.path.join(directory, "slots.gen")
+        # Recency order written by earlier versions; used once to seed access.i64
+        self._legacy_lru_path = os.path.join(directory, "lru.npy")
+
+    def _open(self, dim=None):
+        """Maps the cache files, creating them with `dim` columns if they do not exist yet."""
+        if self._vectors is not None:
+            return True
+        if os.path.exists(self._info_path):
+            with open(self._info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            self.dim = info["dim"]
+            self.capacity = info["capacity"]
+            mode = "r+"
+        elif dim is None:
+            return False
+        else:
+            self.dim = dim
+            mode = "w+"
+        self._vectors = np.memmap(self._vectors_path, dtype="float32", mode=mode, shape=(self.capacity, self.dim))
+        self._digests = np.memmap(self._digests_path, dtype="uint8", mode=mode, shape=(self.capacity, DIGEST_SIZE))
+        self._access = self._open_access(mode)
+        if mode == "w+":
+            with open(self._info_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "capacity": self.capacity}, f)
+        return True
+
+    def _open_access(self, mode):
+        if mode == "r+" and not os.path.exists(self._access_path):
+            # Cache from before access.i64: rank the slots by the old LRU order
+            access = np.memmap(self._access_path, dtype="int64", mode="w+", shape=(self.capacity,))
+            if os.path.exists(self._legacy_lru_path):
+                order = np.load(self._legacy_lru_path)
+                access[order] = np.arange(1, len(order) + 1)
+            access.flush()
+            return access
+        return np.memmap(self._access_path, dtype="int64", mode=mode, shape=(self.capacity,))
+
+    def _reload_slots(self):
+        """Rebuilds the digest -> slot index if another worker stored vectors since."""
+        try:
+            mtime = os.stat(self._generation_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._slots is not None and mtime == self._generation_mtime:
+            return
+        used = np.flatnonzero(self._access)
+        self._slots = {self._digests[slot].tobytes(): int(slot) for slot in used}
+        self._generation_mtime = mtime
+
+    def _bump_generation(self):
+        tmp_path = self._generation_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_path, self._generation_path)
+        self._generation_mtime = os.stat(self._generation_path).st_mtime_ns
+
+    def get_many(self, keys):
+        """
+        Returns a list with the cached vector (float32 array) or None for each key.
+        """
+        found = [None] * len(keys)
+        with self._lock:
+            if not self._open():
+                self.misses += len(keys)
+                return found
+            with file_lock(self._lock_path, shared=True):
+                self._reload_slots()
+                now = time.time_ns()
+                for i, key in enumerate(keys):
+                    slot = self._slots.get(key)
+                    if slot is not None and self._digests[slot].tobytes() == key:
+                        found[i] = np.array(self._vectors[slot])
+                        self._access[slot] = now
+                        self.hits += 1
+                    else:
+                        self.misses += 1
+        return found
+
+    def put_many(self, keys, vectors):
+        """
+        Stores vectors (2-D float32 array, one row per key), evicting least recently used slots.
+        """
+        if not len(keys):
+            return
+        with self._lock, file_lock(self._lock_path):
+            self._open(dim=vectors.shape[1])
+            if vectors.shape[1] != self.dim:
+                logging.error(f"Embedding cache dim {self.dim} does not match vectors of dim {vectors.shape[1]}")
+                return
+            self._reload_slots()
+            now = time.time_ns()
+            for key, vector in zip(keys, vectors):
+                slot = self._slots.get(key)
+                if slot is None:
+                    # A free slot, else the one with the oldest use by any worker
+                    slot = int(np.argmin(self._access))
+                    self._slots.pop(self._digests[slot].tobytes(), None)
+                self._vectors[slot] = vector
+                self._digests[slot] = np.frombuffer(key, dtype="uint8")
+                self._access[slot] = now
+                self._slots[key] = slot
+            self._vectors.flush()
+            self._digests.flush()
+            self._access.flush()
+            self._bump_generation()
+
+    def stats(self):
+        return {
+            "entries": len(self._slots or ()),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(directory, capacity):
+    """
+    Returns the process-wide EmbeddingCache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(directory, capacity)
+        return _cache
@@ -1,9 +1,21 @@
-import openai
 import os
-import faiss
+import asyncio
 import numpy as np
-import pickle
 import logging
+import threading
+from app.services.index_manager import get_index_manager
+from app.services.embedding_cache import cache_key, get_embedding_cache
+from app.services.ann_index import normalize_vectors
+from app.services.chunking import chunk_output_file, extract_generated_section
+from app.services.dedup import DEDUP_ENABLED, classify, fingerprint
+from app.services.lexical_index import (
+    HYBRID_CANDIDATES, SEARCH_MODE, SEARCH_MODES, match_query, query_terms, rrf_fuse, term_coverage,
+)
+from app.utils.tokens import count_tokens, truncate_to_tokens
+from app.utils.file_cache import read_text_cached
+from app.utils.output_catalog import get_output_catalog, logical_name
+from app.utils.output_store import pending_text, read_output_text
+from models.openai_client import create_embeddings, create_embeddings_async
 
 # --- PRODUCTION-FRIENDLY PATHS ---
 # Get the absolute path to the current file's directory
@@ -14,141 +26,674 @@ OUTPUT_DIR = "/home/ubuntu/AgenticToolKit/static/outputs"
 os.makedirs(OUTPUT_DIR, exist_ok=True)  # Ensure the outputs directory exists
 
 # Define the absolute paths for the FAISS index and metadata files
+# (an existing faiss_meta.pkl is imported into the SQLite store on first use)
 INDEX_PATH = os.path.join(OUTPUT_DIR, "faiss.index")
-META_PATH = os.path.join(OUTPUT_DIR, "faiss_meta.pkl")
+META_PATH = os.path.join(OUTPUT_DIR, "faiss_meta.sqlite3")
+
+# --- EMBEDDING SETTINGS ---
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Per-input limit of the embeddings endpoint; longer documents are truncated
+EMBED_MAX_INPUT_TOKENS = 8191
+# Token budget and input count per embeddings request (API caps: 300k tokens, 2048 inputs)
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "250000"))
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "512"))
+
+# On-disk embedding cache, checked before every embeddings request
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(OUTPUT_DIR, "embedding_cache"))
+EMBEDDING_CACHE_CAPACITY = int(os.getenv("EMBEDDING_CACHE_CAPACITY", "50000"))
+
+# --- SEARCH SETTINGS ---
+# Hits with a cosine similarity below this are dropped before their files are read
+SEARCH_MIN_SCORE = float(os.getenv("SEARCH_MIN_SCORE", "0.2"))
+
+
+def get_store():
+    """
+    Returns the worker-resident index manager for INDEX_PATH/META_PATH.
+    """
+    return get_index_manager(INDEX_PATH, META_PATH)
+
+
+def batch_by_token_budget(token_counts, max_tokens=EMBED_BATCH_MAX_TOKENS, max_inputs=EMBED_BATCH_MAX_INPUTS):
+    """
+    Groups input positions into batches whose token total stays within max_tokens
+    and whose size stays within max_inputs. Yields lists of positions, in order.
+    """
+    batch = []
+    batch_tokens = 0
+    for i, tokens in enumerate(token_counts):
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_inputs):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def _lookup_cached(texts, model):
+    """
+    Truncates texts to the per-input limit and looks them up in the embedding cache.
+    Returns (texts, keys, rows, cache) where rows holds None for every cache miss.
+    """
+    texts = [truncate_to_tokens(t, EMBED_MAX_INPUT_TOKENS, model) for t in texts]
+    rows = [None] * len(texts)
+    keys = None
+    cache = None
+    if EMBEDDING_CACHE_ENABLED:
+        keys = [cache_key(model, t) for t in texts]
+        try:
+            cache = get_embedding_cache(EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_CAPACITY)
+            rows = cache.get_many(keys)
+        except Exception as e:
+            logging.error(f"Embedding cache read error: {e}")
+            cache = None
+    return texts, keys, rows, cache
+
+
+def _store_cached(cache, keys, rows, missing):
+    if cache is not None and missing:
+        try:
+            cache.put_many([keys[i] for i in missing], np.array([rows[i] for i in missing], dtype="float32"))
+        except Exception as e:
+            logging.error(f"Embedding cache write error: {e}")
+
+
+def _missing_batches(texts, rows, model):
+    """Yields lists of text positions that still need embedding, one list per request."""
+    missing = [i for i, row in enumerate(rows) if row is None]
+    token_counts = [count_tokens(texts[i], model) for i in missing]
+    for batch in batch_by_token_budget(token_counts):
+        yield [missing[b] for b in batch]
+
+
+def embed_texts(texts, model=EMBEDDING_MODEL):
+    """
+    Embeds many texts with as few OpenAI requests as possible.
+    Texts already in the embedding cache are served from disk; the rest are packed
+    into token-budgeted batches, one embeddings request per batch, and then cached.
+    Returns a float32 array of shape (len(texts), dim), rows in input order.
+    """
+    texts, keys, rows, cache = _lookup_cached(texts, model)
+    missing = []
+    for positions in _missing_batches(texts, rows, model):
+        data = create_embeddings([texts[i] for i in positions], model)
+        # The API returns one item per input, tagged with its position in the batch
+        for item in data:
+            rows[positions[item.index]] = np.array(item.embedding, dtype="float32")
+        missing.extend(positions)
+    _store_cached(cache, keys, rows, missing)
+    return np.array(rows, dtype="float32")
+
+
+async def embed_texts_async(texts, model=EMBEDDING_MODEL):
+    """
+    Async variant of embed_texts using the shared AsyncOpenAI client; the embedding
+    cache (disk) is read and written on a worker thread.
+    """
+    texts, keys, rows, cache = await asyncio.to_thread(_lookup_cached, texts, model)
+    missing = []
+    for positions in _missing_batches(texts, rows, model):
+        data = await create_embeddings_async([texts[i] for i in positions], model)
+        for item in data:
+            rows[positions[item.index]] = np.array(item.embedding, dtype="float32")
+        missing.extend(positions)
+    await asyncio.to_thread(_store_cached, cache, keys, rows, missing)
+    return np.array(rows, dtype="float32")
 
 
 def get_latest_file_by_topic(topic, outputs_dir=OUTPUT_DIR):
     """
-    Find the latest .txt file in outputs_dir whose filename contains the topic.
+    Find the latest .txt file in outputs_dir for the topic, using the output catalog
+    (exact normalized topic first, then topics containing it).
     Returns the absolute path to the latest file, or None if not found.
     """
-    files = [
-        f for f in os.listdir(outputs_dir)
-        if topic.lower() in f.lower() and f.endswith(".txt")
-    ]
-    if not files:
-        return None
-    # Sort files by last modified time (descending)
-    files.sort(key=lambda f: os.path.getmtime(os.path.join(outputs_dir, f)), reverse=True)
-    return os.path.join(outputs_dir, files[0])
+    return get_output_catalog(outputs_dir).latest_for_topic(topic)
 
 def store_embedding(topic):
     """
-    Loads the latest file for the given topic, generates an embedding using OpenAI,
-    and stores it in a FAISS index along with metadata.
-    Returns info about the stored embedding or an error message.
+    Loads the latest file for the given topic, splits its generated section into chunks,
+    embeds them using OpenAI and stores them in the FAISS index along with metadata.
+    Returns info about the stored embeddings or an error message.
     """
     try:
         # Find the latest file for the topic
         file_path = get_latest_file_by_topic(topic)
         if not file_path:
             return {"error": f"No file found for topic '{topic}'."}
-        
-        # Read the file content
-        try:
-            # Make sure file path uses forward slashes
-            file_path = file_path.replace("\\", "/")
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-        except Exception as e:
-            logging.error(f"Error reading file {file_path}: {e}")
-            return {"error": f"Could not read file: {e}"}
-        
-        # Generate embedding using OpenAI API
-        try:
-            response = openai.embeddings.create(
-                input=content,
-                model="text-embedding-3-small"
-            )
-            embedding = np.array(response.data[0].embedding, dtype="float32").reshape(1, -1)
-        except Exception as e:
-            logging.error(f"OpenAI embedding error: {e}")
-            return {"error": f"OpenAI embedding error: {e}"}
+
+        result = store_embeddings_bulk([file_path], topics=[topic])
+        if "error" in result:
+            return {"error": result["error"]}
+        if result["errors"]:
+            return {"error": result["errors"][0]["error"]}
+        if result["skipped"]:
+            # Already embedded, or a copy/older version of something that is
+            skipped = result["skipped"][0]
+            logging.warning(f"Embedding skipped for topic: {topic}, file: {skipped['file']} ({skipped['reason']})")
+            return {**skipped, "chunks": 0, "index_size": result["index_size"]}
 
         # Log the embedding creation for debugging
-        logging.warning(f"Embedding created for topic: {topic}, file: {file_path}, embedding_dim: {len(embedding)}")
+        logging.warning(f"Embedding created for topic: {topic}, file: {result['files'][0]}, chunks: {result['chunks']}")
 
-        # Load existing FAISS index and metadata, or create new ones if they don't exist
-        try:
-            if os.path.exists(INDEX_PATH):
-                index = faiss.read_index(INDEX_PATH)
-                with open(META_PATH, "rb") as meta_f:
-                    meta = pickle.load(meta_f)
-            else:
-                index = faiss.IndexFlatL2(embedding.shape[1])
-                meta = []
-        except Exception as e:
-            logging.error(f"Error loading FAISS index or metadata: {e}")
-            return {"error": f"Error loading FAISS index or metadata: {e}"}
+        return {
+            "file": result["files"][0],
+            "chunks": result["chunks"],
+            "embedding_dim": result["embedding_dim"],
+            "index_size": result["index_size"]
+        }
+    except Exception as e:
+        logging.error(f"Unexpected error in store_embedding: {e}")
+        return {"error": f"Unexpected error: {e}"}
 
-        # Add the new embedding and its metadata
-        index.add(embedding)
-        meta.append({"topic": topic, "file": file_path})
+def store_embeddings_bulk(file_paths, topics=None, force=False):
+    """
+    Bulk ingestion: splits the generated section of each output file into overlapping
+    chunks, embeds all chunks in token-budgeted batches, appends all vectors with a
+    single index.add call and persists the index once at the end.
+    topics, if given, must line up with file_paths; otherwise the topic is derived
+    from the filename (timestamp suffix removed).
+    Each chunk is stored with its file and character offsets (chunk, start, end).
 
-        # Save the updated FAISS index and metadata to disk
+    With DEDUP_ENABLED, files are first checked against the stored ones (see
+    dedup.classify): unchanged files, exact and near-duplicates and older versions of a
+    stored topic are skipped; a newer version replaces the vectors of the older ones and
+    a changed file replaces its own. Files in the same call are checked against each other.
+    force=True re-embeds files even if they are stored unchanged, replacing their vectors.
+    Returns a summary dict with stored, skipped and superseded files, errors and the
+    new index size.
+    """
+    store = get_store()
+    known = _known_documents(store) if DEDUP_ENABLED else {}
+    pending = {}  # file -> (topic, chunks, fingerprint), in input order
+    skipped = []
+    stale_files = set()
+    errors = []
+    for i, file_path in enumerate(file_paths):
+        file_path = file_path.replace("\\", "/")
         try:
-            faiss.write_index(index, INDEX_PATH)
-            with open(META_PATH, "wb") as meta_f:
-                pickle.dump(meta, meta_f)
+            content = read_output_text(file_path)
         except Exception as e:
-            logging.error(f"Error saving FAISS index or metadata: {e}")
-            return {"error": f"Error saving FAISS index or metadata: {e}"}
+            logging.error(f"Error reading file {file_path}: {e}")
+            errors.append({"file": file_path, "error": f"Could not read file: {e}"})
+            continue
+        if topics is not None:
+            topic = topics[i]
+        else:
+            topic = logical_name(file_path).rsplit("_", 2)[0].replace("_", " ")
+        chunks = chunk_output_file(content)
+        if not chunks:
+            errors.append({"file": file_path, "error": "No generated content to embed."})
+            continue
+        doc = None
+        if force and store.meta.by_file(file_path):
+            stale_files.add(file_path)
+        if DEDUP_ENABLED:
+            doc = fingerprint(file_path, extract_generated_section(content)[0])
+            decision = classify(doc, known)
+            if force and decision["action"] == "unchanged":
+                decision.update(action="changed", duplicate_of=None, similarity=None, stale=True)
+            if decision["stale"]:
+                stale_files.add(file_path)
+                known.pop(file_path, None)
+            if decision["action"] not in ("new", "changed"):
+                skipped.append({
+                    "file": file_path, "reason": decision["action"],
+                    "duplicate_of": decision["duplicate_of"], "similarity": decision["similarity"]
+                })
+                continue
+            for older in decision["supersedes"]:
+                del known[older]
+                if older in pending:
+                    # Older version earlier in this call: never stored
+                    del pending[older]
+                    skipped.append({"file": older, "reason": "superseded", "duplicate_of": file_path, "similarity": None})
+                else:
+                    stale_files.add(older)
+            known[file_path] = doc
+        pending[file_path] = (topic, chunks, doc)
 
+    texts = []
+    entries = []
+    for file_path, (topic, chunks, _) in pending.items():
+        for chunk in chunks:
+            texts.append(chunk["text"])
+            entries.append({
+                "topic": topic,
+                "file": file_path,
+                "chunk": chunk["chunk"],
+                "start": chunk["start"],
+                "end": chunk["end"]
+            })
+    files = list(pending)
+    superseded = sorted(stale_files - set(files))
+
+    if not entries:
+        removed = _remove_files(store, stale_files)
         return {
-            "file": file_path,
-            "embedding_dim": embedding.shape[1],
-            "index_size": index.ntotal
+            "stored": 0, "chunks": 0, "files": [], "skipped": skipped, "superseded": superseded,
+            "removed_vectors": removed, "errors": errors, "index_size": store.ntotal
         }
+
+    try:
+        embeddings = embed_texts(texts)
     except Exception as e:
-        logging.error(f"Unexpected error in store_embedding: {e}")
-        return {"error": f"Unexpected error: {e}"}
+        logging.error(f"OpenAI embedding error: {e}")
+        return {"error": f"OpenAI embedding error: {e}", "errors": errors}
+
+    try:
+        # Ids of the vectors being replaced are taken before the new ones exist
+        stale_ids = [vector_id for file in stale_files for vector_id, _ in store.meta.by_file(file)]
+        store.add(embeddings, entries, texts)
+        removed = store.remove(stale_ids)
+        store.meta.put_documents([doc for _, _, doc in pending.values() if doc is not None])
+        index_size = store.ntotal
+    except Exception as e:
+        logging.error(f"Error updating FAISS index or metadata: {e}")
+        return {"error": f"Error updating FAISS index or metadata: {e}", "errors": errors}
+
+    logging.warning(
+        f"Bulk embedding stored {len(entries)} chunks from {len(files)} files "
+        f"(skipped {len(skipped)}, replaced {removed} vectors), index size: {index_size}"
+    )
+    return {
+        "stored": len(files),
+        "chunks": len(entries),
+        "files": files,
+        "skipped": skipped,
+        "superseded": superseded,
+        "removed_vectors": removed,
+        "errors": errors,
+        "embedding_dim": embeddings.shape[1],
+        "index_size": index_size
+    }
+
+def _remove_files(store, files):
+    """Removes every vector of the given files from the store. Returns the number removed."""
+    ids = [vector_id for file in files for vector_id, _ in store.meta.by_file(file)]
+    return store.remove(ids) if ids else 0
 
-def search_embeddings(query, top_k=3):
+def update_embeddings(file_path=None, topic=None):
     """
-    Given a query string, generate its embedding and retrieve the top_k most similar documents
-    from the FAISS index. Returns a list of dicts with file, topic, and similarity score.
+    Re-embeds a file (or the latest file of topic), replacing the vectors stored for it.
+    Returns the store_embeddings_bulk summary or an error dict.
     """
+    if file_path is None:
+        file_path = get_latest_file_by_topic(topic) if topic else None
+        if not file_path:
+            return {"error": f"No file found for topic '{topic}'."}
+    result = store_embeddings_bulk([file_path], topics=[topic] if topic else None, force=True)
+    if "error" not in result and result["errors"]:
+        return {"error": result["errors"][0]["error"]}
+    return result
+
+def delete_embeddings(file_path=None, topic=None, ids=None):
+    """
+    Removes the vectors and metadata of a file, of every file of a topic, or of the
+    given ids. Returns {"removed": vectors removed, "index_size"} or an error dict.
+    """
+    store, error = _check_store()
+    if error:
+        return error
+    if file_path:
+        ids = [vector_id for vector_id, _ in store.meta.by_file(file_path)]
+    elif topic:
+        ids = [vector_id for vector_id, _ in store.meta.by_topic(topic)]
+    elif ids is None:
+        return {"error": "Give a file, a topic or ids to delete."}
     try:
-        # Check if the FAISS index and metadata exist
-        if not os.path.exists(INDEX_PATH) or not os.path.exists(META_PATH):
-            return {"error": "No embeddings index found."}
+        removed = store.remove(ids)
+    except Exception as e:
+        logging.error(f"Error removing embeddings: {e}")
+        return {"error": f"Error removing embeddings: {e}"}
+    logging.warning(f"Removed {removed} vectors ({file_path or topic or 'by id'}), index size: {store.ntotal}")
+    return {"removed": removed, "index_size": store.ntotal}
 
-        # Generate embedding for the query using OpenAI API
-        try:
-            response = openai.embeddings.create(
-                input=query,
-                model="text-embedding-3-small"
-            )
-            query_embedding = np.array(response.data[0].embedding, dtype="float32").reshape(1, -1)
-        except Exception as e:
-            logging.error(f"OpenAI embedding error: {e}")
-            return {"error": f"OpenAI embedding error: {e}"}
+def check_index(fix=False, outputs_dir=OUTPUT_DIR):
+    """
+    Consistency check of the FAISS index against the metadata store and the output
+    files on disk. Reports vectors without metadata (orphans, e.g. from metadata-only
+    deletes), metadata without vectors (dangling), embedded files missing on disk,
+    output files that are not embedded (includes skipped duplicates and older
+    versions), chunks missing from the BM25 index and a vector log shorter than the
+    snapshot. fix=True removes orphans, dangling entries and files missing on disk.
+    Returns the report dict ("ok" is False when something needs fixing) or an error dict.
+    """
+    store, error = _check_store()
+    if error:
+        return error
+    index_ids = set(store.live_ids().tolist())
+    meta_ids = {vector_id for vector_id, _ in store.meta.all()}
+    orphans = sorted(index_ids - meta_ids)
+    dangling = sorted(meta_ids - index_ids)
+    files = store.meta.files()
+    missing = [file for file in files if pending_text(file) is None and not os.path.exists(file)]
+    embedded = {os.path.abspath(file) for file in files}
+    not_embedded = sorted(
+        path for path in (os.path.join(outputs_dir, relpath) for relpath in get_output_catalog(outputs_dir).files())
+        if os.path.abspath(path) not in embedded
+    )
+    info = store.describe()
+    report = {
+        "index": info,
+        "index_vectors": len(index_ids),
+        "metadata_entries": len(meta_ids),
+        "orphan_vectors": len(orphans),
+        "dangling_entries": len(dangling),
+        "missing_files": missing,
+        "not_embedded_files": not_embedded,
+        "bm25_missing": len(store.meta.missing_texts()),
+        "vector_log_short": info["vector_log_rows"] < info["snapshot_rows"],
+        "sample_orphan_ids": orphans[:20],
+        "sample_dangling_ids": dangling[:20],
+    }
+    report["ok"] = not (orphans or dangling or missing or report["vector_log_short"])
+    if fix:
+        report["fixed"] = {
+            "orphan_vectors": store.remove(orphans) if orphans else 0,
+            "dangling_entries": store.meta.delete(dangling),
+            "missing_file_vectors": _remove_files(store, missing),
+        }
+        if report["vector_log_short"]:
+            # Writing a new snapshot rewrites the vector log from the index
+            try:
+                store.rebuild()
+                report["fixed"]["vector_log"] = True
+            except Exception as e:
+                logging.error(f"Could not rewrite the vector log: {e}")
+                report["fixed"]["vector_log"] = f"Could not rewrite the vector log: {e}"
+        logging.warning(f"Index consistency fixes: {report['fixed']}")
+    return report
 
-        # Load FAISS index and metadata from disk
-        try:
-            index = faiss.read_index(INDEX_PATH)
-            with open(META_PATH, "rb") as meta_f:
-                meta = pickle.load(meta_f)
-        except Exception as e:
-            logging.error(f"Error loading FAISS index or metadata: {e}")
-            return {"error": f"Error loading FAISS index or metadata: {e}"}
+def _known_documents(store):
+    """
+    Fingerprints of the embedded files. Files embedded before deduplication existed are
+    fingerprinted from disk once per process (no embeddings calls).
+    """
+    key = (os.getpid(), id(store))
+    with _backfill_lock:
+        if key not in _documents_backfilled:
+            _documents_backfilled.add(key)
+            docs = []
+            for file in store.meta.files_without_documents():
+                try:
+                    docs.append(fingerprint(file, extract_generated_section(read_output_text(file))[0]))
+                except Exception as e:
+                    logging.error(f"Deduplication backfill could not read {file}: {e}")
+            if docs:
+                store.meta.put_documents(docs)
+                logging.warning(f"Deduplication: fingerprinted {len(docs)} files embedded before it existed")
+    return store.meta.documents()
 
-        # Search for top_k similar embeddings in the index
-        try:
-            D, I = index.search(query_embedding, top_k)
-            results = []
-            for idx, score in zip(I[0], D[0]):
-                if idx < len(meta):
-                    results.append({
-                        "file": meta[idx]["file"].replace("\\", "/"),
-                        "topic": meta[idx]["topic"],
-                        "score": float(score)
-                    })
-            return results
-        except Exception as e:
-            logging.error(f"Error during FAISS search: {e}")
-            return {"error": f"Error during FAISS search: {e}"}
+def deduplicate_index(dry_run=False):
+    """
+    Applies the ingestion rules to the files already embedded: newest versions first,
+    each file is checked against the ones kept so far, and older versions, duplicates
+    and near-duplicates have their vectors removed.
+    Returns {"kept", "removed": [{"file", "reason", "duplicate_of", "similarity"}], "removed_vectors"}.
+    """
+    store, error = _check_store()
+    if error:
+        return error
+    docs = sorted(_known_documents(store).values(), key=lambda d: (d["stamp"] or "", d["file"]), reverse=True)
+    kept = {}
+    removed = []
+    for doc in docs:
+        decision = classify(doc, kept)
+        if decision["action"] == "new":
+            kept[doc["file"]] = doc
+        else:
+            removed.append({
+                "file": doc["file"], "reason": decision["action"],
+                "duplicate_of": decision["duplicate_of"], "similarity": decision["similarity"]
+            })
+    removed_vectors = 0
+    if removed and not dry_run:
+        removed_vectors = _remove_files(store, [r["file"] for r in removed])
+        logging.warning(f"Deduplication removed {len(removed)} files ({removed_vectors} vectors)")
+    return {"kept": len(kept), "removed": removed, "removed_vectors": removed_vectors}
+
+def search_embeddings(query, top_k=3, min_score=None, mode=None):
+    """
+    Given a query string, retrieve the top_k most relevant chunks. Returns a list of dicts
+    with file, topic and score (higher is better).
+
+    mode (default SEARCH_MODE):
+    - "hybrid": FAISS and BM25 candidates fused by reciprocal rank; score is the fused
+      score, vector_score the cosine similarity and bm25 the BM25 score (None where a
+      retriever did not return the chunk).
+    - "vector": FAISS only; score is the cosine similarity.
+    - "lexical": BM25 only, without an embeddings request.
+    Vector hits with a cosine similarity below min_score (default SEARCH_MIN_SCORE) are dropped.
+    """
+    results = search_embeddings_batch([query], top_k=top_k, min_score=min_score, mode=mode)
+    if isinstance(results, dict):
+        return results
+    return results[0]
+
+def _check_store():
+    """
+    Returns (store, None) if the FAISS index is available, otherwise (None, error_dict).
+    """
+    # Check if the FAISS index and metadata exist (loads them once per worker)
+    store = get_store()
+    try:
+        if not store.exists():
+            return None, {"error": "No embeddings index found."}
+    except Exception as e:
+        logging.error(f"Error loading FAISS index or metadata: {e}")
+        return None, {"error": f"Error loading FAISS index or metadata: {e}"}
+    return store, None
+
+_backfill_lock = threading.Lock()
+_backfilled = set()
+_documents_backfilled = set()
+
+def _ensure_lexical_backfill(store):
+    """
+    Once per process: adds the texts of chunks embedded before the BM25 index existed,
+    read back from their files with the stored offsets.
+    """
+    key = (os.getpid(), id(store))
+    with _backfill_lock:
+        if key in _backfilled:
+            return
+        _backfilled.add(key)
+        pairs = []
+        for entry_id, entry in store.meta.missing_texts():
+            try:
+                pairs.append((entry_id, read_result_text(entry)))
+            except Exception as e:
+                logging.error(f"BM25 backfill could not read {entry['file']}: {e}")
+        if pairs:
+            store.meta.add_texts(pairs)
+            logging.warning(f"BM25 index: added {len(pairs)} chunks embedded before it existed")
+
+def _lexical_hits(store, terms, limit):
+    """BM25 hits [(id, score, text)] for the query terms, best first."""
+    if not terms:
+        return []
+    _ensure_lexical_backfill(store)
+    return store.meta.lexical_search(match_query(terms), limit)
+
+def lexical_recall(query, top_k=3):
+    """
+    Fraction of the query's terms (stopwords removed) that occur in its top_k BM25 hits.
+    Local SQLite only, no API call; 0.0 when there is no index.
+    """
+    store, error = _check_store()
+    if error:
+        return 0.0
+    terms = query_terms(query)
+    try:
+        hits = _lexical_hits(store, terms, top_k)
+    except Exception as e:
+        logging.error(f"BM25 search error: {e}")
+        return 0.0
+    return term_coverage(terms, [text for _, _, text in hits])
+
+def _make_result(entry, score, **scores):
+    result = {
+        "file": entry["file"],
+        "topic": entry["topic"],
+        "score": float(score),
+        **scores
+    }
+    # Chunk-level entries carry the offsets of the chunk inside the file
+    if "start" in entry:
+        result["chunk"] = entry["chunk"]
+        result["start"] = entry["start"]
+        result["end"] = entry["end"]
+    return result
+
+def _search_matrix(store, queries, query_embeddings, top_k, min_score=None, mode=SEARCH_MODE):
+    """
+    Searches every query (row of query_embeddings; None in lexical mode) in one FAISS
+    call plus one BM25 query each, and fuses the candidates as configured by mode.
+    store comes from _check_store, which has already synced it with disk.
+    Returns one result list per query, or an error dict.
+    """
+    if min_score is None:
+        min_score = SEARCH_MIN_SCORE
+    try:
+        meta = {}
+        if mode == "lexical":
+            vector_rows = [[] for _ in queries]
+        else:
+            k = top_k if mode == "vector" else max(top_k, HYBRID_CANDIDATES)
+            D, I, meta = store.search(query_embeddings, k, refresh=False)
+            vector_rows = [
+                [(int(idx), float(score)) for idx, score in zip(row_ids, row_scores) if idx >= 0 and score >= min_score]
+                for row_ids, row_scores in zip(I, D)
+            ]
+        if mode == "vector":
+            return [
+                [_make_result(meta[idx], score) for idx, score in row if idx in meta]
+                for row in vector_rows
+            ]
+
+        all_results = []
+        for row, (query, vector_hits) in enumerate(zip(queries, vector_rows)):
+            lexical_hits = _lexical_hits(store, query_terms(query), HYBRID_CANDIDATES if mode == "hybrid" else top_k)
+            fused = rrf_fuse([[idx for idx, _ in vector_hits], [idx for idx, _, _ in lexical_hits]])[:top_k]
+            missing = [idx for idx, _ in fused if idx not in meta]
+            if missing:
+                meta = {**meta, **store.meta.get(missing)}
+            vector_scores = dict(vector_hits)
+            lexical_only = [idx for idx, _ in fused if idx not in vector_scores]
+            if mode == "hybrid" and lexical_only:
+                # Cosine similarity of BM25-only hits, from their stored vectors (for reranking)
+                query_vector = normalize_vectors(query_embeddings[row:row + 1])[0]
+                stored = store.vectors(lexical_only)
+                if stored is not None:
+                    vector_scores.update(zip(lexical_only, (stored @ query_vector).tolist()))
+            bm25_scores = {idx: score for idx, score, _ in lexical_hits}
+            all_results.append([
+                _make_result(meta[idx], fused_score, vector_score=vector_scores.get(idx), bm25=bm25_scores.get(idx))
+                for idx, fused_score in fused if idx in meta
+            ])
+        return all_results
+    except Exception as e:
+        logging.error(f"Error during {mode} search: {e}")
+        return {"error": f"Error during {mode} search: {e}"}
+
+def search_embeddings_batch(queries, top_k=3, min_score=None, mode=None):
+    """
+    Searches several queries at once: all queries are embedded in one batched call
+    and searched against the index as a single multi-row matrix.
+    Returns one result list per query (same shape as search_embeddings), or an error dict.
+    """
+    mode = mode or SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        return {"error": f"Unknown search mode '{mode}'"}
+    try:
+        store, error = _check_store()
+        if error:
+            return error
+
+        # Generate embeddings for all queries (served from the embedding cache when possible)
+        query_embeddings = None
+        if mode != "lexical":
+            try:
+                query_embeddings = embed_texts(queries)
+            except Exception as e:
+                logging.error(f"OpenAI embedding error: {e}")
+                return {"error": f"OpenAI embedding error: {e}"}
+
+        return _search_matrix(store, queries, query_embeddings, top_k, min_score, mode)
+    except Exception as e:
+        logging.error(f"Unexpected error in search_embeddings: {e}")
+        return {"error": f"Unexpected error: {e}"}
+
+async def search_embeddings_batch_async(queries, top_k=3, min_score=None, mode=None):
+    """
+    Async variant of search_embeddings_batch: the embeddings request is awaited, the
+    index sync, the FAISS search and the BM25 (SQLite) queries run on a worker thread.
+    """
+    mode = mode or SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        return {"error": f"Unknown search mode '{mode}'"}
+    try:
+        store, error = await asyncio.to_thread(_check_store)
+        if error:
+            return error
+
+        query_embeddings = None
+        if mode != "lexical":
+            try:
+                query_embeddings = await embed_texts_async(queries)
+            except Exception as e:
+                logging.error(f"OpenAI embedding error: {e}")
+                return {"error": f"OpenAI embedding error: {e}"}
+
+        return await asyncio.to_thread(_search_matrix, store, queries, query_embeddings, top_k, min_score, mode)
     except Exception as e:
         logging.error(f"Unexpected error in search_embeddings: {e}")
-        return {"error": f"Unexpected error: {e}"}
\ No newline at end of file
+        return {"error": f"Unexpected error: {e}"}
+
+async def search_embeddings_async(query, top_k=3, min_score=None, mode=None):
+    results = await search_embeddings_batch_async([query], top_k=top_k, min_score=min_score, mode=mode)
+    if isinstance(results, dict):
+        return results
+    return results[0]
+
+def dedupe_results(result_lists):
+    """
+    Flattens per-query result lists, keeping the first hit for each chunk
+    (or each file, for whole-file entries).
+    """
+    seen = set()
+    unique_results = []
+    for results in result_lists:
+        for r in results:
+            if not isinstance(r, dict) or "file" not in r:
+                continue
+            key = (r["file"], r.get("start"))
+            if key not in seen:
+                unique_results.append(r)
+                seen.add(key)
+    return unique_results
+
+def read_result_text(result):
+    """
+    Returns the text behind a search result: just the chunk for chunk-level entries,
+    the whole file for entries indexed before chunking. Files are served from the
+    in-memory, mtime-validated file cache.
+    """
+    text = read_text_cached(result["file"])
+    if "start" in result:
+        return text[result["start"]:result["end"]]
+    return text
+
+def rank_results(results):
+    """
+    Orders results best first. Scores (fused rank scores or cosine similarities) are
+    higher for better results.
+    """
+    return sorted(results, key=lambda r: r["score"], reverse=True)
+
+def result_files(results):
+    """Unique file paths of the results, in rank order."""
+    return list(dict.fromkeys(r["file"] for r in results))
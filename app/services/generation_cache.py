@@ -0,0 +1,173 @@
+# === File: app/services/generation_cache.py ===
+# Opt-in cache for deterministic SEO/marketing generations, keyed by normalized prompt + model parameters
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+
+# Disabled unless GENERATION_CACHE_ENABLED=1
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "0") == "1"
+GENERATION_CACHE_DIR = os.getenv("GENERATION_CACHE_DIR", os.path.join("static", "outputs", "generation_cache"))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_prompt(prompt):
+    """Collapses whitespace and case so trivially different submissions share an entry."""
+    return re.sub(r"\s+", " ", prompt or "").strip().casefold()
+
+
+def make_key(kind, prompt, **params):
+    """
+    Returns the cache key for a generation: sha256 over the agent kind,
+    the normalized prompt and the model parameters (model, temperature, system prompt...).
+    """
+    material = json.dumps(
+        {"kind": kind, "prompt": normalize_prompt(prompt), "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Local on-disk backend: one JSON file per entry, named by key.
+    Entries expire after `ttl` seconds. When more than `max_entries` are stored,
+    the least recently used ones (oldest mtime; hits touch the file) are deleted.
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, directory, ttl, max_entries):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss or expired entry."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry["value"]
+
+    def set(self, key, value):
+        """Stores value (JSON-serialisable) under key, then enforces the size bound."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stores += 1
+        self._evict()
+
+    def _evict(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return
+        overflow = len(entries) - self.max_entries
+        if overflow <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:overflow]:
+            try:
+                os.remove(entry.path)
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """
+    Returns the process-wide GenerationCache, or None when the cache is disabled.
+    """
+    global _cache
+    if not GENERATION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = GenerationCache(GENERATION_CACHE_DIR, GENERATION_CACHE_TTL, GENERATION_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+def cached_lookup(key, bypass=False):
+    """
+    Looks key up unless the cache is disabled or the request asked to bypass it.
+    Errors are logged and treated as misses.
+    """
+    cache = get_generation_cache()
+    if cache is None or bypass:
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logging.error(f"Generation cache read error: {e}")
+        return None
+
+
+def cached_store(key, value):
+    """Stores value if the cache is enabled; errors are logged and ignored."""
+    cache = get_generation_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, value)
+    except Exception as e:
+        logging.error(f"Generation cache write error: {e}")
+
+
+def cache_stats():
+    cache = get_generation_cache()
+    if cache is None:
+        return {"enabled": False}
+    return cache.stats()
@@ -0,0 +1,608 @@
+# === File: app/services/index_manager.py ===
+# Process-resident FAISS index and metadata, loaded once per worker
+
+import os
+import time
+import logging
+import threading
+import faiss
+import numpy as np
+from app.services import vector_wal
+from app.services.ann_index import (
+    build_index,
+    choose_index_kind,
+    configure_search,
+    has_id_map,
+    index_ids,
+    index_kind,
+    is_cosine_index,
+    normalize_vectors,
+    read_vectors,
+    supports_remove,
+)
+from app.services.metadata_store import MetadataStore
+from app.utils.file_lock import file_lock
+
+# Number of pending WAL rows (added plus removed) that triggers compaction into a new snapshot
+WAL_COMPACT_ROWS = int(os.getenv("FAISS_WAL_COMPACT_ROWS", "2000"))
+
+
+def _atomic_replace(path, write):
+    """Calls write(tmp_path), fsyncs the result and renames it over path."""
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    with open(tmp_path, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class IndexManager:
+    """
+    Keeps the FAISS index in memory for the lifetime of the worker; the metadata of each
+    vector lives in an SQLite MetadataStore keyed by FAISS id and is looked up per hit.
+
+    On disk the index is a snapshot (index file and a float32 log of the raw vectors)
+    plus an append-only write-ahead log (WAL) of vectors added or removed since the
+    snapshot. Writers take an exclusive flock on <index>.lock, store the metadata rows,
+    append a record to the WAL and apply it in memory, so ingestion cost does not grow
+    with the index size. Once FAISS_WAL_COMPACT_ROWS rows are pending, the WAL is
+    compacted: the snapshot files are rewritten under temporary names and swapped in
+    with os.replace().
+
+    The index is an IndexIDMap2, so ids are stable: new vectors get the ids after the
+    highest stored one and removing a vector does not renumber the others. Flat indexes
+    drop removed vectors at once; HNSW and IVF-PQ hide them from search results until
+    the next compaction rebuilds the index without them.
+
+    Before each operation the snapshot index is stat()ed (reloaded if another worker
+    compacted it) and any new WAL records are replayed, so every gunicorn worker sees
+    new embeddings without a read_index on every query. WAL records carry the index id
+    of their first vector, so records already folded into the snapshot (e.g. after a
+    crash between the swap and the WAL truncation) are skipped; removals are idempotent.
+
+    With FAISS_INDEX_TYPE=auto the store switches from IndexFlat to an ANN index
+    (HNSW, IVF-PQ) once it passes FAISS_ANN_THRESHOLD; the switch happens at compaction.
+
+    Vectors are L2-normalized on the way in (add and search) and indexed by inner
+    product, so scores are cosine similarities: higher is better, 1.0 is identical.
+    Indexes written by older versions (L2 distance on raw vectors, positional ids) are
+    migrated on load.
+    """
+
+    def __init__(self, index_path, meta_path, vectors_path=None):
+        self.index_path = index_path
+        self.meta_path = meta_path
+        # Metadata used to be a pickled list next to the index; it is imported once
+        self.meta = MetadataStore(meta_path, legacy_pickle_path=os.path.splitext(meta_path)[0] + ".pkl")
+        base_path = os.path.splitext(index_path)[0]
+        self.vectors_path = vectors_path or base_path + "_vectors.f32"
+        self.wal_path = base_path + "_wal.log"
+        self.lock_path = index_path + ".lock"
+        self._lock = threading.RLock()
+        # Held for the whole of an online rebuild, so only one runs per process
+        self._rebuild_lock = threading.Lock()
+        self._index = None
+        self._signature = None
+        # Ids of the snapshot rows (ascending, lined up with the vector log)
+        self._snapshot_ids = np.zeros(0, dtype="int64")
+        self._wal_offset = 0
+        self._wal_vectors = []
+        self._wal_ids = []
+        # Ids removed since the snapshot, and the id the next added vector gets
+        self._removed = set()
+        self._next_id = 0
+        # Bumped every time the in-memory copy changes (reload, WAL replay or local write)
+        self.generation = 0
+
+    def _disk_signature(self):
+        """
+        Returns an (inode, mtime, size) fingerprint of the snapshot index file,
+        or None if it is missing.
+        """
+        try:
+            index_stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (index_stat.st_ino, index_stat.st_mtime_ns, index_stat.st_size)
+
+    def _load(self, signature):
+        index = configure_search(faiss.read_index(self.index_path))
+        self._index = index
+        self._signature = signature
+        self._reset_snapshot_state()
+        self.generation += 1
+        logging.info(f"FAISS index loaded: {index.ntotal} vectors (generation {self.generation})")
+
+    def _reset_snapshot_state(self):
+        """State for a freshly loaded or written snapshot: no WAL rows, no removals."""
+        self._snapshot_ids = index_ids(self._index)
+        self._wal_offset = 0
+        self._wal_vectors = []
+        self._wal_ids = []
+        self._removed = set()
+        self._next_id = int(self._snapshot_ids.max()) + 1 if len(self._snapshot_ids) else 0
+
+    def _apply_removal(self, ids):
+        ids = [i for i in ids if i not in self._removed]
+        if not ids:
+            return
+        self._removed.update(ids)
+        if supports_remove(self._index):
+            self._index.remove_ids(np.array(ids, dtype="int64"))
+
+    def _hidden_ids(self):
+        """Removed ids still present in the in-memory index (filtered out of search results)."""
+        return set() if supports_remove(self._index) else self._removed
+
+    def _replay_wal(self):
+        """Applies WAL records written since the last replay to the in-memory index."""
+        size = vector_wal.wal_size(self.wal_path)
+        if size < self._wal_offset:
+            # WAL was truncated without a new snapshot (removed by hand): start over
+            self._load(self._disk_signature())
+        if size == self._wal_offset:
+            return
+        records, self._wal_offset = vector_wal.read_records(self.wal_path, self._wal_offset)
+        for op, base, data in records:
+            if op == "remove":
+                self._apply_removal(data.tolist())
+                continue
+            if base + len(data) <= self._next_id:
+                continue  # already part of the snapshot
+            if base != self._next_id:
+                logging.error(f"WAL record at id {base} does not follow next id {self._next_id}; ignoring the rest")
+                break
+            ids = np.arange(base, base + len(data), dtype="int64")
+            if has_id_map(self._index):
+                self._index.add_with_ids(data, ids)
+            else:
+                self._index.add(data)  # positional index awaiting migration: ids are positions
+            self._wal_vectors.append(data)
+            self._wal_ids.append(ids)
+            self._next_id = base + len(data)
+        self.generation += 1
+
+    def _sync(self, exclusive=False):
+        """
+        Brings the in-memory copy up to date with the snapshot and WAL on disk.
+        Must be called with the file lock held; with the exclusive lock, an index
+        from before cosine scoring is migrated as well.
+        Returns True if an index is available.
+        """
+        signature = self._disk_signature()
+        if signature is None:
+            # Files removed on disk: drop the in-memory copy as well
+            if self._index is not None:
+                self._index = None
+                self._signature = None
+                self._snapshot_ids = np.zeros(0, dtype="int64")
+                self._wal_offset = 0
+                self._wal_vectors = []
+                self._wal_ids = []
+                self._removed = set()
+                self._next_id = 0
+                self.generation += 1
+            return False
+        if signature != self._signature:
+            self._load(signature)
+        self._replay_wal()
+        if exclusive and self._needs_migration():
+            try:
+                self._migrate()
+            except Exception as e:
+                logging.error(f"Could not migrate FAISS index to cosine similarity with an id map: {e}")
+        return True
+
+    def _needs_migration(self):
+        return not is_cosine_index(self._index) or not has_id_map(self._index)
+
+    def _migrate(self):
+        """
+        Rebuilds an index from an older version (L2 over raw vectors, or positional ids)
+        as an inner-product index over normalized vectors with an id map (same index
+        type, ids = former positions) and writes it as the new snapshot.
+        """
+        kind = index_kind(self._index)
+        ids, vectors = self.live_vectors()
+        if not is_cosine_index(self._index):
+            vectors = normalize_vectors(vectors)
+        self._index = build_index(vectors, kind, ids)
+        self._write_snapshot(vectors)
+        logging.warning(f"FAISS index migrated to cosine similarity with stable ids ({kind}, {self._index.ntotal} vectors)")
+
+    def _unchanged_on_disk(self):
+        """
+        Lock-free check that the in-memory copy is current: same snapshot file
+        (inode, mtime, size) and a WAL that has not grown since the last replay.
+        Writers change one of them before anything else can be seen, so False only
+        means the locked sync must run.
+        """
+        return (
+            self._index is not None
+            and self._disk_signature() == self._signature
+            and vector_wal.wal_size(self.wal_path) == self._wal_offset
+            and not self._needs_migration()
+        )
+
+    def refresh(self):
+        """
+        Reloads the snapshot if another worker replaced it and replays new WAL records.
+        Returns True if the in-memory index is available.
+        """
+        with self._lock:
+            if self._unchanged_on_disk():
+                return True
+            with file_lock(self.lock_path, shared=True):
+                available = self._sync()
+            if available and self._needs_migration():
+                with file_lock(self.lock_path):
+                    available = self._sync(exclusive=True)
+            return available
+
+    def exists(self):
+        """Returns True if an index is available (on disk or already in memory)."""
+        return self.refresh()
+
+    @property
+    def ntotal(self):
+        """Number of searchable vectors (removed ones not counted)."""
+        with self._lock:
+            if self._index is None:
+                return 0
+            return self._index.ntotal - len(self._hidden_ids())
+
+    @property
+    def kind(self):
+        with self._lock:
+            return index_kind(self._index) if self._index is not None else None
+
+    @property
+    def version(self):
+        """
+        Identifies the stored index content (snapshot file and WAL position). Equal in
+        every worker that has synced to the same state; changes with every write.
+        """
+        with self._lock:
+            if self._signature is None:
+                return "none"
+            return "{:x}-{:x}-{:x}:{}".format(*self._signature, self._wal_offset)
+
+    @property
+    def pending_rows(self):
+        """Rows held in the WAL that are not yet compacted into the snapshot."""
+        with self._lock:
+            return sum(len(v) for v in self._wal_vectors)
+
+    @property
+    def removed_rows(self):
+        """Vectors removed since the snapshot (dropped from it at the next compaction)."""
+        with self._lock:
+            return len(self._removed)
+
+    def live_ids(self):
+        """Ids of every stored vector that has not been removed, ascending."""
+        with self._lock:
+            if self._index is None:
+                return np.zeros(0, dtype="int64")
+            ids = np.concatenate([self._snapshot_ids] + self._wal_ids)
+            if self._removed:
+                ids = ids[~np.isin(ids, np.fromiter(self._removed, dtype="int64"))]
+            return ids
+
+    def describe(self):
+        """Index type, sizes and on-disk state, for inspection tools and the consistency check."""
+        with self._lock:
+            if self._index is None:
+                return {"kind": None, "ntotal": 0}
+            log_bytes = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+            return {
+                "kind": index_kind(self._index),
+                "ntotal": self.ntotal,
+                "dim": self._index.d,
+                "snapshot_rows": len(self._snapshot_ids),
+                "vector_log_rows": log_bytes // (4 * self._index.d),
+                "pending_rows": self.pending_rows,
+                "removed_rows": len(self._removed),
+                "next_id": self._next_id,
+                "version": self.version,
+            }
+
+    def metadata(self):
+        """Returns the metadata entries of every stored vector, in id order."""
+        return [entry for _, entry in self.meta.all()]
+
+    def search(self, query_embeddings, top_k, refresh=True):
+        """
+        Searches the in-memory index with the normalized query vectors.
+        Returns (D, I, meta) where D holds cosine similarities (best first) and meta maps
+        each returned id to its metadata entry (deleted ids are missing).
+        refresh=False skips the sync with disk, for callers that have just refreshed.
+        """
+        query_embeddings = normalize_vectors(query_embeddings)
+        with self._lock:
+            available = self.refresh() if refresh else self._index is not None
+            if not available:
+                raise FileNotFoundError("No embeddings index found.")
+            hidden = self._hidden_ids()
+            D, I = self._index.search(query_embeddings, top_k + len(hidden))
+        if hidden:
+            D, I = _drop_hidden(D, I, hidden, top_k)
+        return D, I, self.meta.get(set(I.ravel().tolist()))
+
+    def _write_snapshot(self, vectors):
+        """
+        Writes the in-memory index as the new snapshot and empties the WAL.
+        vectors are all stored vectors (one row per index id), written as the vector log.
+        Each file is written to a temporary name and renamed into place; the vector log
+        goes first, so a crash in between leaves a log longer than the old snapshot,
+        of which only the first rows are read.
+        """
+        _atomic_replace(self.vectors_path, lambda p: np.ascontiguousarray(vectors, dtype="float32").tofile(p))
+        _atomic_replace(self.index_path, lambda p: faiss.write_index(self._index, p))
+        vector_wal.truncate(self.wal_path)
+        self._signature = self._disk_signature()
+        self._reset_snapshot_state()
+        self.generation += 1
+
+    def _snapshot_vectors(self):
+        """Rows of the snapshot (lined up with _snapshot_ids) from the vector log or the index."""
+        vectors = read_vectors(self.vectors_path, self._index.d)
+        n = len(self._snapshot_ids)
+        if vectors.shape[0] >= n:
+            return vectors[:n]
+        # Indexes created before the log existed; the log is written at the next compaction
+        if index_kind(self._index) == "ivfpq":
+            raise RuntimeError("Vector log does not match the IVF-PQ index; re-ingest to rebuild it.")
+        if not has_id_map(self._index):
+            return self._index.reconstruct_n(0, n)
+        rows = np.zeros((n, self._index.d), dtype="float32")
+        for row, vector_id in enumerate(self._snapshot_ids.tolist()):
+            if vector_id not in self._removed:
+                rows[row] = self._index.reconstruct(vector_id)
+        return rows
+
+    def live_vectors(self):
+        """
+        Returns (ids, vectors) of every stored vector that has not been removed, in id
+        order: the snapshot's vector log followed by the rows replayed from the WAL.
+        """
+        with self._lock:
+            if self._index is None:
+                return None, None
+            ids = np.concatenate([self._snapshot_ids] + self._wal_ids)
+            vectors = np.vstack([self._snapshot_vectors()] + self._wal_vectors)
+            if self._removed:
+                keep = ~np.isin(ids, np.fromiter(self._removed, dtype="int64"))
+                ids, vectors = ids[keep], vectors[keep]
+            return ids, vectors
+
+    def all_vectors(self):
+        """Returns every stored vector that has not been removed (float32, in id order)."""
+        return self.live_vectors()[1]
+
+    def vectors(self, ids):
+        """
+        Returns the stored (normalized) vectors of the given index ids, one row per id:
+        snapshot rows are read from the memory-mapped vector log, newer rows from the
+        replayed WAL. Rows that cannot be recovered (unknown ids, IVF-PQ without a log)
+        are zeros.
+        """
+        with self._lock:
+            if self._index is None:
+                return None
+            dim = self._index.d
+            rows = np.zeros((len(ids), dim), dtype="float32")
+            log = None
+            if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) > 0:
+                log = np.memmap(self.vectors_path, dtype="float32", mode="r").reshape(-1, dim)
+            wal_ids = np.concatenate(self._wal_ids) if self._wal_ids else np.zeros(0, dtype="int64")
+            wal = np.vstack(self._wal_vectors) if self._wal_vectors else None
+            for row, vector_id in enumerate(int(i) for i in ids):
+                if vector_id in self._removed:
+                    continue
+                pos = _position(self._snapshot_ids, vector_id)
+                if pos is not None and log is not None and pos < log.shape[0]:
+                    rows[row] = log[pos]
+                    continue
+                wal_pos = _position(wal_ids, vector_id)
+                if wal_pos is not None:
+                    rows[row] = wal[wal_pos]
+                elif pos is not None and index_kind(self._index) != "ivfpq":
+                    rows[row] = self._index.reconstruct(vector_id if has_id_map(self._index) else pos)
+            return rows
+
+    def _compact_locked(self):
+        ids, vectors = self.live_vectors()
+        target = choose_index_kind(len(vectors))
+        if target != index_kind(self._index) or self._removed:
+            # Removed vectors are dropped for good by building the index from the live rows
+            if target != index_kind(self._index):
+                logging.warning(f"Rebuilding FAISS index as {target} for {len(vectors)} vectors")
+            self._index = build_index(vectors, target, ids)
+        self._write_snapshot(vectors)
+
+    def compact(self):
+        """
+        Folds pending WAL records into a new snapshot (switching index type if the size
+        now calls for it, dropping removed vectors). Returns the number of rows compacted.
+        """
+        with self._lock:
+            with file_lock(self.lock_path):
+                if not self._sync(exclusive=True):
+                    return 0
+                pending = self.pending_rows + len(self._removed)
+                if pending:
+                    self._compact_locked()
+                return pending
+
+    def add(self, embeddings, entries, texts=None):
+        """
+        Stores the metadata entries and appends the embeddings to the WAL under the
+        exclusive file lock, applying them in memory as well. Picks up writes from other
+        workers first so ids stay in order. Compacts once enough rows are pending.
+        texts (the embedded chunk texts) are added to the BM25 index with the metadata.
+        Returns the new index size.
+        """
+        with self._lock:
+            embeddings = normalize_vectors(embeddings)
+            with file_lock(self.lock_path):
+                if not self._sync(exclusive=True):
+                    # First write: create the snapshot directly
+                    self.meta.truncate_from(0)
+                    self.meta.add(0, entries, texts)
+                    self._index = build_index(embeddings, choose_index_kind(len(embeddings)))
+                    self._write_snapshot(embeddings)
+                    return self.ntotal
+
+                first_id = self._next_id
+                # Drop metadata rows and a torn WAL record left by a writer that crashed mid-add
+                self.meta.truncate_from(first_id)
+                self._truncate_torn_wal()
+                # Metadata first: the vectors only become visible once the WAL record exists
+                self.meta.add(first_id, entries, texts)
+                vector_wal.append_record(self.wal_path, first_id, embeddings)
+                self._replay_wal()
+                self._compact_if_due()
+                return self.ntotal
+
+    def remove(self, ids):
+        """
+        Removes the vectors with the given ids and their metadata (unknown ids are
+        ignored). The removal is logged in the WAL, so every worker applies it, and the
+        vectors are dropped from the snapshot at the next compaction.
+        Returns the number of vectors removed.
+        """
+        ids = sorted({int(i) for i in ids})
+        if not ids:
+            return 0
+        with self._lock:
+            with file_lock(self.lock_path):
+                if not self._sync(exclusive=True):
+                    return 0
+                stored = np.concatenate([self._snapshot_ids] + self._wal_ids)
+                present = [i for i in ids if i not in self._removed and _position(stored, i) is not None]
+                # Metadata first: search skips ids without metadata straight away
+                self.meta.delete(ids)
+                if present:
+                    self._truncate_torn_wal()
+                    vector_wal.append_removal(self.wal_path, present)
+                    self._replay_wal()
+                    self._compact_if_due()
+                return len(present)
+
+    def _truncate_torn_wal(self):
+        if vector_wal.wal_size(self.wal_path) > self._wal_offset:
+            vector_wal.truncate(self.wal_path, self._wal_offset)
+
+    def _compact_if_due(self):
+        pending = self.pending_rows + len(self._removed)
+        if pending >= WAL_COMPACT_ROWS or choose_index_kind(self.ntotal) != index_kind(self._index):
+            self._compact_locked()
+
+    def rebuild(self, kind=None):
+        """
+        Rebuilds (and trains, if needed) the index from the stored vectors and writes
+        it as a new snapshot. kind is "flat", "hnsw", "ivfpq" or None for the
+        configured/automatic choice. Returns the resulting index type.
+        """
+        with self._lock:
+            with file_lock(self.lock_path):
+                if not self._sync(exclusive=True):
+                    raise FileNotFoundError("No embeddings index found.")
+                ids, vectors = self.live_vectors()
+                target = choose_index_kind(len(vectors), kind)
+                self._index = build_index(vectors, target, ids)
+                self._write_snapshot(vectors)
+                logging.warning(f"FAISS index rebuilt as {target} ({self._index.ntotal} vectors)")
+                return target
+
+    def rebuild_online(self, kind=None, attempts=3):
+        """
+        Same result as rebuild() without blocking searches while the index is built:
+        the live vectors are copied under the shared lock, the new index is built with
+        no lock held (searches keep using the current one), then it catches up with the
+        vectors added and removed in the meantime and is swapped in under the exclusive
+        lock. Removals that the new index type cannot apply in place (HNSW, IVF-PQ)
+        start another attempt; the last attempt rebuilds under the lock.
+        Returns the resulting index type.
+        """
+        with self._rebuild_lock:
+            for attempt in range(1, attempts + 1):
+                with self._lock:
+                    with file_lock(self.lock_path, shared=True):
+                        if not self._sync():
+                            raise FileNotFoundError("No embeddings index found.")
+                        ids, vectors = self.live_vectors()
+                target = choose_index_kind(len(vectors), kind)
+                start = time.perf_counter()
+                index = build_index(vectors, target, ids)
+                build_seconds = time.perf_counter() - start
+
+                with self._lock:
+                    with file_lock(self.lock_path):
+                        if not self._sync(exclusive=True):
+                            raise FileNotFoundError("No embeddings index found.")
+                        current_ids, current_vectors = self.live_vectors()
+                        added = ~np.isin(current_ids, ids)
+                        removed = ids[~np.isin(ids, current_ids)]
+                        if len(removed) and not supports_remove(index):
+                            if attempt < attempts:
+                                logging.warning(f"{len(removed)} vectors removed during the rebuild; building again")
+                                continue
+                            index = build_index(current_vectors, target, current_ids)
+                        else:
+                            if added.any():
+                                index.add_with_ids(current_vectors[added], current_ids[added])
+                            if len(removed):
+                                index.remove_ids(removed)
+                        order = index_ids(index)
+                        if np.any(np.diff(order) < 0):
+                            index = build_index(current_vectors, target, current_ids)
+                            order = current_ids
+                        self._index = index
+                        self._write_snapshot(_aligned(current_vectors, current_ids, order))
+                        logging.warning(
+                            f"FAISS index rebuilt online as {target} ({self._index.ntotal} vectors, "
+                            f"built in {build_seconds:.2f}s, caught up {int(added.sum())} added / {len(removed)} removed)"
+                        )
+                        return target
+
+
+def _position(sorted_ids, vector_id):
+    """Position of vector_id in an ascending id array, or None if it is not there."""
+    pos = int(np.searchsorted(sorted_ids, vector_id))
+    return pos if pos < len(sorted_ids) and sorted_ids[pos] == vector_id else None
+
+
+def _drop_hidden(D, I, hidden, top_k):
+    """Removes hidden ids from each result row and cuts the rows back to top_k (padded with -1)."""
+    keep = ~np.isin(I, np.fromiter(hidden, dtype="int64"))
+    D_out = np.full((I.shape[0], top_k), -np.inf, dtype="float32")
+    I_out = np.full((I.shape[0], top_k), -1, dtype="int64")
+    for row in range(I.shape[0]):
+        found = np.flatnonzero(keep[row])[:top_k]
+        D_out[row, :len(found)] = D[row, found]
+        I_out[row, :len(found)] = I[row, found]
+    return D_out, I_out
+
+
+def _aligned(vectors, ids, order):
+    """Rows of vectors (lined up with ascending ids) in the id order of an index."""
+    return vectors[np.searchsorted(ids, order)]
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_index_manager(index_path, meta_path):
+    """
+    Returns the process-wide IndexManager for the given files, creating it on first use.
+    """
+    key = (os.path.abspath(index_path), os.path.abspath(meta_path))
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = IndexManager(index_path, meta_path)
+            _managers[key] = manager
+        return manager
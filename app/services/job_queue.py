@@ -0,0 +1,409 @@
+# === File: app/services/job_queue.py ===
+# Durable SQLite-backed job queue and a local worker pool for slow agent generations
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs.sqlite3"))
+# Worker threads per process; 0 leaves the queue to scripts/job_worker.py
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A job still running after this long without a progress report is assumed lost
+# (worker killed) and handed to another worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+# How often idle workers look for jobs submitted by other processes
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+
+STATUSES = ("queued", "running", "succeeded", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    result      TEXT,
+    error       TEXT,
+    progress    TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    worker      TEXT,
+    lease_until REAL,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs(status, created_at);
+"""
+
+
+class JobPayloadError(ValueError):
+    """Raised by handlers for payloads a retry cannot fix: the job fails without being requeued."""
+
+
+def _row_to_job(row, include_payload=False):
+    job = {
+        "id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+    }
+    if row["status"] == "succeeded":
+        job["result"] = json.loads(row["result"]) if row["result"] is not None else None
+    if row["error"]:
+        job["error"] = row["error"]
+    if row["progress"] and row["status"] == "running":
+        job["progress"] = json.loads(row["progress"])
+    if include_payload:
+        job["payload"] = json.loads(row["payload"])
+    return job
+
+
+class JobQueue:
+    """
+    Jobs live in an SQLite table, so they survive restarts and are shared by every
+    gunicorn worker. A worker claims the oldest queued job in one IMMEDIATE transaction
+    and holds a lease on it; jobs whose lease ran out (worker killed mid-job) are
+    claimed again until JOB_MAX_ATTEMPTS is reached.
+    """
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "progress" not in columns:  # queue files created before progress reporting
+                conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def submit(self, kind, payload):
+        """Queues a job and returns its id."""
+        job_id = uuid.uuid4().hex
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(payload), time.time())
+        )
+        return job_id
+
+    def claim(self, worker_id):
+        """
+        Marks the oldest runnable job as running for worker_id and returns
+        (id, kind, payload), or None if there is nothing to do. Jobs whose lease ran
+        out with no attempts left are marked failed instead.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Lease expired (worker lost) after ' || attempts || ' attempts', "
+                "lease_until = NULL, finished_at = ? "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, JOB_MAX_ATTEMPTS)
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND lease_until < ? AND attempts < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now, JOB_MAX_ATTEMPTS)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, progress = NULL, "
+                "started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker_id, now + JOB_LEASE_SECONDS, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row["id"], row["kind"], json.loads(row["payload"])
+
+    def heartbeat(self, job_id, worker_id, progress=None):
+        """Extends the lease of a running job and stores its progress (any JSON value)."""
+        self._connection().execute(
+            "UPDATE jobs SET lease_until = ?, progress = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + JOB_LEASE_SECONDS, json.dumps(progress), job_id, worker_id)
+        )
+
+    def complete(self, job_id, worker_id, result):
+        """
+        Records the result of a job claimed by worker_id. Returns False (and changes
+        nothing) if the lease expired and another worker has claimed the job since.
+        """
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, lease_until = NULL, "
+            "finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (json.dumps(result), time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """
+        Records a failure of a job claimed by worker_id; the job is queued again while
+        attempts remain, unless retry is False. Returns False if another worker has
+        claimed the job since.
+        """
+        max_attempts = JOB_MAX_ATTEMPTS if retry else 0
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+            "error = ?, lease_until = NULL, "
+            "finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (max_attempts, error, max_attempts, time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def get(self, job_id, include_payload=False):
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row, include_payload) if row else None
+
+    def list(self, status=None, limit=50):
+        if status:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def stats(self):
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+
+# --- Job handlers: kind -> function(payload) returning a JSON-serializable result ---
+
+def _seo_article(payload):
+    from app.services.seo_generator import run_seo_agent
+    result = run_seo_agent(payload)
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(result["error"])
+    # generate_content returns None when the LLM call fails; retry instead of storing an empty article
+    if not result.get("content"):
+        raise RuntimeError("SEO generation returned no content")
+    return result
+
+
+def _content_generator(payload):
+    from app.services.content_agent import agentic_content_generator
+    if payload.get("use_agentic"):
+        return agentic_content_generator({k: v for k, v in payload.items() if k != "use_agentic"})
+    return _seo_article(payload)
+
+
+def _marketing_post(payload):
+    from app.services.marketing_agent import generate_marketing_post
+    topic = payload.get("topic")
+    if not topic:
+        raise JobPayloadError("Missing topic")
+    post = generate_marketing_post(
+        topic, payload.get("style", "Engaging"), payload.get("length", "Short"),
+        no_cache=bool(payload.get("no_cache"))
+    )
+    result = {"post": post}
+    if payload.get("google_doc", True):
+        from app.services.google_docs import create_google_doc
+        try:
+            result["doc_url"] = create_google_doc(f"WB WHITE INSURANCE - {topic}", post)
+        except Exception as e:
+            logging.error(f"Google Docs error: {e}")
+            result["doc_error"] = f"Google Docs error: {e}"
+    return result
+
+
+def _seo_batch(payload):
+    from app.services.batch_generator import run_batch
+    options = {k: payload[k] for k in ("concurrency", "requests_per_minute", "tokens_per_minute", "embed") if k in payload}
+    total = len(payload.get("payloads") or [])
+    result = run_batch(
+        payload.get("payloads"),
+        on_progress=lambda done, item: report_progress({"done": done, "total": total}),
+        **options
+    )
+    if "error" in result:
+        raise JobPayloadError(result["error"])
+    return result
+
+
+def _reindex(payload):
+    from app.services.ann_index import INDEX_KINDS
+    from app.services.embedding_store import get_store
+    kind = payload.get("kind") or "auto"
+    if kind not in INDEX_KINDS + ("auto",):
+        raise JobPayloadError(f"Unknown index type '{kind}'")
+    store = get_store()
+    start = time.perf_counter()
+    built = store.rebuild_online(None if kind == "auto" else kind)
+    return {"kind": built, "vectors": store.ntotal, "seconds": round(time.perf_counter() - start, 2)}
+
+
+JOB_HANDLERS = {
+    "seo_article": _seo_article,
+    "content_generator": _content_generator,
+    "marketing_post": _marketing_post,
+    "seo_batch": _seo_batch,
+    "reindex": _reindex,
+}
+
+# The job the current worker thread is running: (queue, job id, worker id, last heartbeat)
+_current = threading.local()
+
+
+def report_progress(progress, min_interval=1.0):
+    """
+    Called by handlers of long jobs: records progress and renews the job's lease,
+    at most once per min_interval seconds. Does nothing outside a job worker.
+    """
+    job = getattr(_current, "job", None)
+    if job is None:
+        return
+    job_queue, job_id, worker_id, last = job
+    now = time.monotonic()
+    if now - last < min_interval:
+        return
+    _current.job = (job_queue, job_id, worker_id, now)
+    try:
+        job_queue.heartbeat(job_id, worker_id, progress)
+    except sqlite3.Error as e:
+        logging.error(f"Could not record progress of job {job_id}: {e}")
+
+
+class JobWorkerPool:
+    """
+    Worker threads that claim jobs from the queue and run their handlers. LLM and
+    Google API calls are network-bound, so threads are enough; a submit in this process
+    wakes an idle worker immediately, jobs from other processes are found by polling.
+    """
+
+    def __init__(self, job_queue, size=JOB_WORKERS, handlers=None):
+        self.queue = job_queue
+        self.size = size
+        self.handlers = handlers or JOB_HANDLERS
+        self._wake = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker threads once per process (threads do not survive fork())."""
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            self._pid = os.getpid()
+            self._threads = []
+            for i in range(self.size):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        while True:
+            try:
+                if not self.run_one(worker_id):
+                    self._wake.wait(JOB_POLL_SECONDS)
+                    self._wake.clear()
+            except Exception as e:
+                logging.error(f"Job worker error: {e}")
+                time.sleep(JOB_POLL_SECONDS)
+
+    def run_one(self, worker_id):
+        """Claims and runs one job. Returns False if the queue was empty."""
+        claimed = self.queue.claim(worker_id)
+        if claimed is None:
+            return False
+        job_id, kind, payload = claimed
+        handler = self.handlers.get(kind)
+        start = time.perf_counter()
+        _current.job = (self.queue, job_id, worker_id, 0.0)
+        try:
+            if handler is None:
+                raise JobPayloadError(f"Unknown job kind '{kind}'")
+            result = handler(payload)
+            if self.queue.complete(job_id, worker_id, result):
+                logging.info(f"Job {job_id} ({kind}) finished in {time.perf_counter() - start:.1f}s")
+            else:
+                logging.warning(f"Job {job_id} ({kind}) finished after its lease was taken over; result dropped")
+        except Exception as e:
+            logging.error(f"Job {job_id} ({kind}) failed: {e}")
+            if not self.queue.fail(job_id, worker_id, str(e), retry=not isinstance(e, JobPayloadError)):
+                logging.warning(f"Job {job_id} ({kind}) failed after its lease was taken over; failure not recorded")
+        finally:
+            _current.job = None
+        return True
+
+
+_queue = None
+_pool = None
+_init_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _queue
+    with _init_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def get_worker_pool():
+    """Returns the process-wide worker pool, started on first use (unless JOB_WORKERS=0)."""
+    global _pool
+    job_queue = get_job_queue()
+    with _init_lock:
+        if _pool is None:
+            _pool = JobWorkerPool(job_queue)
+    if _pool.size > 0:
+        _pool.start()
+    return _pool
+
+
+def submit_job(kind, payload):
+    """
+    Queues a job of a known kind and wakes a local worker.
+    Returns the job id, or {"error": ...} for an unknown kind.
+    """
+    if kind not in JOB_HANDLERS:
+        return {"error": f"Unknown job kind '{kind}'. Known kinds: {', '.join(sorted(JOB_HANDLERS))}"}
+    job_id = get_job_queue().submit(kind, payload)
+    get_worker_pool().notify()
+    return job_id
+
+
+def wants_background(payload, args):
+    """
+    True if the client asked for the work to run as a background job, via
+    {"async": true} in the JSON payload or ?async=1 in the query string.
+    """
+    if isinstance(payload, dict) and payload.get("async") is True:
+        return True
+    return str(args.get("async", "")).lower() in ("1", "true", "yes")
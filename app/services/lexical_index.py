@@ -0,0 +1,60 @@
+# === File: app/services/lexical_index.py ===
+# BM25 side of hybrid retrieval: query terms, FTS5 match queries, recall check and rank fusion
+
+import os
+import re
+
+# "hybrid" fuses BM25 and vector hits, "vector" is FAISS only, "lexical" is BM25 only
+# (no embeddings request at all)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")
+# Candidates taken from each retriever before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# Reciprocal-rank fusion constant: higher values flatten the advantage of top ranks
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+SEARCH_MODES = ("hybrid", "vector", "lexical")
+
+# Same token rule as the FTS5 tokenizer (unicode61 with "&" as a token character)
+_TOKEN = re.compile(r"[\w&]+")
+
+STOPWORDS = frozenset("""
+a about an and are as at be by can could do does for from how i if in is it me my of on or
+our should that the their there this to under we what when where which who why will with
+would you your
+""".split())
+
+
+def query_terms(text):
+    """Lowercased, de-duplicated query tokens without stopwords, in query order."""
+    terms = []
+    for token in _TOKEN.findall((text or "").lower()):
+        if token not in STOPWORDS and token not in terms and token.strip("&_"):
+            terms.append(token)
+    return terms
+
+
+def match_query(terms):
+    """FTS5 query matching any of the terms; each term is quoted so no operators leak in."""
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def term_coverage(terms, texts):
+    """Fraction of terms that occur in at least one of texts (0.0 when there are no terms)."""
+    if not terms:
+        return 0.0
+    found = set()
+    for text in texts:
+        found.update(_TOKEN.findall(text.lower()))
+    return sum(1 for term in terms if term in found) / len(terms)
+
+
+def rrf_fuse(ranked_id_lists, k=RRF_K):
+    """
+    Reciprocal-rank fusion: each list contributes 1 / (k + rank) to the ids it ranks.
+    Returns [(id, fused score)], best first.
+    """
+    scores = {}
+    for ids in ranked_id_lists:
+        for rank, doc_id in enumerate(ids, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,14 +1,35 @@
-import openai
+import asyncio
+from app.services.generation_cache import make_key, cached_lookup, cached_store
+from models.openai_client import chat_completion, chat_completion_async, DEFAULT_MODEL
 
-def generate_marketing_post(topic, style="Engaging", length="Short"):
-    prompt = f"""You are a creative marketing assistant for WB WHITE INSURANCE.
+def build_marketing_prompt(topic, style="Engaging", length="Short"):
+    return f"""You are a creative marketing assistant for WB WHITE INSURANCE.
 Generate a {length.lower()} social media post about: "{topic}".
 Make it engaging, professional, and include a call to action.
 Always mention WB WHITE INSURANCE as the company.
 Style: {style}
 """
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message.content.strip()
\ No newline at end of file
+
+def _generation_key(prompt):
+    return make_key("marketing_post", prompt, model=DEFAULT_MODEL)
+
+def generate_marketing_post(topic, style="Engaging", length="Short", no_cache=False):
+    prompt = build_marketing_prompt(topic, style, length)
+    key = _generation_key(prompt)
+    cached = cached_lookup(key, bypass=no_cache)
+    if cached is not None:
+        return cached
+    post = chat_completion(prompt).strip()
+    cached_store(key, post)
+    return post
+
+async def generate_marketing_post_async(topic, style="Engaging", length="Short", no_cache=False):
+    prompt = build_marketing_prompt(topic, style, length)
+    key = _generation_key(prompt)
+    cached = await asyncio.to_thread(cached_lookup, key, no_cache)
+    if cached is not None:
+        return cached
+    content = await chat_completion_async(prompt)
+    post = content.strip()
+    await asyncio.to_thread(cached_store, key, post)
+    return post
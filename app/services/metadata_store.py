@@ -0,0 +1,290 @@
+# === File: app/services/metadata_store.py ===
+# SQLite store for the metadata of every FAISS vector, keyed by FAISS id
+
+import os
+import pickle
+import sqlite3
+import logging
+import threading
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    id        INTEGER PRIMARY KEY,  -- FAISS id
+    file      TEXT NOT NULL,
+    topic     TEXT NOT NULL,
+    chunk     INTEGER,              -- NULL for whole-file entries from before chunking
+    start_pos INTEGER,
+    end_pos   INTEGER
+);
+CREATE INDEX IF NOT EXISTS vectors_file ON vectors(file);
+CREATE INDEX IF NOT EXISTS vectors_topic ON vectors(topic);
+CREATE TABLE IF NOT EXISTS documents (
+    file         TEXT PRIMARY KEY,      -- one row per embedded file, for deduplication
+    version_key  TEXT NOT NULL,         -- topic part of the filename, shared by its versions
+    stamp        TEXT,                  -- YYYYMMDDHHMMSS from the filename
+    content_hash TEXT NOT NULL,
+    minhash      BLOB NOT NULL          -- uint64 MinHash signature
+);
+CREATE INDEX IF NOT EXISTS documents_hash ON documents(content_hash);
+"""
+
+# Full-text (BM25) index of the chunk texts, rowid = FAISS id. "&" is kept inside
+# tokens so terms like "D&O" stay searchable. Needs SQLite built with FTS5.
+_TEXT_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_text USING fts5(text, tokenize="unicode61 tokenchars '&'");
+"""
+
+_COLUMNS = "id, file, topic, chunk, start_pos, end_pos"
+
+
+def _entry(row):
+    """Turns a (id, file, topic, chunk, start, end) row into the metadata dict used by search."""
+    entry = {"file": row[1], "topic": row[2]}
+    if row[3] is not None:
+        entry["chunk"] = row[3]
+        entry["start"] = row[4]
+        entry["end"] = row[5]
+    return entry
+
+
+class MetadataStore:
+    """
+    Metadata of the FAISS vectors (file, topic, chunk offsets) in an SQLite table whose
+    primary key is the FAISS id, so a search looks up only the ids it returned instead
+    of loading the whole metadata list. Lookups by file and topic use secondary indexes.
+    The chunk texts are kept in an FTS5 table under the same ids for BM25 search, and
+    every embedded file has a fingerprint row (content hash, MinHash) for deduplication.
+
+    The database runs in WAL journal mode so gunicorn workers can read while another
+    worker writes. One connection is kept per process and reopened after a fork.
+    """
+
+    def __init__(self, path, legacy_pickle_path=None):
+        self.path = path
+        self.legacy_pickle_path = legacy_pickle_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self.lexical_available = False
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            try:
+                conn.executescript(_TEXT_SCHEMA)
+                self.lexical_available = True
+            except sqlite3.OperationalError as e:
+                logging.warning(f"SQLite FTS5 not available, BM25 search disabled: {e}")
+            self._conn = conn
+            self._pid = os.getpid()
+            self._import_legacy_pickle()
+        return self._conn
+
+    def _import_legacy_pickle(self):
+        """
+        One-time migration from the old faiss_meta.pkl list: list position is the FAISS id.
+        The pickle is our own file; after import it is renamed to .bak and never loaded again.
+        """
+        path = self.legacy_pickle_path
+        if not path or path == self.path or not os.path.exists(path):
+            return
+        if self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == 0:
+            with open(path, "rb") as meta_f:
+                meta = pickle.load(meta_f)
+            self._insert(0, meta)
+            logging.warning(f"Imported {len(meta)} metadata entries from {path}")
+        try:
+            os.replace(path, path + ".bak")
+        except FileNotFoundError:
+            pass  # another worker migrated it first
+
+    def _insert(self, first_id, entries, texts=None):
+        rows = [
+            (first_id + i, e["file"].replace("\\", "/"), e["topic"], e.get("chunk"), e.get("start"), e.get("end"))
+            for i, e in enumerate(entries)
+        ]
+        with self._conn:
+            self._conn.executemany(f"INSERT OR REPLACE INTO vectors ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+            if texts is not None and self.lexical_available:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunk_text (rowid, text) VALUES (?, ?)",
+                    [(first_id + i, text) for i, text in enumerate(texts)]
+                )
+
+    def add(self, first_id, entries, texts=None):
+        """
+        Stores entries under consecutive FAISS ids starting at first_id. texts, if given,
+        are the chunk texts (lined up with entries) for the BM25 index.
+        """
+        with self._lock:
+            self._connection()
+            self._insert(first_id, entries, texts)
+
+    def add_texts(self, pairs):
+        """Indexes (id, text) pairs for BM25 search (backfill of entries stored without text)."""
+        with self._lock:
+            conn = self._connection()
+            if not self.lexical_available:
+                return 0
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO chunk_text (rowid, text) VALUES (?, ?)", pairs)
+            return len(pairs)
+
+    def missing_texts(self):
+        """Returns [(id, entry)] of entries that have no text in the BM25 index."""
+        with self._lock:
+            conn = self._connection()
+            if not self.lexical_available:
+                return []
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM vectors WHERE id NOT IN (SELECT rowid FROM chunk_text) ORDER BY id"
+            ).fetchall()
+        return [(row[0], _entry(row)) for row in rows]
+
+    def lexical_search(self, match_query, limit):
+        """
+        Runs an FTS5 MATCH query and returns [(id, bm25 score, text)], best first.
+        Scores are positive (higher is better). Returns [] without FTS5.
+        """
+        with self._lock:
+            conn = self._connection()
+            if not self.lexical_available or not match_query:
+                return []
+            rows = conn.execute(
+                "SELECT rowid, bm25(chunk_text), text FROM chunk_text WHERE chunk_text MATCH ? "
+                "ORDER BY bm25(chunk_text) LIMIT ?",
+                (match_query, limit)
+            ).fetchall()
+        return [(row[0], -row[1], row[2]) for row in rows]
+
+    def put_documents(self, docs):
+        """Stores (or replaces) the fingerprints of embedded files (see dedup.fingerprint)."""
+        rows = [
+            (d["file"].replace("\\", "/"), d["version_key"], d["stamp"], d["content_hash"],
+             np.asarray(d["minhash"], dtype="uint64").tobytes())
+            for d in docs
+        ]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)", rows)
+
+    def documents(self):
+        """Returns {file: fingerprint} of every embedded file that has one."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT file, version_key, stamp, content_hash, minhash FROM documents"
+            ).fetchall()
+        return {
+            row[0]: {"file": row[0], "version_key": row[1], "stamp": row[2], "content_hash": row[3],
+                     "minhash": np.frombuffer(row[4], dtype="uint64")}
+            for row in rows
+        }
+
+    def files_without_documents(self):
+        """Files with stored vectors but no fingerprint (embedded before deduplication existed)."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT DISTINCT file FROM vectors WHERE file NOT IN (SELECT file FROM documents) ORDER BY file"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, ids):
+        """Returns {id: entry} for the given FAISS ids; unknown or deleted ids are absent."""
+        ids = [int(i) for i in ids if i >= 0]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {_COLUMNS} FROM vectors WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {row[0]: _entry(row) for row in rows}
+
+    def _select(self, where="", params=()):
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {_COLUMNS} FROM vectors {where} ORDER BY id", params
+            ).fetchall()
+        return [(row[0], _entry(row)) for row in rows]
+
+    def by_file(self, file):
+        """Returns [(id, entry)] for every chunk of file."""
+        return self._select("WHERE file = ?", (file.replace("\\", "/"),))
+
+    def by_topic(self, topic):
+        """Returns [(id, entry)] for every vector stored under topic."""
+        return self._select("WHERE topic = ?", (topic,))
+
+    def all(self):
+        """Returns [(id, entry)] for every stored vector, in id order."""
+        return self._select()
+
+    def files(self):
+        """Returns the distinct files that have stored vectors."""
+        with self._lock:
+            rows = self._connection().execute("SELECT DISTINCT file FROM vectors ORDER BY file").fetchall()
+        return [row[0] for row in rows]
+
+    def topics(self):
+        """Returns (topic, vector count) pairs."""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT topic, COUNT(*) FROM vectors GROUP BY topic ORDER BY topic"
+            ).fetchall()
+
+    def count(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def delete(self, ids):
+        """
+        Deletes the entries of the given ids (and the fingerprints of files left without
+        entries). Returns the number of rows removed.
+        """
+        ids = [int(i) for i in ids]
+        if not ids:
+            return 0
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if self.lexical_available:
+                    conn.execute(f"DELETE FROM chunk_text WHERE rowid IN ({placeholders})", ids)
+                removed = conn.execute(f"DELETE FROM vectors WHERE id IN ({placeholders})", ids).rowcount
+                conn.execute("DELETE FROM documents WHERE file NOT IN (SELECT file FROM vectors)")
+                return removed
+
+    def delete_file(self, file):
+        """Deletes every entry of file. Returns the number of rows removed."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                file = file.replace("\\", "/")
+                if self.lexical_available:
+                    conn.execute("DELETE FROM chunk_text WHERE rowid IN (SELECT id FROM vectors WHERE file = ?)", (file,))
+                conn.execute("DELETE FROM documents WHERE file = ?", (file,))
+                return conn.execute("DELETE FROM vectors WHERE file = ?", (file,)).rowcount
+
+    def rename_file(self, old, new):
+        """Points every entry of file old at new (after the file was moved). Returns the rows updated."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                new, old = new.replace("\\", "/"), old.replace("\\", "/")
+                conn.execute("UPDATE documents SET file = ? WHERE file = ?", (new, old))
+                return conn.execute("UPDATE vectors SET file = ? WHERE file = ?", (new, old)).rowcount
+
+    def truncate_from(self, first_id):
+        """Deletes entries with id >= first_id (left over by a write that never reached the index)."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if self.lexical_available:
+                    conn.execute("DELETE FROM chunk_text WHERE rowid >= ?", (first_id,))
+                return conn.execute("DELETE FROM vectors WHERE id >= ?", (first_id,)).rowcount
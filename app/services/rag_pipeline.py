@@ -0,0 +1,178 @@
+# === File: app/services/rag_pipeline.py ===
+# Query expansion + retrieval + answer generation used by the RAG UI (sync and async)
+
+import os
+import time
+import asyncio
+import logging
+from app.services.embedding_store import (
+    search_embeddings_batch,
+    search_embeddings_batch_async,
+    dedupe_results,
+    lexical_recall,
+)
+from app.services.context_builder import build_context
+from app.services.answer_cache import lookup_answer, lookup_answer_async, store_answer, store_answer_async
+from app.services.reranker import RERANK_CANDIDATES, RERANK_TOP_K, select_results
+from models.openai_client import chat_completion, chat_completion_async
+
+# "auto" skips the LLM query expansion when BM25 already finds the query's terms,
+# "always" expands every query, "never" searches the original query only
+RAG_QUERY_EXPANSION = os.getenv("RAG_QUERY_EXPANSION", "auto")
+# Share of the query terms that its top BM25 hits must contain to skip the expansion
+RAG_EXPANSION_MIN_RECALL = float(os.getenv("RAG_EXPANSION_MIN_RECALL", "0.8"))
+
+
+# --- Prompts ---
+
+def build_expansion_prompt(query):
+    return f"Suggest 3 alternative phrasings or synonyms for this insurance-related question: '{query}'"
+
+def parse_expansions(query, content):
+    suggestions = content.split('\n')
+    return [query] + [s.strip('- ').strip() for s in suggestions if s.strip()]
+
+def build_answer_prompt(context, query):
+    return f"""Use the following context to answer the user's question.
+
+Context:
+{context}
+
+Question: {query}
+Answer:"""
+
+def build_agentic_prompt(context, query):
+    return f"""Use the following context to answer the user's question.
+
+Context:
+{context}
+
+Question: {query}
+Answer the question. If the context is not sufficient, suggest a new search query or ask the user for clarification."""
+
+
+# --- Helpers ---
+
+def _unique_or_empty(results):
+    if isinstance(results, dict) and "error" in results:
+        logging.error(f"RAG search error: {results['error']}")
+        return []
+    return dedupe_results(results)
+
+def _cached_stats(hit):
+    """Context stats for an answer served from the answer cache (no context was built)."""
+    return {"tokens": 0, "files": hit["files"], "cached": True, "similarity": round(hit["similarity"], 4)}
+
+def needs_expansion(query, top_k=RERANK_TOP_K):
+    """
+    Whether the query should go through LLM expansion. In "auto" mode it is skipped when
+    the top BM25 hits already contain enough of the query's terms (a local check).
+    """
+    if RAG_QUERY_EXPANSION == "always":
+        return True
+    if RAG_QUERY_EXPANSION == "never":
+        return False
+    recall = lexical_recall(query, top_k)
+    if recall >= RAG_EXPANSION_MIN_RECALL:
+        logging.info(f"Query expansion skipped (lexical recall {recall:.2f}): {query}")
+        return False
+    return True
+
+
+# --- Sync pipeline (Flask routes) ---
+
+# LLM-powered Query Expansion for RAG
+def expand_query_with_llm(query):
+    return parse_expansions(query, chat_completion(build_expansion_prompt(query)))
+
+def retrieve_expanded(query, top_k=None):
+    """
+    Expands the query (unless needs_expansion says the original query is enough),
+    searches all variants as one batched matrix for RERANK_CANDIDATES candidates each
+    and reranks the unique candidates down to top_k (default RERANK_TOP_K).
+    Returns (results, retrieval stats).
+    """
+    queries = expand_query_with_llm(query) if needs_expansion(query) else [query]
+    start = time.perf_counter()
+    candidates = _unique_or_empty(search_embeddings_batch(queries, top_k=RERANK_CANDIDATES))
+    return select_results(candidates, top_k, time.perf_counter() - start)
+
+def classic_rag(query):
+    """
+    Classic RAG: expand query, retrieve, build context, answer.
+    Returns (answer, retrieved_files, context_stats); retrieved_files are the files
+    that made it into the token-budgeted context. A semantically equivalent earlier
+    query whose sources are unchanged is answered from the answer cache
+    (context_stats["cached"] is then True and no tokens are spent).
+    """
+    hit, query_embedding = lookup_answer("classic", query)
+    if hit:
+        return hit["answer"], hit["files"], _cached_stats(hit)
+    unique_results, retrieval = retrieve_expanded(query)
+    context, stats = build_context(unique_results)
+    stats["retrieval"] = retrieval
+    prompt = build_answer_prompt(context, query)
+    try:
+        rag_answer = chat_completion(prompt)
+    except Exception as e:
+        logging.error(f"OpenAI API error: {e}")
+        rag_answer = f"Exception: {e}"
+    store_answer("classic", query, query_embedding, rag_answer, stats["files"])
+    return rag_answer, stats["files"], stats
+
+# Agentic RAG (LLM self-assessment and suggestion)
+def agentic_rag(query):
+    hit, query_embedding = lookup_answer("agentic-ui", query)
+    if hit:
+        return hit["answer"]
+    unique_results, _ = retrieve_expanded(query)
+    # Build context from all unique results, within the token budget
+    context, stats = build_context(unique_results)
+    # Step 1: Ask LLM for answer and self-assessment
+    answer = chat_completion(build_agentic_prompt(context, query))
+    # Step 2: If LLM suggests a new query or clarification, handle accordingly (loop or ask user)
+    if "suggest" in answer.lower() or "clarify" in answer.lower():
+        # Optionally, repeat retrieval or ask user for more info
+        pass
+    store_answer("agentic-ui", query, query_embedding, answer, stats["files"])
+    return answer
+
+
+# --- Async pipeline (native ASGI routes) ---
+# LLM and embeddings calls are awaited; SQLite, FAISS and file reads run on worker threads
+
+async def expand_query_with_llm_async(query):
+    return parse_expansions(query, await chat_completion_async(build_expansion_prompt(query)))
+
+async def retrieve_expanded_async(query, top_k=None):
+    expand = await asyncio.to_thread(needs_expansion, query)
+    queries = await expand_query_with_llm_async(query) if expand else [query]
+    start = time.perf_counter()
+    candidates = _unique_or_empty(await search_embeddings_batch_async(queries, top_k=RERANK_CANDIDATES))
+    return await asyncio.to_thread(select_results, candidates, top_k, time.perf_counter() - start)
+
+async def classic_rag_async(query):
+    hit, query_embedding = await lookup_answer_async("classic", query)
+    if hit:
+        return hit["answer"], hit["files"], _cached_stats(hit)
+    unique_results, retrieval = await retrieve_expanded_async(query)
+    context, stats = await asyncio.to_thread(build_context, unique_results)
+    stats["retrieval"] = retrieval
+    prompt = build_answer_prompt(context, query)
+    try:
+        rag_answer = await chat_completion_async(prompt)
+    except Exception as e:
+        logging.error(f"OpenAI API error: {e}")
+        rag_answer = f"Exception: {e}"
+    await store_answer_async("classic", query, query_embedding, rag_answer, stats["files"])
+    return rag_answer, stats["files"], stats
+
+async def agentic_rag_async(query):
+    hit, query_embedding = await lookup_answer_async("agentic-ui", query)
+    if hit:
+        return hit["answer"]
+    unique_results, _ = await retrieve_expanded_async(query)
+    context, stats = await asyncio.to_thread(build_context, unique_results)
+    answer = await chat_completion_async(build_agentic_prompt(context, query))
+    await store_answer_async("agentic-ui", query, query_embedding, answer, stats["files"])
+    return answer
@@ -0,0 +1,114 @@
+# === File: app/services/reranker.py ===
+# CPU-only reranking of retrieved chunks before prompt assembly
+
+import os
+import re
+import time
+import logging
+from datetime import datetime
+import numpy as np
+from app.utils.output_catalog import logical_name
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "1") == "1"
+# Candidates fetched per query before reranking, and chunks kept for the prompt
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "4"))
+# Weights of the cosine similarity, the normalized BM25 score and the recency
+RERANK_WEIGHTS = tuple(float(w) for w in os.getenv("RERANK_WEIGHTS", "0.6,0.3,0.1").split(","))
+# Age (from the filename timestamp) at which the recency feature has halved
+RERANK_HALF_LIFE_DAYS = float(os.getenv("RERANK_HALF_LIFE_DAYS", "180"))
+
+_STAMP = re.compile(r"_(\d{8}_\d{6})\.txt$")
+
+
+def file_age_days(path, now=None):
+    """Age of an output file from the timestamp in its name, or None if it has none."""
+    match = _STAMP.search(logical_name(path))
+    if not match:
+        return None
+    try:
+        written = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+    return max(0.0, ((now or datetime.now()) - written).total_seconds() / 86400)
+
+
+def features(results, now=None):
+    """
+    Feature matrix (one row per result): cosine similarity, BM25 score scaled by the
+    best BM25 score among the results, and recency 0.5 ** (age / half life).
+    Missing values count as 0.
+    """
+    matrix = np.zeros((len(results), 3), dtype="float32")
+    for row, r in enumerate(results):
+        # Vector-only searches report the cosine similarity as the score
+        cosine = r["vector_score"] if "vector_score" in r else (r["score"] if "bm25" not in r else None)
+        matrix[row, 0] = cosine or 0.0
+        matrix[row, 1] = r.get("bm25") or 0.0
+        age = file_age_days(r["file"], now)
+        matrix[row, 2] = 0.5 ** (age / RERANK_HALF_LIFE_DAYS) if age is not None else 0.0
+    best_bm25 = matrix[:, 1].max() if len(results) else 0.0
+    if best_bm25 > 0:
+        matrix[:, 1] /= best_bm25
+    return matrix
+
+
+def rerank_batch(result_lists, top_k=None, weights=None):
+    """
+    Reranks several candidate lists in one pass: all candidates are scored with a single
+    matrix product, then each list keeps its top_k (default RERANK_TOP_K).
+    Each kept result gets score = rerank score and retrieval_score = its previous score.
+    Returns (reranked lists, stats) with candidate/kept counts and the time taken.
+    """
+    start = time.perf_counter()
+    top_k = top_k or RERANK_TOP_K
+    weights = np.asarray(weights or RERANK_WEIGHTS, dtype="float32")
+    now = datetime.now()
+    lists = [[r for r in results if isinstance(r, dict) and "file" in r] for results in result_lists]
+    # BM25 is scaled per list, then every candidate is scored together
+    matrices = [features(results, now) for results in lists]
+    all_scores = np.vstack(matrices) @ weights if any(len(m) for m in matrices) else np.zeros(0, dtype="float32")
+    reranked = []
+    offset = 0
+    for results in lists:
+        scores = all_scores[offset:offset + len(results)]
+        offset += len(results)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        reranked.append([
+            {**results[i], "score": float(scores[i]), "retrieval_score": results[i]["score"]}
+            for i in order
+        ])
+    stats = {
+        "candidates": offset,
+        "kept": sum(len(r) for r in reranked),
+        "rerank_seconds": round(time.perf_counter() - start, 4),
+    }
+    return reranked, stats
+
+
+def rerank(results, top_k=None):
+    """Reranks one candidate list; returns (top_k results, stats)."""
+    reranked, stats = rerank_batch([results], top_k)
+    return reranked[0], stats
+
+
+def select_results(results, top_k=None, search_seconds=0.0):
+    """
+    Final selection for a prompt: reranked top_k when RERANK_ENABLED, otherwise the
+    top_k candidates by retrieval score. Logs and returns (results, stats) with the
+    search time included.
+    """
+    if isinstance(results, dict):
+        return results, {"candidates": 0, "kept": 0, "search_seconds": round(search_seconds, 4), "rerank_seconds": 0.0}
+    if not RERANK_ENABLED:
+        candidates = len(results)
+        results = sorted(results, key=lambda r: r["score"], reverse=True)[:top_k or RERANK_TOP_K]
+        stats = {"candidates": candidates, "kept": len(results), "rerank_seconds": 0.0}
+    else:
+        results, stats = rerank(results, top_k)
+    stats["search_seconds"] = round(search_seconds, 4)
+    logging.info(
+        f"Retrieval: {stats['candidates']} candidates -> {stats['kept']} kept, "
+        f"search {stats['search_seconds']}s, rerank {stats['rerank_seconds']}s"
+    )
+    return results, stats
@@ -1,10 +1,20 @@
 # === File: app/services/seo_generator.py ===
 # Main logic to run the SEO and GEO generator agent
-import datetime
+import re
+import asyncio
+from datetime import datetime
 from app.utils.file_writer import write_output_file
-from models.openai_client import generate_content
+from app.services.generation_cache import make_key, cached_lookup, cached_store
+from models.openai_client import (
+    generate_content, generate_content_async, stream_content_async,
+    DEFAULT_MODEL, SYSTEM_PROMPT, SEO_TEMPERATURE,
+)
 
-def run_seo_agent(payload):
+def build_seo_prompt(payload):
+    """
+    Builds the SEO/GEO article prompt from the request payload.
+    Returns (prompt, topic, context).
+    """
     input_data = payload.get("input", {})
 
     # Extract fields from payload
@@ -35,13 +45,13 @@ Your goal is to write a {length.lower()} article in a {style.lower()} tone on th
 **Context:**
 {context}
 """
+    return prompt, topic, context
 
-    # Call OpenAI with the constructed prompt
-    gpt_output = generate_content(prompt)
-
+def save_seo_output(payload, prompt, topic, context, gpt_output):
+    """
+    Writes the generated article to the output store and builds the agent response.
+    """
     # Create a safe filename using the topic, date, and time
-    from datetime import datetime
-    import re
     safe_topic = re.sub(r'[^a-zA-Z0-9_\-]', '_', topic)[:50]  # Remove special chars, limit length
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{safe_topic}_{timestamp}.txt"
@@ -59,5 +69,77 @@ Your goal is to write a {length.lower()} article in a {style.lower()} tone on th
 
     return {
         "content": gpt_output,
-        "download_url": f"/static/outputs/{filename}"
-    }
\ No newline at end of file
+        "download_url": f"/download/{filename}"
+    }
+
+def generation_key(prompt):
+    return make_key("seo_generator", prompt, model=DEFAULT_MODEL, temperature=SEO_TEMPERATURE, system=SYSTEM_PROMPT)
+
+def bypass_cache(payload):
+    # Per-request opt-out: {"no_cache": true} always calls the LLM (the fresh result is still cached)
+    return bool(payload.get("no_cache"))
+
+def run_seo_agent(payload):
+    prompt, topic, context = build_seo_prompt(payload)
+
+    # Identical inputs reuse the stored article and download_url without calling the LLM
+    key = generation_key(prompt)
+    cached = cached_lookup(key, bypass=bypass_cache(payload))
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    # Call OpenAI with the constructed prompt
+    gpt_output = generate_content(prompt)
+
+    result = save_seo_output(payload, prompt, topic, context, gpt_output)
+    if gpt_output:
+        cached_store(key, result)
+    return result
+
+async def run_seo_agent_async(payload):
+    """
+    Async variant of run_seo_agent for the native ASGI routes.
+    The LLM call is awaited on the shared AsyncOpenAI client; only the file write uses a thread.
+    """
+    prompt, topic, context = build_seo_prompt(payload)
+
+    key = generation_key(prompt)
+    cached = await asyncio.to_thread(cached_lookup, key, bypass_cache(payload))
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    gpt_output = await generate_content_async(prompt)
+
+    result = await asyncio.to_thread(save_seo_output, payload, prompt, topic, context, gpt_output)
+    if gpt_output:
+        await asyncio.to_thread(cached_store, key, result)
+    return result
+
+async def stream_seo_agent_async(payload):
+    """
+    Streaming variant of run_seo_agent_async for the native ASGI routes.
+    Yields ("token", text) for each delta as it arrives from the LLM. Once the stream
+    finishes, the assembled article is written to static/outputs and ("done", result)
+    is yielded with the same dict run_seo_agent_async returns; ("error", message) on failure.
+    A cache hit is sent as a single token followed by "done".
+    """
+    prompt, topic, context = build_seo_prompt(payload)
+    key = generation_key(prompt)
+    cached = await asyncio.to_thread(cached_lookup, key, bypass_cache(payload))
+    if cached is not None:
+        yield "token", cached["content"]
+        yield "done", {**cached, "cached": True}
+        return
+
+    parts = []
+    try:
+        async for delta in stream_content_async(prompt):
+            parts.append(delta)
+            yield "token", delta
+    except Exception as e:
+        yield "error", str(e)
+        return
+    result = await asyncio.to_thread(save_seo_output, payload, prompt, topic, context, "".join(parts).strip())
+    if result["content"]:
+        await asyncio.to_thread(cached_store, key, result)
+    yield "done", result
@@ -0,0 +1,93 @@
+# === File: app/services/vector_wal.py ===
+# Append-only write-ahead log of new and removed vectors
+
+import os
+import struct
+import zlib
+import logging
+import numpy as np
+
+# Flush every record to disk before the write is acknowledged
+WAL_FSYNC = os.getenv("FAISS_WAL_FSYNC", "1") == "1"
+
+# magic, base id, rows, dim, crc32 of the payload
+_HEADER = struct.Struct("<4sQIII")
+_MAGIC = b"FWAL"
+# Removal records: rows int64 ids (base and dim are 0)
+_REMOVE_MAGIC = b"FDEL"
+
+
+def append_record(path, base, vectors):
+    """
+    Appends one record: rows of float32 vectors whose first index id is base.
+    The record is written with a single write() call and fsync()ed, so a crash leaves
+    at most one torn record at the end of the file, which read_records ignores.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    vector_bytes = vectors.tobytes()
+    header = _HEADER.pack(_MAGIC, base, vectors.shape[0], vectors.shape[1], zlib.crc32(vector_bytes))
+    _write(path, header + vector_bytes)
+
+
+def append_removal(path, ids):
+    """Appends one record removing the vectors with the given index ids."""
+    id_bytes = np.ascontiguousarray(ids, dtype="int64").tobytes()
+    _write(path, _HEADER.pack(_REMOVE_MAGIC, 0, len(id_bytes) // 8, 0, zlib.crc32(id_bytes)) + id_bytes)
+
+
+def _write(path, record):
+    with open(path, "ab") as f:
+        f.write(record)
+        f.flush()
+        if WAL_FSYNC:
+            os.fsync(f.fileno())
+
+
+def read_records(path, offset=0):
+    """
+    Reads the complete records stored after byte offset.
+    Returns (records, end_offset) where records is a list of ("add", base, vectors)
+    and ("remove", 0, ids) tuples and end_offset is the position just past the last
+    valid record.
+    """
+    records = []
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return records, offset
+
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        magic, base, rows, dim, crc = _HEADER.unpack_from(data, pos)
+        if magic not in (_MAGIC, _REMOVE_MAGIC):
+            break
+        end = pos + _HEADER.size + (rows * dim * 4 if magic == _MAGIC else rows * 8)
+        if end > len(data):
+            break
+        payload = data[pos + _HEADER.size:end]
+        if zlib.crc32(payload) != crc:
+            break
+        if magic == _MAGIC:
+            records.append(("add", base, np.frombuffer(payload, dtype="float32").reshape(rows, dim)))
+        else:
+            records.append(("remove", 0, np.frombuffer(payload, dtype="int64")))
+        pos = end
+
+    if pos < len(data):
+        logging.warning(f"Ignoring {len(data) - pos} bytes of incomplete WAL data in {path}")
+    return records, offset + pos
+
+
+def wal_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def truncate(path, size=0):
+    """Cuts the log back to size bytes (0 after compaction, or to drop a torn tail)."""
+    if os.path.exists(path):
+        os.truncate(path, size)
@@ -0,0 +1,240 @@
+# === File: app/utils/artifacts.py ===
+# One serving path for generated outputs and static files: variant selection
+# (precompressed .br/.gz), strong ETags, conditional requests and byte ranges
+
+import os
+import re
+import mimetypes
+from email.utils import formatdate
+
+import anyio
+from starlette.responses import Response
+
+from app.utils.output_catalog import COMPRESSED_SUFFIXES
+from app.utils.output_store import pending_text, read_output_text
+
+# Offload the body to the front-end proxy: "X-Accel-Redirect" (nginx) or "X-Sendfile"
+# (Apache/lighttpd). Empty serves the file from Python.
+ARTIFACT_SENDFILE_HEADER = os.getenv("ARTIFACT_SENDFILE_HEADER", "")
+# For X-Accel-Redirect: internal nginx location that maps to the project root
+ARTIFACT_ACCEL_PREFIX = os.getenv("ARTIFACT_ACCEL_PREFIX", "/protected/")
+# Cache-Control for /static assets; outputs always revalidate (cheap 304s)
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+
+CHUNK_SIZE = 64 * 1024
+# Precompressed siblings, in order of preference
+_VARIANTS = ((".br", "br"), (".gz", "gzip"))
+_ENCODING_OF = {"gzip": "gzip", "zstd": "zstd"}
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class Artifact:
+    """A file chosen to answer one request: path on disk, Content-Encoding and stat()."""
+
+    def __init__(self, path, encoding, stat_result, content_type):
+        self.path = path
+        self.encoding = encoding
+        self.stat = stat_result
+        self.content_type = content_type
+
+    @property
+    def size(self):
+        return self.stat.st_size
+
+    @property
+    def etag(self):
+        # Strong validator: changes whenever the bytes of this variant change
+        return f'"{self.stat.st_ino:x}-{self.stat.st_mtime_ns:x}-{self.stat.st_size:x}"'
+
+    @property
+    def last_modified(self):
+        return formatdate(self.stat.st_mtime, usegmt=True)
+
+
+def accepted_encodings(accept_encoding):
+    """Parses an Accept-Encoding header into the set of codings with q > 0."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def _content_type(name):
+    if name.endswith(".txt"):
+        return "text/plain; charset=utf-8"
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def select_artifact(path, accept_encoding, display_name=None):
+    """
+    Picks what to send for path. A plain file is replaced by a precompressed .br/.gz
+    sibling when the client accepts it. A stored compressed output (X.txt.gz) is sent
+    as-is with Content-Encoding when accepted.
+    Returns an Artifact, or None if the stored file must be decoded (client does not
+    accept its compression) or does not exist.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    suffix = os.path.splitext(path)[1]
+    if suffix in COMPRESSED_SUFFIXES:
+        encoding = _ENCODING_OF[COMPRESSED_SUFFIXES[suffix]]
+        if encoding not in accepted:
+            return None
+        candidates = ((path, encoding),)
+        name = display_name or path[:-len(suffix)]
+    else:
+        candidates = tuple((path + ext, enc) for ext, enc in _VARIANTS if enc in accepted) + ((path, None),)
+        name = display_name or path
+    for candidate, encoding in candidates:
+        try:
+            stat_result = os.stat(candidate)
+        except OSError:
+            continue
+        if os.path.isfile(candidate):
+            return Artifact(candidate, encoding, stat_result, _content_type(name))
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+
+def parse_range(range_header, size):
+    """
+    Parses a single "bytes=start-end" range against size.
+    Returns (start, end) inclusive, None to send the whole file (no, unsupported or
+    invalid range), or "unsatisfiable" when the range starts past the end of the file.
+    """
+    if not range_header:
+        return None
+    match = _RANGE.match(range_header.strip())
+    if not match:
+        return None  # multiple ranges or other units: a full 200 response is allowed
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        start, end = max(0, size - length), size - 1
+    else:
+        start = int(first)
+        if last and int(last) < start:
+            return None  # invalid range (RFC 9110 14.2): ignore it and send the whole file
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return "unsatisfiable"
+    return start, end
+
+
+def artifact_headers(artifact, attachment_name=None, cache_control="no-cache"):
+    headers = {
+        "ETag": artifact.etag,
+        "Last-Modified": artifact.last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if artifact.encoding:
+        headers["Content-Encoding"] = artifact.encoding
+    if attachment_name:
+        headers["Content-Disposition"] = f'attachment; filename="{attachment_name}"'
+    return headers
+
+
+class ArtifactFileResponse(Response):
+    """
+    Sends bytes [start, end] of a file. Uses the ASGI zero-copy extension when the
+    server offers it, otherwise reads in 64 KiB chunks on a worker thread, so the event
+    loop is never blocked and no WSGI thread is held for the transfer.
+    """
+
+    def __init__(self, path, start, end, status_code=200, headers=None, media_type=None, head=False):
+        super().__init__(content=b"", status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.head = head
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head or self.end < self.start:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        count = self.end - self.start + 1
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(), "offset": self.start, "count": count})
+                return
+            offset = self.start
+            while count > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, f.fileno(), min(CHUNK_SIZE, count), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
+            if count > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+def _sendfile_header(path):
+    if ARTIFACT_SENDFILE_HEADER.lower() == "x-accel-redirect":
+        return ARTIFACT_ACCEL_PREFIX.rstrip("/") + "/" + os.path.relpath(path).replace(os.sep, "/")
+    return os.path.abspath(path)
+
+
+def serve_artifact(request, path, attachment_name=None, cache_control="no-cache"):
+    """
+    Builds the Starlette response for the file at path: 304 when If-None-Match matches,
+    206/416 for Range requests, otherwise the full (possibly precompressed) file.
+    With ARTIFACT_SENDFILE_HEADER set, the body is left to the proxy (sendfile there).
+    """
+    head = request.method == "HEAD"
+    artifact = select_artifact(path, request.headers.get("accept-encoding"), attachment_name)
+    if artifact is None:
+        # Directories (e.g. /static/outputs/) are not served either
+        if pending_text(path) is None and not os.path.isfile(path):
+            return Response(status_code=404)
+        # Stored compressed but the client cannot decode it (rare): send the text
+        text = read_output_text(path)
+        headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if attachment_name:
+            headers["Content-Disposition"] = f'attachment; filename="{attachment_name}"'
+        return Response(b"" if head else text.encode("utf-8"), headers=headers, media_type="text/plain; charset=utf-8")
+
+    headers = artifact_headers(artifact, attachment_name, cache_control)
+    if etag_matches(request.headers.get("if-none-match"), artifact.etag):
+        return Response(status_code=304, headers={k: v for k, v in headers.items() if k != "Content-Disposition"})
+
+    if ARTIFACT_SENDFILE_HEADER:
+        headers[ARTIFACT_SENDFILE_HEADER] = _sendfile_header(artifact.path)
+        return Response(status_code=200, headers=headers, media_type=artifact.content_type)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == artifact.etag:
+        byte_range = parse_range(request.headers.get("range"), artifact.size)
+    if byte_range == "unsatisfiable":
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{artifact.size}", "ETag": artifact.etag})
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{artifact.size}"
+        return ArtifactFileResponse(artifact.path, start, end, 206, headers, artifact.content_type, head)
+    return ArtifactFileResponse(artifact.path, 0, artifact.size - 1, 200, headers, artifact.content_type, head)
@@ -0,0 +1,63 @@
+# === File: app/utils/file_cache.py ===
+# In-memory LRU cache of output file contents, validated by mtime/size on every read
+
+import os
+import threading
+from collections import OrderedDict
+from app.utils.output_store import pending_text, read_output_text
+
+FILE_CACHE_MAX_ENTRIES = int(os.getenv("FILE_CACHE_MAX_ENTRIES", "512"))
+
+
+class FileContentCache:
+    """
+    Keeps recently read text files in memory. Each read does one stat(); the cached
+    text is reused only if mtime and size are unchanged, so edits on disk are picked up.
+    """
+
+    def __init__(self, max_entries=FILE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # path -> (mtime_ns, size, text)
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[:2] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        text = read_output_text(path)
+        with self._lock:
+            self._entries[path] = (signature[0], signature[1], text)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_file_cache = FileContentCache()
+
+
+def read_text_cached(path):
+    """
+    Returns the text of path (decompressed if needed), served from the process-wide
+    file cache when unchanged. Files still queued for writing are served from memory.
+    """
+    text = pending_text(path)
+    if text is not None:
+        return text
+    return _file_cache.read(path)
+
+
+def file_cache_stats():
+    return _file_cache.stats()
@@ -0,0 +1,31 @@
+# === File: app/utils/file_lock.py ===
+# Cross-process file locking for files shared by gunicorn workers
+
+import os
+import logging
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+@contextmanager
+def file_lock(lock_path, shared=False):
+    """
+    Holds an flock() on lock_path for the duration of the with-block.
+    shared=True takes a read lock; otherwise the lock is exclusive.
+    On platforms without fcntl the block runs unlocked.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, "a+") as lock_f:
+        if fcntl is None:
+            logging.debug(f"fcntl unavailable, running without lock: {lock_path}")
+            yield
+            return
+        fcntl.flock(lock_f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_f.fileno(), fcntl.LOCK_UN)
@@ -4,6 +4,7 @@
 import os
 from datetime import datetime
 import logging
+from app.utils.output_store import save_output
 
 # Output directory for generated files
 OUTPUT_DIR = "static/outputs"
@@ -11,7 +12,9 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 def write_output_file(agent_name, payload, prompt, context, output, filename=None):
     """
-    Write the output to a .txt file in static/outputs.
+    Write the output to a .txt file in static/outputs (sharded and optionally compressed,
+    see app/utils/output_store.py). The write is queued to the background writer;
+    the file can be read through read_output_text or /download right away.
     If filename is provided, use it; otherwise, generate a default one.
     Returns (filename, full_output).
 
@@ -33,11 +36,6 @@ def write_output_file(agent_name, payload, prompt, context, output, filename=Non
     if filename is None:
         filename = f"{agent_name.replace(' ', '_')}_{timestamp}.txt"
 
-    # Ensure the outputs directory exists
-    file_path = os.path.join(OUTPUT_DIR, filename)
-    logging.warning(f"Writing file to: {file_path}")
-    logging.warning(f"Absolute file path (write): {os.path.abspath(file_path)}")  # <-- Add this
-
     # Build the full output content (customize as needed)
     full_output = f"""
 ========================
@@ -65,9 +63,8 @@ def write_output_file(agent_name, payload, prompt, context, output, filename=Non
 ========================
 """
 
-    # Write to file
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(full_output)
-    logging.warning(f"File written successfully: {file_path}")
+    # Queue the write and add the file to the output catalog
+    file_path = save_output(OUTPUT_DIR, filename, full_output)
+    logging.info(f"Output file queued: {file_path}")
 
     return filename, full_output
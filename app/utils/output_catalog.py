@@ -0,0 +1,205 @@
+# === File: app/utils/output_catalog.py ===
+# In-process catalog of generated output files, keyed by normalized topic
+
+import os
+import re
+import time
+import logging
+import threading
+
+# <safe_topic>_<YYYYMMDD>_<HHMMSS>.txt, as written by save_seo_output / write_output_file
+_STAMPED_NAME = re.compile(r"^(?P<topic>.+)_(?P<date>\d{8})_(?P<time>\d{6})$")
+
+# Compressed outputs keep the .txt name with one of these suffixes appended
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+# Sharded outputs live under year directories (YYYY/MM/DD/<hash byte>/)
+SHARD_ROOT = re.compile(r"^\d{4}$")
+# Append-only list of files written by any worker (one relative path per line)
+JOURNAL_NAME = "output_catalog.log"
+
+
+def topic_key(topic):
+    """
+    Normalizes a topic (or the topic part of a filename) for lookups: lowercase,
+    runs of other characters collapsed to "_". Cut at 50 characters like the
+    safe topic in output filenames.
+    """
+    return re.sub(r"[^a-z0-9]+", "_", topic[:50].lower()).strip("_")
+
+
+def logical_name(path):
+    """The output filename without directory and compression suffix (X_20250626_144035.txt)."""
+    name = os.path.basename(path)
+    suffix = os.path.splitext(name)[1]
+    return name[:-len(suffix)] if suffix in COMPRESSED_SUFFIXES else name
+
+
+def is_output_file(name):
+    return logical_name(name).endswith(".txt")
+
+
+def parse_output_name(filename):
+    """Returns (topic_key, timestamp string or None) for an output filename."""
+    stem = os.path.splitext(filename)[0]
+    match = _STAMPED_NAME.match(stem)
+    if match:
+        return topic_key(match.group("topic")), match.group("date") + match.group("time")
+    return topic_key(stem), None
+
+
+class OutputCatalog:
+    """
+    Catalog of the output files under a directory (flat files in the root and the
+    sharded YYYY/MM/DD/<hash>/ tree): filename -> (stored path, topic key, mtime) plus
+    the latest file per topic key, so "latest file for topic" is a dict lookup.
+
+    The tree is scanned once per process. Files written in this process are recorded
+    as they are queued; files written by other workers are read from the append-only
+    journal (output_catalog.log), which costs one stat per lookup while it is unchanged.
+    """
+
+    def __init__(self, directory):
+        # Absolute, so returned paths (metadata "file" values, dedup keys) do not
+        # depend on which module created the catalog first
+        self.directory = os.path.abspath(directory)
+        self.journal_path = os.path.join(self.directory, JOURNAL_NAME)
+        self._lock = threading.Lock()
+        self._files = {}   # filename -> (relative path, topic key, sort key)
+        self._latest = {}  # topic key -> filename
+        self._journal_offset = None
+
+    def _journal_size(self):
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def _add(self, relpath, mtime):
+        filename = logical_name(relpath)
+        key, stamp = parse_output_name(filename)
+        # The generation timestamp in the name decides; mtime changes on every copy,
+        # restore or migration, so it only breaks ties and dates unstamped files
+        sort_key = (stamp or time.strftime("%Y%m%d%H%M%S", time.localtime(mtime)), mtime)
+        self._files[filename] = (relpath, key, sort_key)
+        latest = self._latest.get(key)
+        if latest is None or self._files[latest][2] <= sort_key:
+            self._latest[key] = filename
+
+    def _scan(self):
+        # Journal position first: entries appended during the scan are read again, harmlessly
+        self._journal_offset = self._journal_size()
+        self._files = {}
+        self._latest = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and is_output_file(entry.name):
+                        self._add(entry.name, entry.stat().st_mtime)
+                    elif entry.is_dir() and SHARD_ROOT.match(entry.name):
+                        for root, _, names in os.walk(entry.path):
+                            for name in names:
+                                if is_output_file(name):
+                                    path = os.path.join(root, name)
+                                    self._add(os.path.relpath(path, self.directory), os.path.getmtime(path))
+        except FileNotFoundError:
+            pass
+        logging.info(f"Output catalog scanned {len(self._files)} files in {self.directory}")
+
+    def _read_journal(self, size):
+        # Binary, so the offset stays a byte position
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read(size - self._journal_offset)
+        # Only complete lines; a partially appended line is read next time
+        complete = data[:data.rfind(b"\n") + 1]
+        for relpath in complete.decode("utf-8").splitlines():
+            try:
+                self._add(relpath, os.path.getmtime(os.path.join(self.directory, relpath)))
+            except OSError:
+                continue  # removed or migrated since it was written
+        self._journal_offset += len(complete)
+
+    def _sync(self):
+        if self._journal_offset is None:
+            self._scan()
+            return
+        size = self._journal_size()
+        if size < self._journal_offset:
+            self._scan()
+        elif size > self._journal_offset:
+            self._read_journal(size)
+
+    def record(self, path):
+        """Adds a file this process is writing (or has just written), without any disk access."""
+        relpath = os.path.relpath(path, self.directory)
+        with self._lock:
+            if self._journal_offset is None:
+                self._scan()
+            self._add(relpath, time.time())
+
+    def latest_for_topic(self, topic):
+        """
+        Returns the path of the newest file for topic, or None. An exact topic match
+        is a dict lookup; otherwise topics containing the given one are considered.
+        """
+        key = topic_key(topic)
+        if not key:
+            return None
+        with self._lock:
+            self._sync()
+            filename = self._latest.get(key)
+            if filename is None:
+                candidates = [name for k, name in self._latest.items() if key in k]
+                if not candidates:
+                    return None
+                filename = max(candidates, key=lambda name: self._files[name][2])
+            return os.path.join(self.directory, self._files[filename][0])
+
+    def resolve(self, filename):
+        """Returns the stored path of filename if it is a cataloged output file, else None."""
+        with self._lock:
+            self._sync()
+            entry = self._files.get(logical_name(filename))
+        return os.path.join(self.directory, entry[0]) if entry else None
+
+    def files(self):
+        """Returns the stored paths (relative to the directory) of all cataloged files, sorted by filename."""
+        with self._lock:
+            self._sync()
+            return [self._files[name][0] for name in sorted(self._files)]
+
+    def forget(self, filename):
+        """Drops filename from the in-memory catalog (after it was moved or deleted)."""
+        with self._lock:
+            entry = self._files.pop(logical_name(filename), None)
+            if entry and self._latest.get(entry[1]) == logical_name(filename):
+                del self._latest[entry[1]]
+                candidates = [name for name, e in self._files.items() if e[1] == entry[1]]
+                if candidates:
+                    self._latest[entry[1]] = max(candidates, key=lambda name: self._files[name][2])
+
+
+def journal_written(directory, path):
+    """Appends path to the directory's journal once the file is on disk, for other workers."""
+    line = os.path.relpath(path, directory) + "\n"
+    # O_APPEND writes of one short line are not interleaved between processes
+    fd = os.open(os.path.join(directory, JOURNAL_NAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_output_catalog(directory):
+    """Returns the process-wide catalog for directory (one per absolute path)."""
+    key = os.path.abspath(directory)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = OutputCatalog(key)
+            _catalogs[key] = catalog
+        return catalog
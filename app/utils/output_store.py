@@ -0,0 +1,236 @@
+# === File: app/utils/output_store.py ===
+# Sharded, optionally compressed storage of generated output files with a background writer
+
+import os
+import re
+import gzip
+import queue
+import atexit
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from app.utils.output_catalog import COMPRESSED_SUFFIXES, get_output_catalog, journal_written
+
+try:
+    import zstandard
+except ImportError:  # optional: OUTPUT_COMPRESSION=zstd needs the zstandard package
+    zstandard = None
+
+# "sharded" stores files as YYYY/MM/DD/<hash byte>/<filename>; "flat" keeps them in the root
+OUTPUT_LAYOUT = os.getenv("OUTPUT_LAYOUT", "sharded")
+# "none", "gzip" or "zstd"
+OUTPUT_COMPRESSION = os.getenv("OUTPUT_COMPRESSION", "none")
+# Writes are queued to a background thread; 0 writes on the calling thread
+OUTPUT_BACKGROUND_WRITES = os.getenv("OUTPUT_BACKGROUND_WRITES", "1") == "1"
+# Bounded queue: callers block once this many writes are pending
+OUTPUT_WRITER_QUEUE_SIZE = int(os.getenv("OUTPUT_WRITER_QUEUE_SIZE", "256"))
+# Up to this many files are written, then fsync()ed together
+OUTPUT_FSYNC_BATCH = int(os.getenv("OUTPUT_FSYNC_BATCH", "32"))
+
+_SUFFIX_FOR = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+_STAMP = re.compile(r"_(\d{4})(\d{2})(\d{2})_\d{6}\.txt$")
+
+
+def compression_for(path):
+    """Returns "gzip", "zstd" or "none" from the file extension."""
+    return COMPRESSED_SUFFIXES.get(os.path.splitext(path)[1], "none")
+
+
+def shard_relpath(filename, layout=None, compression=None):
+    """
+    Relative path for filename inside the output directory. The date comes from the
+    filename's timestamp (today if it has none); the last level is the first byte of
+    sha1(filename), so no directory holds more than a day's share of 1/256 of the files.
+    """
+    layout = layout or OUTPUT_LAYOUT
+    compression = compression or OUTPUT_COMPRESSION
+    stored_name = filename + _SUFFIX_FOR.get(compression, "")
+    if layout != "sharded":
+        return stored_name
+    match = _STAMP.search(filename)
+    year, month, day = match.groups() if match else datetime.now().strftime("%Y %m %d").split()
+    bucket = hashlib.sha1(filename.encode("utf-8")).hexdigest()[:2]
+    return os.path.join(year, month, day, bucket, stored_name)
+
+
+def encode_text(text, compression):
+    data = text.encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("OUTPUT_COMPRESSION=zstd requires the zstandard package")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def decode_bytes(data, compression):
+    if compression == "gzip":
+        data = gzip.decompress(data)
+    elif compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading .zst outputs requires the zstandard package")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode("utf-8")
+
+
+def _write_file(path, data):
+    """Writes data to a temporary name and renames it into place."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _fsync_paths(paths):
+    """fsync()s the files, then each parent directory once, so the renames are durable too."""
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    for directory in {os.path.dirname(p) or "." for p in paths}:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass  # directories cannot be fsync()ed on every platform
+        finally:
+            os.close(fd)
+
+
+class BackgroundWriter:
+    """
+    Writes output files on a daemon thread so requests do not wait for disk I/O.
+
+    The queue is bounded (OUTPUT_WRITER_QUEUE_SIZE), so a burst of writes applies
+    backpressure instead of growing memory. The thread drains up to OUTPUT_FSYNC_BATCH
+    queued files, writes them, then fsync()s them together. Until a file is on disk its
+    text is served from memory by pending_text(). Each write's on_written(path) callback
+    runs once its batch is durable.
+    """
+
+    def __init__(self, max_queue=OUTPUT_WRITER_QUEUE_SIZE, batch_size=OUTPUT_FSYNC_BATCH):
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}  # absolute path -> text
+        self._pending_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_thread(self):
+        # Threads do not survive fork(): start one per worker process
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, path, text, data, on_written=None):
+        """Queues data (the encoded text) for path; blocks while the queue is full."""
+        with self._pending_lock:
+            self._pending[os.path.abspath(path)] = text
+        self._ensure_thread()
+        self._queue.put((path, data, on_written))
+
+    def pending_text(self, path):
+        with self._pending_lock:
+            return self._pending.get(os.path.abspath(path))
+
+    def flush(self):
+        """Blocks until every queued write is on disk."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            written = []
+            for path, data, on_written in batch:
+                try:
+                    _write_file(path, data)
+                    written.append((path, on_written))
+                except Exception as e:
+                    logging.error(f"Background write failed for {path}: {e}")
+            try:
+                _fsync_paths([path for path, _ in written])
+            except OSError as e:
+                logging.error(f"fsync of output batch failed: {e}")
+            with self._pending_lock:
+                for path, _, _ in batch:
+                    self._pending.pop(os.path.abspath(path), None)
+            for path, on_written in written:
+                if on_written is None:
+                    continue
+                try:
+                    on_written(path)
+                except Exception as e:
+                    logging.error(f"Output write callback failed for {path}: {e}")
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundWriter()
+            atexit.register(_writer.flush)
+        return _writer
+
+
+def save_output(directory, filename, text, background=None, layout=None, compression=None):
+    """
+    Stores text as filename under directory using the configured (or given) layout
+    and compression. With background writes the call returns once the write is queued;
+    readers going through read_output_text() see the text immediately.
+    Returns the path the file is (or will be) stored at.
+    """
+    if background is None:
+        background = OUTPUT_BACKGROUND_WRITES
+    path = os.path.join(directory, shard_relpath(filename, layout, compression))
+    data = encode_text(text, compression_for(path))
+    if background:
+        _get_writer().submit(path, text, data, on_written=lambda p: journal_written(directory, p))
+    else:
+        _write_file(path, data)
+        _fsync_paths([path])
+        journal_written(directory, path)
+    get_output_catalog(directory).record(path)
+    return path
+
+
+def pending_text(path):
+    """Text of an output file that is still queued for writing, or None."""
+    return _writer.pending_text(path) if _writer is not None else None
+
+
+def read_output_text(path):
+    """Reads an output file (plain, .gz or .zst), including files still queued for writing."""
+    text = pending_text(path)
+    if text is not None:
+        return text
+    with open(path, "rb") as f:
+        return decode_bytes(f.read(), compression_for(path))
+
+
+def flush_writes():
+    """Waits for queued output writes (used by scripts and at exit)."""
+    if _writer is not None:
+        _writer.flush()
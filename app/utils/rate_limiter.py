@@ -0,0 +1,78 @@
+# === File: app/utils/rate_limiter.py ===
+# Token-bucket limits on requests per minute and tokens per minute for batches of LLM calls
+
+import time
+import asyncio
+
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 units per second up to capacity. The level may go
+    negative when a single request costs more than the capacity or when actual usage
+    turns out higher than the estimate; later requests then wait for the debt.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount):
+        """Seconds until amount can be taken (0 if it can be taken now)."""
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets shared by the coroutines of one
+    batch. acquire() waits until both allow the request; waiters are served in order.
+    After a 429 the server's retry delay is applied to everyone via pause().
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, burst_seconds=10):
+        self.requests = TokenBucket(requests_per_minute, max(1, requests_per_minute * burst_seconds / 60)) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute * burst_seconds / 60) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waited = 0.0
+
+    async def acquire(self, tokens):
+        async with self._lock:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if self.requests is not None:
+                    delay = max(delay, self.requests.delay_for(1))
+                if self.tokens is not None:
+                    delay = max(delay, self.tokens.delay_for(tokens))
+                if delay <= 0:
+                    break
+                self.waited += delay
+                await asyncio.sleep(delay)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+
+    def adjust(self, extra_tokens):
+        """Charges (or refunds, if negative) the difference between actual and estimated tokens."""
+        if self.tokens is not None:
+            self.tokens.take(extra_tokens)
+
+    def pause(self, seconds):
+        """Holds back every request for seconds (e.g. the Retry-After of a 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -0,0 +1,21 @@
+# === File: app/utils/sse.py ===
+# Server-Sent Events formatting for streamed agent output
+
+import json
+
+
+def sse_event(event, data):
+    """
+    Formats one SSE frame. data is JSON-encoded so newlines in tokens stay inside the frame.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def wants_stream(payload, args):
+    """
+    True if the client asked for a streamed response, via {"stream": true} in the
+    JSON payload or ?stream=1 in the query string.
+    """
+    if isinstance(payload, dict) and payload.get("stream") is True:
+        return True
+    return str(args.get("stream", "")).lower() in ("1", "true", "yes")
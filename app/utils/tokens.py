@@ -0,0 +1,57 @@
+# === File: app/utils/tokens.py ===
+# Token counting helpers for batching and prompt budgeting
+
+import logging
+
+try:
+    import tiktoken  # Installed with langchain-openai
+except ImportError:
+    tiktoken = None
+
+# Rough characters-per-token ratio used when tiktoken is not available
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+
+def _get_encoding(model):
+    if tiktoken is None:
+        return None
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # e.g. the BPE file cannot be downloaded; fall back to the estimate
+            logging.error(f"Could not load tokenizer for {model}: {e}")
+            return None
+        _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text, model="text-embedding-3-small"):
+    """
+    Returns the number of tokens in text for the given model.
+    Falls back to a character-based estimate if tiktoken is unavailable.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text, max_tokens, model="text-embedding-3-small"):
+    """
+    Returns text cut down to at most max_tokens tokens.
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -1,14 +1,14 @@
 from app.main import app
-from starlette.staticfiles import StaticFiles
+from app.routes.async_routes import routes as async_routes
 from starlette.middleware.wsgi import WSGIMiddleware
 from starlette.applications import Starlette
-import os
-from openai import OpenAI
+from starlette.routing import Mount
 
-starlette_app = Starlette()
-starlette_app.mount("/static", StaticFiles(directory="static"), name="static")
-starlette_app.mount("/", WSGIMiddleware(app))
+# Native async routes (including /download and /static artifact serving) are matched
+# first; everything else falls through to Flask
+starlette_app = Starlette(routes=[
+    *async_routes,
+    Mount("/", WSGIMiddleware(app)),
+])
 
 asgi_app = starlette_app
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
\ No newline at end of file
@@ -1,27 +1,228 @@
 # === File: models/openai_client.py ===
-# Wrapper around OpenAI API call
-from http.client import HTTPException
-import openai
+# LLM gateway: every OpenAI call in the app goes through the pooled clients defined here
 import os
+import logging
+import threading
+import httpx
+import openai
 from dotenv import load_dotenv
 
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# --- CONNECTION POOL SETTINGS (one place to tune them) ---
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# HTTP/2 needs the optional h2 package (httpx[http2])
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You are a helpful SEO and GEO content assistant."
+SEO_TEMPERATURE = 0.7
+
+_clients_lock = threading.Lock()
+_client = None
+_async_client = None
+# Clients are not shared across fork(): gunicorn workers each build their own pool
+_client_pid = None
+
+
+def _http2_available():
+    if not LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pool_settings():
+    return {
+        "limits": httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        "http2": _http2_available(),
+    }
+
+
+def _check_fork():
+    global _client, _async_client, _client_pid
+    if _client_pid != os.getpid():
+        _client = None
+        _async_client = None
+        _client_pid = os.getpid()
+
+
+def get_client():
+    """
+    Returns the process-wide OpenAI client backed by a persistent keep-alive connection pool.
+    """
+    global _client
+    with _clients_lock:
+        _check_fork()
+        if _client is None:
+            _client = openai.OpenAI(
+                api_key=openai.api_key,
+                max_retries=LLM_MAX_RETRIES,
+                http_client=httpx.Client(**_pool_settings()),
+            )
+        return _client
+
+
+def get_async_client():
+    """
+    Returns the process-wide AsyncOpenAI client, shared by all coroutines of the async route layer.
+    """
+    global _async_client
+    with _clients_lock:
+        _check_fork()
+        if _async_client is None:
+            _async_client = new_async_client()
+        return _async_client
+
+
+def new_async_client(max_retries=LLM_MAX_RETRIES):
+    """
+    Builds a separate AsyncOpenAI client with the standard pool settings, for work that
+    runs its own event loop (an httpx pool cannot be shared between loops).
+    """
+    return openai.AsyncOpenAI(
+        api_key=openai.api_key,
+        max_retries=max_retries,
+        http_client=httpx.AsyncClient(**_pool_settings()),
+    )
+
+
+def _as_messages(prompt):
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return prompt
+
+
+def chat_completion(prompt, model=DEFAULT_MODEL, **kwargs):
+    """
+    Chat completion through the pooled client.
+    prompt is either a user message string or a full messages list.
+    Returns the raw message content.
+    """
+    response = get_client().chat.completions.create(
+        model=model,
+        messages=_as_messages(prompt),
+        **kwargs
+    )
+    return response.choices[0].message.content
+
+
+async def chat_completion_async(prompt, model=DEFAULT_MODEL, **kwargs):
+    """
+    Async chat completion through the pooled client; same arguments as chat_completion.
+    """
+    response = await get_async_client().chat.completions.create(
+        model=model,
+        messages=_as_messages(prompt),
+        **kwargs
+    )
+    return response.choices[0].message.content
+
+
+def stream_chat_completion(prompt, model=DEFAULT_MODEL, **kwargs):
+    """
+    Streaming chat completion: yields content deltas as they arrive.
+    """
+    stream = get_client().chat.completions.create(
+        model=model,
+        messages=_as_messages(prompt),
+        stream=True,
+        **kwargs
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def stream_chat_completion_async(prompt, model=DEFAULT_MODEL, **kwargs):
+    """
+    Async streaming chat completion: async generator of content deltas.
+    """
+    stream = await get_async_client().chat.completions.create(
+        model=model,
+        messages=_as_messages(prompt),
+        stream=True,
+        **kwargs
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def create_embeddings(inputs, model):
+    """Embeddings request through the pooled client; returns response.data."""
+    return get_client().embeddings.create(input=inputs, model=model).data
+
+
+async def create_embeddings_async(inputs, model):
+    response = await get_async_client().embeddings.create(input=inputs, model=model)
+    return response.data
+
+
+def _seo_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
 def generate_content(prompt):
+    """SEO completion; errors are logged and return None."""
     try:
-        client = openai.OpenAI(api_key=openai.api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful SEO and GEO content assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+        return chat_completion(_seo_messages(prompt), temperature=SEO_TEMPERATURE).strip()
     except Exception as e:
-        print(f"Error: {e}")
+        logging.error(f"SEO completion failed: {e}")
         return None
 
+
+def stream_content(prompt):
+    """Streaming variant of generate_content; yields text deltas."""
+    return stream_chat_completion(_seo_messages(prompt), temperature=SEO_TEMPERATURE)
+
+
+def stream_content_async(prompt):
+    """Async streaming variant of generate_content; async generator of text deltas."""
+    return stream_chat_completion_async(_seo_messages(prompt), temperature=SEO_TEMPERATURE)
+
+
+async def generate_content_with_usage_async(prompt, client=None):
+    """
+    SEO completion that raises on errors (callers handle retries) and returns
+    (content, usage) with usage = {"prompt_tokens", "completion_tokens", "total_tokens"}.
+    """
+    response = await (client or get_async_client()).chat.completions.create(
+        model=DEFAULT_MODEL,
+        messages=_seo_messages(prompt),
+        temperature=SEO_TEMPERATURE
+    )
+    usage = response.usage
+    return response.choices[0].message.content.strip(), {
+        "prompt_tokens": usage.prompt_tokens if usage else 0,
+        "completion_tokens": usage.completion_tokens if usage else 0,
+        "total_tokens": usage.total_tokens if usage else 0,
+    }
+
+
+async def generate_content_async(prompt):
+    """Async SEO completion; errors are logged and raised to the caller."""
+    try:
+        content = await chat_completion_async(_seo_messages(prompt), temperature=SEO_TEMPERATURE)
+    except Exception as e:
+        logging.error(f"SEO completion failed: {e}")
+        raise
+    return content.strip()
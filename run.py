@@ -1,12 +1,12 @@
 # === File: run.py ===
-# Entry point to run the app using either Uvicorn (ASGI) or Flask directly (WSGI)
+# Entry point to run the app with Uvicorn (ASGI: native async routes first, Flask for the rest)
 
 from app.main import app
-from asgiref.wsgi import WsgiToAsgi
 
-# Wrap Flask with ASGI compatibility for Uvicorn
-asgi_app = WsgiToAsgi(app)
+# Native ASGI app for Uvicorn: async LLM routes first, Flask for the rest
+from asgi import asgi_app
 
-# Fallback to run as a Flask WSGI app directly
+# Run directly with Uvicorn; the Flask app alone lacks the async routes
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    import uvicorn
+    uvicorn.run(asgi_app, host="0.0.0.0", port=5000)
@@ -0,0 +1,96 @@
+# === File: scripts/batch_generate.py ===
+# Generates many SEO articles in one run (bounded concurrency, rate limited, embedded as they complete)
+#
+# Usage:
+#   python scripts/batch_generate.py --topics topics.txt --style informative --length short
+#   python scripts/batch_generate.py --payloads payloads.jsonl --concurrency 16 --tpm 400000
+#   python scripts/batch_generate.py --topics topics.txt --no-embed --report report.json
+#
+# topics.txt has one topic per line; payloads.jsonl has one run-agent payload per line.
+
+import os
+import sys
+import json
+import argparse
+
+# Ensure project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.batch_generator import (
+    BATCH_CONCURRENCY, BATCH_REQUESTS_PER_MINUTE, BATCH_TOKENS_PER_MINUTE, run_batch,
+)
+from app.utils.output_store import flush_writes
+
+
+def load_payloads(args):
+    if args.payloads:
+        with open(args.payloads, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(args.topics, "r", encoding="utf-8") as f:
+        topics = [line.strip() for line in f if line.strip()]
+    return [{
+        "agent": "seo_generator",
+        "no_cache": args.no_cache,
+        "input": {
+            "topic": topic,
+            "style": args.style,
+            "length": args.length,
+            "FAQ'S": args.faqs,
+            "LIMIT": args.limit,
+            "EXISTING DATA TO BE USED ": ""
+        }
+    } for topic in topics]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate SEO articles in bulk.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--topics", help="File with one topic per line")
+    source.add_argument("--payloads", help="JSONL file with one run-agent payload per line")
+    parser.add_argument("--style", default="informative")
+    parser.add_argument("--length", default="short")
+    parser.add_argument("--faqs", default="YES")
+    parser.add_argument("--limit", default="1000", help="Word limit per article")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate cached articles")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--rpm", type=int, default=BATCH_REQUESTS_PER_MINUTE, help="Requests per minute (0 = no limit)")
+    parser.add_argument("--tpm", type=int, default=BATCH_TOKENS_PER_MINUTE, help="Tokens per minute (0 = no limit)")
+    parser.add_argument("--no-embed", action="store_true", help="Do not add the articles to the FAISS index")
+    parser.add_argument("--report", help="Write the per-item results and summary to this JSON file")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args)
+
+    def progress(done, item):
+        detail = item.get("download_url") or item.get("error", "")
+        print(f"[{done}/{len(payloads)}] {item['status']:<9} {item['seconds']:>6.1f}s  {item['topic']}  {detail}")
+
+    result = run_batch(
+        payloads, concurrency=args.concurrency, requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm, embed=not args.no_embed, on_progress=progress
+    )
+    flush_writes()
+    if "error" in result:
+        print(f"Error: {result['error']}")
+        sys.exit(1)
+
+    summary = result["summary"]
+    print(
+        f"\n{summary['succeeded']} generated, {summary['cached']} cached, {summary['failed']} failed "
+        f"in {summary['elapsed_seconds']}s"
+    )
+    print(f"Throughput: {summary['articles_per_minute']} articles/min, {summary['tokens_per_minute']} tokens/min")
+    print(f"Latency: p50 {summary['latency_p50_seconds']}s, p95 {summary['latency_p95_seconds']}s")
+    print(
+        f"Retries: {summary['retries']} ({summary['rate_limited']} rate limited), "
+        f"waited {summary['rate_limit_wait_seconds']}s for the rate limiter"
+    )
+    if not args.no_embed:
+        print(f"Embedded {summary['embedded_chunks']} chunks, {len(summary['embed_errors'])} embedding errors")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# === File: scripts/bench_index_manager.py ===
+# Benchmark: per-call read_index/pickle.load vs. the worker-resident IndexManager
+#
+# Usage:
+#   python scripts/bench_index_manager.py --docs 25 --queries 200
+#
+# Uses random vectors in a temporary directory, so no OpenAI calls are made.
+
+import os
+import sys
+import time
+import pickle
+import argparse
+import tempfile
+
+import faiss
+import numpy as np
+
+# Ensure project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.index_manager import IndexManager
+
+
+def build_fixture(directory, docs, dim):
+    # Old layout (pickled metadata list); IndexManager imports it into faiss_meta.sqlite3
+    index_path = os.path.join(directory, "faiss.index")
+    meta_path = os.path.join(directory, "faiss_meta.pkl")
+    index = faiss.IndexFlatL2(dim)
+    index.add(np.random.rand(docs, dim).astype("float32"))
+    faiss.write_index(index, index_path)
+    meta = [{"topic": f"topic {i}", "file": f"static/outputs/doc_{i}.txt"} for i in range(docs)]
+    with open(meta_path, "wb") as meta_f:
+        pickle.dump(meta, meta_f)
+    return index_path, meta_path
+
+
+def per_call_search(index_path, meta_path, query, top_k):
+    # What search_embeddings used to do on every request
+    index = faiss.read_index(index_path)
+    with open(meta_path, "rb") as meta_f:
+        meta = pickle.load(meta_f)
+    D, I = index.search(query, top_k)
+    return [meta[i] for i in I[0] if 0 <= i < len(meta)]
+
+
+def manager_search(manager, query, top_k):
+    D, I, meta = manager.search(query, top_k)
+    return [meta[i] for i in I[0] if i in meta]
+
+
+def run(label, fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    elapsed = time.perf_counter() - start
+    qps = len(queries) / elapsed
+    print(f"{label:<28} {len(queries)} queries in {elapsed:.3f}s -> {qps:,.0f} QPS")
+    return qps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call index loading with the resident IndexManager.")
+    parser.add_argument("--docs", type=int, default=25, help="Number of vectors in the index")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension (text-embedding-3-small)")
+    parser.add_argument("--queries", type=int, default=200, help="Number of searches to time")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path, meta_path = build_fixture(tmp, args.docs, args.dim)
+        queries = [np.random.rand(1, args.dim).astype("float32") for _ in range(args.queries)]
+
+        print(f"Index: {args.docs} vectors x {args.dim} dims, top_k={args.top_k}")
+        baseline = run("per-call read_index", lambda q: per_call_search(index_path, meta_path, q, args.top_k), queries)
+
+        # Created after the baseline: the first load migrates (and renames) the pickle
+        manager = IndexManager(index_path, os.path.join(tmp, "faiss_meta.sqlite3"))
+        manager.refresh()  # first load happens once per worker
+        resident = run("IndexManager (resident)", lambda q: manager_search(manager, q, args.top_k), queries)
+        print(f"Speedup: {resident / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
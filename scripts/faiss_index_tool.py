@@ -0,0 +1,141 @@
+# === File: scripts/faiss_index_tool.py ===
+# Inspect, rebuild and measure the FAISS store
+#
+# Usage:
+#   python scripts/faiss_index_tool.py info
+#   python scripts/faiss_index_tool.py rebuild --kind hnsw        # flat | hnsw | ivfpq | auto
+#   python scripts/faiss_index_tool.py rebuild --online           # build without blocking searches
+#   python scripts/faiss_index_tool.py compact                    # fold the WAL into a new snapshot
+#   python scripts/faiss_index_tool.py check [--fix]              # index vs. metadata vs. files on disk
+#   python scripts/faiss_index_tool.py recall --k 5 --queries 200 # recall@k of each ANN type vs. Flat
+#   python scripts/faiss_index_tool.py recall --synthetic 50000   # same, on random vectors
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Ensure project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.ann_index import INDEX_KINDS, build_index, normalize_vectors
+from app.services.embedding_store import check_index, get_store
+
+
+def cmd_info(args):
+    store = get_store()
+    if not store.exists():
+        print("No embeddings index found.")
+        return
+    print(f"Index:   {store.index_path}")
+    print(f"Type:    {store.kind} (cosine similarity)")
+    print(f"Vectors: {store.ntotal}")
+    print(f"Pending: {store.pending_rows} rows in {store.wal_path}")
+    print(f"Removed: {store.removed_rows} vectors (dropped at the next compaction)")
+
+
+def cmd_compact(args):
+    store = get_store()
+    start = time.perf_counter()
+    rows = store.compact()
+    print(f"Compacted {rows} WAL rows ({store.ntotal} vectors, {store.kind}) in {time.perf_counter() - start:.2f}s")
+
+
+def cmd_rebuild(args):
+    store = get_store()
+    kind = None if args.kind == "auto" else args.kind
+    start = time.perf_counter()
+    built = store.rebuild_online(kind) if args.online else store.rebuild(kind)
+    print(f"Rebuilt as {built} ({store.ntotal} vectors) in {time.perf_counter() - start:.2f}s")
+
+
+def cmd_check(args):
+    report = check_index(fix=args.fix)
+    if "error" in report:
+        print(report["error"])
+        return
+    info = report["index"]
+    print(f"Index:      {info['ntotal']} vectors ({info['kind']}), {info['pending_rows']} pending, {info['removed_rows']} removed")
+    print(f"Metadata:   {report['metadata_entries']} entries")
+    print(f"Orphans:    {report['orphan_vectors']} vectors without metadata {report['sample_orphan_ids'] or ''}")
+    print(f"Dangling:   {report['dangling_entries']} entries without a vector {report['sample_dangling_ids'] or ''}")
+    print(f"Vector log: {info['vector_log_rows']} rows for {info['snapshot_rows']} snapshot rows")
+    print(f"BM25:       {report['bm25_missing']} entries without text")
+    for path in report["missing_files"]:
+        print(f"Missing on disk: {path}")
+    print(f"Not embedded: {len(report['not_embedded_files'])} output files (includes skipped duplicates and older versions)")
+    print("OK" if report["ok"] else "Inconsistent" + ("" if args.fix else " (run with --fix to repair)"))
+    if args.fix:
+        print(f"Fixed: {report['fixed']}")
+
+
+def _timed_search(index, queries, k):
+    start = time.perf_counter()
+    _, I = index.search(queries, k)
+    return I, (time.perf_counter() - start) / len(queries)
+
+
+def cmd_recall(args):
+    if args.synthetic:
+        # Clustered like real embeddings; uniform random vectors make every neighbour a near-tie
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(max(1, args.synthetic // 40), args.dim))
+        labels = rng.integers(0, len(centers), size=args.synthetic)
+        vectors = normalize_vectors(centers[labels] + rng.normal(0, 0.6, size=(args.synthetic, args.dim)))
+    else:
+        store = get_store()
+        if not store.exists():
+            print("No embeddings index found.")
+            return
+        vectors = store.all_vectors()
+
+    # Queries: stored vectors with a little noise, so the true neighbours are known to Flat
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = normalize_vectors(vectors[picks] + rng.normal(0, 0.01, size=(len(picks), vectors.shape[1])))
+    k = min(args.k, len(vectors))
+
+    baseline = build_index(vectors, "flat")
+    truth, flat_latency = _timed_search(baseline, queries, k)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={k}")
+    print(f"{'flat':<6} recall@{k}=1.000  {flat_latency * 1000:.3f} ms/query")
+
+    for kind in args.kinds:
+        start = time.perf_counter()
+        index = build_index(vectors, kind)
+        build_time = time.perf_counter() - start
+        found, latency = _timed_search(index, queries, k)
+        hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+        recall = hits / (len(queries) * k)
+        print(f"{kind:<6} recall@{k}={recall:.3f}  {latency * 1000:.3f} ms/query  (build {build_time:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, rebuild and measure the FAISS store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("info", help="Show index type and size")
+
+    rebuild = sub.add_parser("rebuild", help="Train/rebuild the index from the vector log")
+    rebuild.add_argument("--kind", choices=INDEX_KINDS + ("auto",), default="auto")
+    rebuild.add_argument("--online", action="store_true", help="Keep serving searches while the index is built")
+
+    sub.add_parser("compact", help="Fold pending WAL records into a new snapshot")
+
+    check = sub.add_parser("check", help="Compare the index with the metadata and the files on disk")
+    check.add_argument("--fix", action="store_true", help="Remove orphans, dangling entries and missing files")
+
+    recall = sub.add_parser("recall", help="Report recall@k of ANN index types against the Flat baseline")
+    recall.add_argument("--k", type=int, default=5)
+    recall.add_argument("--queries", type=int, default=200)
+    recall.add_argument("--kinds", nargs="+", choices=("hnsw", "ivfpq"), default=["hnsw", "ivfpq"])
+    recall.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of the store")
+    recall.add_argument("--dim", type=int, default=1536, help="Dimension of synthetic vectors")
+
+    args = parser.parse_args()
+    {"info": cmd_info, "rebuild": cmd_rebuild, "compact": cmd_compact, "check": cmd_check, "recall": cmd_recall}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
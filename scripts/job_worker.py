@@ -0,0 +1,51 @@
+# === File: scripts/job_worker.py ===
+# Standalone worker process for the background job queue
+#
+# Usage:
+#   JOB_WORKERS=0 gunicorn ...            # web processes only queue jobs
+#   python scripts/job_worker.py --threads 4
+#   python scripts/job_worker.py --once   # drain the queue and exit
+
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+
+# Ensure project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.job_queue import JOB_POLL_SECONDS, JobWorkerPool, get_job_queue
+from app.utils.output_store import flush_writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs from the SQLite job queue.")
+    parser.add_argument("--threads", type=int, default=2, help="Worker threads")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    job_queue = get_job_queue()
+    if args.once:
+        pool = JobWorkerPool(job_queue, size=0)
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:once"
+        done = 0
+        while pool.run_one(worker_id):
+            done += 1
+        flush_writes()
+        print(f"Ran {done} jobs. Queue: {job_queue.stats()}")
+        return
+
+    pool = JobWorkerPool(job_queue, size=args.threads)
+    pool.start()
+    print(f"Job worker running with {args.threads} threads (Ctrl+C to stop). Queue: {job_queue.stats()}")
+    try:
+        while True:
+            time.sleep(JOB_POLL_SECONDS * 10)
+    except KeyboardInterrupt:
+        flush_writes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# === File: scripts/metadata_tool.py ===
+# Inspect and edit the metadata of the embedded chunks (replaces static/outputs/import pickle.py)
+#
+# Usage:
+#   python scripts/metadata_tool.py list [--topic TOPIC | --file PATH]
+#   python scripts/metadata_tool.py files
+#   python scripts/metadata_tool.py topics
+#   python scripts/metadata_tool.py get ID [ID ...]
+#   python scripts/metadata_tool.py delete --file PATH | --id ID [ID ...]
+#   python scripts/metadata_tool.py stats
+#   python scripts/metadata_tool.py search "d&o insurance ottawa" [--mode hybrid|vector|lexical] [--top-k 5]
+#   python scripts/metadata_tool.py dedupe [--dry-run]
+
+import os
+import sys
+import argparse
+
+# Ensure project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.embedding_store import (
+    deduplicate_index, delete_embeddings, get_store, lexical_recall, search_embeddings,
+)
+from app.services.lexical_index import SEARCH_MODE, SEARCH_MODES
+
+
+def _print_rows(rows):
+    for vector_id, entry in rows:
+        where = f" | Chunk: {entry['chunk']} [{entry['start']}:{entry['end']}]" if "chunk" in entry else ""
+        print(f"{vector_id:>7} | File: {entry['file']} | Topic: {entry['topic']}{where}")
+
+
+def cmd_list(args, meta):
+    if args.topic:
+        rows = meta.by_topic(args.topic)
+    elif args.file:
+        rows = meta.by_file(args.file)
+    else:
+        rows = meta.all()
+    _print_rows(rows)
+    print(f"{len(rows)} entries")
+
+
+def cmd_files(args, meta):
+    files = meta.files()
+    for path in files:
+        print(path)
+    print(f"{len(files)} files")
+
+
+def cmd_topics(args, meta):
+    for topic, count in meta.topics():
+        print(f"{count:>6}  {topic}")
+
+
+def cmd_get(args, meta):
+    found = meta.get(args.ids)
+    _print_rows(sorted(found.items()))
+    for vector_id in args.ids:
+        if vector_id not in found:
+            print(f"{vector_id:>7} | not found")
+
+
+def cmd_delete(args, meta):
+    # Removes the vectors from the FAISS index along with their metadata
+    result = delete_embeddings(file_path=args.file, ids=args.id)
+    if "error" in result:
+        print(f"Error: {result['error']}")
+        return
+    print(f"Deleted {result['removed']} vectors, index size: {result['index_size']}")
+
+
+def cmd_stats(args, meta):
+    store = get_store()
+    store.refresh()
+    print(f"Database: {meta.path}")
+    print(f"Entries:  {meta.count()}")
+    print(f"Files:    {len(meta.files())}")
+    print(f"Topics:   {len(meta.topics())}")
+    print(f"Vectors:  {store.ntotal}")
+    if meta.lexical_available:
+        print(f"BM25:     {meta.count() - len(meta.missing_texts())} entries with text")
+
+
+def cmd_search(args, meta):
+    results = search_embeddings(args.query, top_k=args.top_k, mode=args.mode)
+    if isinstance(results, dict):
+        print(f"Error: {results['error']}")
+        return
+    for r in results:
+        vector = f"{r['vector_score']:.3f}" if r.get("vector_score") is not None else "-"
+        bm25 = f"{r['bm25']:.2f}" if r.get("bm25") is not None else "-"
+        print(f"{r['score']:.4f} | cos {vector:>5} | bm25 {bm25:>6} | {r['file']} [{r.get('start')}:{r.get('end')}]")
+    print(f"Lexical recall of the query terms: {lexical_recall(args.query, args.top_k):.2f}")
+
+
+def cmd_dedupe(args, meta):
+    result = deduplicate_index(dry_run=args.dry_run)
+    if "error" in result:
+        print(f"Error: {result['error']}")
+        return
+    for r in result["removed"]:
+        similarity = f" (similarity {r['similarity']:.2f})" if r["similarity"] is not None else ""
+        print(f"{r['reason']:<15} {r['file']} -> {r['duplicate_of']}{similarity}")
+    if args.dry_run:
+        print(f"Would remove {len(result['removed'])} files, keep {result['kept']}")
+    else:
+        print(f"Removed {len(result['removed'])} files ({result['removed_vectors']} vectors), kept {result['kept']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and edit the embedding metadata store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = sub.add_parser("list", help="List entries, optionally by topic or file")
+    group = list_parser.add_mutually_exclusive_group()
+    group.add_argument("--topic")
+    group.add_argument("--file")
+
+    sub.add_parser("files", help="List embedded files")
+    sub.add_parser("topics", help="List topics with their entry counts")
+
+    get_parser = sub.add_parser("get", help="Look up entries by FAISS id")
+    get_parser.add_argument("ids", type=int, nargs="+")
+
+    delete_parser = sub.add_parser("delete", help="Delete entries by file or FAISS id")
+    group = delete_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--file")
+    group.add_argument("--id", type=int, nargs="+")
+
+    sub.add_parser("stats", help="Show entry, file and vector counts")
+
+    search_parser = sub.add_parser("search", help="Run a search and show the vector and BM25 scores")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--mode", choices=SEARCH_MODES, default=SEARCH_MODE)
+    search_parser.add_argument("--top-k", type=int, default=5)
+
+    dedupe_parser = sub.add_parser("dedupe", help="Remove older versions and duplicates of embedded files")
+    dedupe_parser.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args()
+    commands = {
+        "list": cmd_list,
+        "files": cmd_files,
+        "topics": cmd_topics,
+        "get": cmd_get,
+        "delete": cmd_delete,
+        "stats": cmd_stats,
+        "search": cmd_search,
+        "dedupe": cmd_dedupe,
+    }
+    commands[args.command](args, get_store().meta)
+
+
+if __name__ == "__main__":
+    main()
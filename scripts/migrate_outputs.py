@@ -0,0 +1,67 @@
+# === File: scripts/migrate_outputs.py ===
+# Moves flat output files (static/outputs/*.txt) into the sharded, optionally compressed layout
+#
+# Usage:
+#   python scripts/migrate_outputs.py --dry-run
+#   python scripts/migrate_outputs.py                       # uses OUTPUT_COMPRESSION (default none)
+#   python scripts/migrate_outputs.py --compression gzip
+#
+# Embedding metadata pointing at a moved file is updated to the new path.
+
+import os
+import sys
+import argparse
+
+# Ensure project root is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.embedding_store import get_store
+from app.utils.file_writer import OUTPUT_DIR
+from app.utils.output_catalog import get_output_catalog, logical_name
+from app.utils.output_store import OUTPUT_COMPRESSION, read_output_text, save_output, shard_relpath
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move flat output files into the sharded layout.")
+    parser.add_argument("--directory", default=OUTPUT_DIR)
+    parser.add_argument("--compression", choices=("none", "gzip", "zstd"), default=OUTPUT_COMPRESSION)
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would be moved")
+    args = parser.parse_args()
+
+    catalog = get_output_catalog(args.directory)
+    flat_files = [relpath for relpath in catalog.files() if os.path.dirname(relpath) == ""]
+    if not flat_files:
+        print("No flat output files to migrate.")
+        return
+
+    meta = get_store().meta
+    stored_files = meta.files()
+    moved = 0
+    renamed_entries = 0
+    for relpath in flat_files:
+        filename = logical_name(relpath)
+        old_path = os.path.join(args.directory, relpath)
+        new_relpath = shard_relpath(filename, layout="sharded", compression=args.compression)
+        new_path = os.path.join(args.directory, new_relpath)
+        print(f"{relpath} -> {new_relpath}")
+        if args.dry_run:
+            continue
+
+        save_output(args.directory, filename, read_output_text(old_path),
+                    background=False, layout="sharded", compression=args.compression)
+
+        # Metadata written before the catalog returned absolute paths may hold the relative form
+        for stored in stored_files:
+            if os.path.abspath(stored) == os.path.abspath(old_path):
+                renamed_entries += meta.rename_file(stored, os.path.join(os.path.dirname(stored), new_relpath))
+
+        os.remove(old_path)
+        moved += 1
+
+    if args.dry_run:
+        print(f"{len(flat_files)} files would be moved.")
+    else:
+        print(f"Moved {moved} files ({args.compression}), updated {renamed_entries} metadata entries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,52 @@
 import sys
 import os
-import pickle
+import time
+import argparse
 
 # Ensure project root is in sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from app.services.embedding_store import store_embedding
+from app.services.embedding_store import check_index, get_store, store_embeddings_bulk
+from app.utils.output_catalog import get_output_catalog
 
 outputs_dir = "static/outputs"
-index_path = os.path.join(outputs_dir, "faiss.index")
-meta_path = os.path.join(outputs_dir, "faiss_meta.pkl")
 
-# Load existing embedded files if meta exists
-embedded_files = set()
-if os.path.exists(meta_path):
-    with open(meta_path, "rb") as f:
-        meta = pickle.load(f)
-        embedded_files = {entry["file"] for entry in meta}
+parser = argparse.ArgumentParser(description="Embed the output files that are not in the index yet.")
+parser.add_argument("--prune", action="store_true",
+                    help="First remove vectors of deleted files and entries the index and metadata disagree on")
+parser.add_argument("--reembed", action="store_true",
+                    help="Re-embed every file, replacing its stored vectors (instead of deleting the index by hand)")
+args = parser.parse_args()
 
-# Step 1: Remove existing embeddings index and meta files (optional, comment out if you want to keep old embeddings)
-# if os.path.exists(index_path):
-#     os.remove(index_path)
-#     print("Deleted existing faiss.index")
-# if os.path.exists(meta_path):
-#     os.remove(meta_path)
-#     print("Deleted existing faiss_meta.pkl")
+# Step 1: Optionally repair the store (replaces deleting faiss.index and the metadata by hand)
+if args.prune and get_store().exists():
+    report = check_index(fix=True, outputs_dir=outputs_dir)
+    print(f"Pruned: {report['fixed']}")
 
-# Step 2: Embed only new .txt files not already embedded
-for filename in os.listdir(outputs_dir):
-    if filename.endswith(".txt"):
-        file_path = os.path.join(outputs_dir, filename)
-        if file_path in embedded_files:
-            print(f"Already embedded: {file_path}")
-            continue
-        # Extract topic from filename (remove extension and timestamp if present)
-        topic = filename.rsplit("_", 1)[0].replace("_", " ")
-        print(f"Embedding for topic: {topic}")
-        try:
-            result = store_embedding(topic)
-            print(f"Success: {result}")
-        except Exception as e:
-            print(f"Failed for {filename}: {e}")
\ No newline at end of file
+# Load existing embedded files from the metadata store
+embedded_files = set(get_store().meta.files())
+
+# Step 2: Collect the .txt files not already embedded (all of them with --reembed)
+new_files = []
+for relpath in get_output_catalog(outputs_dir).files():
+    file_path = os.path.join(outputs_dir, relpath).replace("\\", "/")
+    if file_path in embedded_files and not args.reembed:
+        print(f"Already embedded: {file_path}")
+        continue
+    new_files.append(file_path)
+
+# Step 3: Embed them in token-budgeted batches and write the index once
+if new_files:
+    print(f"Embedding {len(new_files)} new files...")
+    start = time.perf_counter()
+    result = store_embeddings_bulk(new_files, force=args.reembed)
+    elapsed = time.perf_counter() - start
+    if "error" in result:
+        print(f"Failed: {result['error']}")
+    else:
+        print(f"Stored {result['chunks']} chunks from {result['stored']} files in {elapsed:.2f}s, index size: {result['index_size']}")
+    for skipped in result.get("skipped", []):
+        print(f"Skipped {skipped['file']}: {skipped['reason']} of {skipped['duplicate_of']}")
+    for err in result.get("errors", []):
+        print(f"Failed for {err['file']}: {err['error']}")
+else:
+    print("Nothing new to embed.")
@@ -0,0 +1,39 @@
+# === File: tests/conftest.py ===
+# Shared fixtures: every test works on temporary files, no OpenAI calls are made
+
+import os
+import sys
+
+# Settings are read at import time; set them before the app modules are imported
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("FAISS_WAL_FSYNC", "0")
+os.environ.setdefault("JOB_WORKERS", "0")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from app.services.index_manager import IndexManager
+
+DIM = 16
+
+
+def random_vectors(n, seed=0):
+    return np.random.default_rng(seed).random((n, DIM), dtype=np.float32)
+
+
+def entries(n, prefix="doc"):
+    return [{"topic": f"{prefix} {i}", "file": f"static/outputs/{prefix}_{i}.txt"} for i in range(n)]
+
+
+@pytest.fixture
+def index_paths(tmp_path):
+    """(index_path, meta_path) of an empty store in a temporary directory."""
+    return str(tmp_path / "faiss.index"), str(tmp_path / "faiss_meta.sqlite3")
+
+
+@pytest.fixture
+def make_manager(index_paths):
+    """Builds IndexManager instances over the same files (one per simulated worker)."""
+    return lambda: IndexManager(*index_paths)
@@ -0,0 +1,108 @@
+# === File: tests/test_answer_cache.py ===
+# SemanticAnswerCache: similarity threshold, kinds and invalidation
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.services import answer_cache
+from app.services.answer_cache import SemanticAnswerCache
+
+DIM = 8
+
+
+def _embedding(seed, noise=0.0):
+    rng = np.random.default_rng(seed)
+    vector = rng.normal(size=DIM)
+    if noise:
+        vector = vector + np.random.default_rng(seed + 1000).normal(scale=noise, size=DIM)
+    return vector.astype("float32")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticAnswerCache(str(tmp_path / "answers.sqlite3"), threshold=0.95, ttl=3600, max_entries=100)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "Home_Insurance_20250101_120000.txt"
+    path.write_text("home insurance article")
+    return str(path)
+
+
+def test_similar_query_of_same_kind_hits(cache, source):
+    cache.store("classic", "what is home insurance", _embedding(1), "answer", [source], "v1")
+    hit = cache.lookup("classic", _embedding(1, noise=0.01), "v1")
+    assert hit["answer"] == "answer" and hit["files"] == [source]
+    assert hit["similarity"] >= 0.95
+    assert cache.lookup("agentic", _embedding(1), "v1") is None
+    assert cache.lookup("classic", _embedding(2), "v1") is None
+
+
+def test_index_version_change_invalidates(cache, source):
+    cache.store("classic", "q", _embedding(1), "answer", [source], "v1")
+    assert cache.lookup("classic", _embedding(1), "v2") is None
+    assert cache.invalidations == 1
+    # The invalid entry was deleted, not just skipped
+    assert cache.lookup("classic", _embedding(1), "v1") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_source_file_change_invalidates(cache, source):
+    cache.store("classic", "q", _embedding(1), "answer", [source], "v1")
+    with open(source, "a") as f:
+        f.write(" updated")
+    assert cache.lookup("classic", _embedding(1), "v1") is None
+    assert cache.invalidations == 1
+
+
+def test_removed_source_file_invalidates(cache, source):
+    cache.store("classic", "q", _embedding(1), "answer", [source], "v1")
+    os.remove(source)
+    assert cache.lookup("classic", _embedding(1), "v1") is None
+
+
+def test_expired_entries_invalidate(cache, source, monkeypatch):
+    cache.store("classic", "q", _embedding(1), "answer", [source], "v1")
+    later = time.time() + 3601
+    monkeypatch.setattr(answer_cache.time, "time", lambda: later)
+    assert cache.lookup("classic", _embedding(1), "v1") is None
+
+
+def test_missing_source_file_is_not_cached(cache, tmp_path):
+    cache.store("classic", "q", _embedding(1), "answer", [str(tmp_path / "missing.txt")], "v1")
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_from_other_workers_are_seen(cache, source, tmp_path):
+    other = SemanticAnswerCache(cache.path, threshold=0.95, ttl=3600, max_entries=100)
+    assert other.lookup("classic", _embedding(1), "v1") is None
+    cache.store("classic", "q", _embedding(1), "answer", [source], "v1")
+    assert other.lookup("classic", _embedding(1), "v1")["answer"] == "answer"
+
+
+def test_store_answer_skips_failed_answers(cache, source, monkeypatch):
+    monkeypatch.setattr(answer_cache, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(answer_cache, "_index_version", lambda: "v1")
+    answer_cache.store_answer("classic", "q", _embedding(1), "Exception: timeout", [source])
+    answer_cache.store_answer("classic", "q", None, "answer", [source])
+    assert cache.stats()["entries"] == 0
+    answer_cache.store_answer("classic", "q", _embedding(1), "answer", [source])
+    assert cache.stats()["entries"] == 1
+
+
+def test_write_to_the_embeddings_index_invalidates(cache, source, make_manager, monkeypatch):
+    from tests.conftest import entries, random_vectors
+    store = make_manager()
+    store.add(random_vectors(3), entries(3))
+    monkeypatch.setattr(answer_cache, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(answer_cache, "get_store", lambda: store)
+
+    answer_cache.store_answer("classic", "q", _embedding(1), "answer", [source])
+    assert answer_cache._lookup(cache, "classic", "q", _embedding(1))["answer"] == "answer"
+    # Another worker adds vectors: the WAL position, and so the index version, changes
+    make_manager().add(random_vectors(1, seed=9), entries(1, "new"))
+    assert answer_cache._lookup(cache, "classic", "q", _embedding(1)) is None
@@ -0,0 +1,89 @@
+# === File: tests/test_artifacts.py ===
+# parse_range: single byte ranges against the file size
+
+import pytest
+
+from app.utils.artifacts import parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-200", (90, 99)),  # end clamped to the file
+    ("bytes=-10", (90, 99)),  # suffix range
+    ("bytes=-500", (0, 99)),
+    (" bytes=5-5 ", (5, 5)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "bytes=-",
+    "bytes=9-3",  # last before first: invalid, ignored
+    "bytes=0-1,5-6",  # multiple ranges: full response
+    "items=0-5",
+    "bytes=abc",
+])
+def test_ignored_ranges(header):
+    assert parse_range(header, 100) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-160", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    assert parse_range(header, 100) == "unsatisfiable"
+
+
+def test_empty_file():
+    assert parse_range("bytes=0-", 0) == "unsatisfiable"
+
+
+# --- serve_artifact through the /static route ---
+
+@pytest.fixture
+def static_client(tmp_path, monkeypatch):
+    from starlette.applications import Starlette
+    from starlette.testclient import TestClient
+    from app.routes import async_routes
+
+    static_root = tmp_path / "static"
+    (static_root / "outputs").mkdir(parents=True)
+    (static_root / "style.css").write_text("body { color: black; }\n" * 10)
+    (static_root / "outputs" / "Home_Insurance_20250101_120000.txt").write_text("article text " * 20)
+    monkeypatch.setattr(async_routes, "STATIC_ROOT", str(static_root))
+    monkeypatch.setattr(async_routes, "OUTPUTS_ROOT", str(static_root / "outputs"))
+    return TestClient(Starlette(routes=async_routes.routes))
+
+
+@pytest.mark.parametrize("path", ["/static/outputs", "/static/outputs/", "/static/missing.css", "/static/../secret"])
+def test_static_directories_and_missing_files_are_404(static_client, path):
+    assert static_client.get(path).status_code == 404
+
+
+def test_static_file_cache_headers(static_client):
+    asset = static_client.get("/static/style.css")
+    assert asset.status_code == 200
+    assert asset.headers["cache-control"].startswith("public, max-age=")
+    output = static_client.get("/static/outputs/Home_Insurance_20250101_120000.txt")
+    assert output.status_code == 200
+    assert output.headers["cache-control"] == "no-cache"
+
+
+def test_static_range_and_etag(static_client):
+    full = static_client.get("/static/style.css")
+    etag = full.headers["etag"]
+    assert static_client.get("/static/style.css", headers={"If-None-Match": etag}).status_code == 304
+
+    partial = static_client.get("/static/style.css", headers={"Range": "bytes=0-3"})
+    assert partial.status_code == 206
+    assert partial.content == b"body"
+    assert partial.headers["content-range"] == f"bytes 0-3/{len(full.content)}"
+
+    # A stale If-Range validator gets the whole file
+    stale = static_client.get("/static/style.css", headers={"Range": "bytes=0-3", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == full.content
+
+    past_end = static_client.get("/static/style.css", headers={"Range": "bytes=9999-"})
+    assert past_end.status_code == 416
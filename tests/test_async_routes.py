@@ -0,0 +1,64 @@
+# === File: tests/test_async_routes.py ===
+# Native async routes: background submission and the content generator page
+
+import pytest
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from app.routes import async_routes
+
+REJECTED = {"error": "Unknown job kind 'x'"}
+
+
+@pytest.fixture
+def client():
+    return TestClient(Starlette(routes=async_routes.routes))
+
+
+@pytest.fixture
+def rejected_jobs(monkeypatch):
+    monkeypatch.setattr(async_routes, "submit_job", lambda kind, payload: REJECTED)
+
+
+@pytest.fixture
+def accepted_jobs(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(async_routes, "submit_job", lambda kind, payload: submitted.append(kind) or "job-1")
+    return submitted
+
+
+@pytest.mark.parametrize("method, path, kwargs", [
+    ("post", "/run-agent?async=1", {"json": {"input": {"topic": "Home"}}}),
+    ("post", "/content-generator?async=1", {"data": {"topic": "Home"}}),
+    ("post", "/marketing-post?async=1", {"data": {"topic": "Home"}}),
+])
+def test_rejected_submission_is_400(client, rejected_jobs, method, path, kwargs):
+    response = getattr(client, method)(path, **kwargs)
+    assert response.status_code == 400
+    assert response.json() == REJECTED
+
+
+def test_accepted_submission_is_202(client, accepted_jobs):
+    response = client.post("/run-agent", json={"async": True, "input": {"topic": "Home"}})
+    assert response.status_code == 202
+    assert response.json()["job_id"] == "job-1"
+    assert accepted_jobs == ["seo_article"]
+
+
+def test_rejected_reindex_is_400(monkeypatch):
+    from app.main import app
+    from app.routes import embeddings
+    monkeypatch.setattr(embeddings, "submit_job", lambda kind, payload: REJECTED)
+    response = app.test_client().post("/embeddings/rebuild", json={"kind": "flat"})
+    assert response.status_code == 400
+    assert response.get_json() == REJECTED
+
+
+def test_classic_content_generator_renders_generated_content(client, monkeypatch):
+    async def fake_agent(payload):
+        return {"content": "Cover for [Company Name] clients", "download_url": "/download/home.txt"}
+    monkeypatch.setattr(async_routes, "run_seo_agent_async", fake_agent)
+    response = client.post("/content-generator", data={"topic": "Home"})
+    assert response.status_code == 200
+    assert "Cover for WB White Insurance clients" in response.text
+    assert "/download/home.txt" in response.text
@@ -0,0 +1,88 @@
+# === File: tests/test_dedup.py ===
+# dedup.classify: versions, exact and near duplicates
+
+from app.services.dedup import fingerprint, classify
+
+TEXT = " ".join(f"word{i}" for i in range(400))
+
+
+def _doc(name, text=TEXT):
+    return fingerprint(f"static/outputs/{name}", text)
+
+
+def _known(*docs):
+    return {doc["file"]: doc for doc in docs}
+
+
+def test_new_file():
+    decision = classify(_doc("Home_Insurance_20250101_120000.txt"), {})
+    assert decision["action"] == "new"
+    assert decision["supersedes"] == [] and not decision["stale"]
+
+
+def test_same_file_same_content_is_unchanged():
+    doc = _doc("Home_Insurance_20250101_120000.txt")
+    decision = classify(doc, _known(doc))
+    assert decision["action"] == "unchanged"
+    assert not decision["stale"]
+
+
+def test_same_file_new_content_is_changed():
+    old = _doc("Home_Insurance_20250101_120000.txt")
+    new = _doc("Home_Insurance_20250101_120000.txt", TEXT + " extra words at the end")
+    decision = classify(new, _known(old))
+    assert decision["action"] == "changed"
+    assert decision["stale"]
+
+
+def test_same_content_under_another_topic_is_duplicate():
+    stored = _doc("Home_Insurance_20250101_120000.txt")
+    decision = classify(_doc("Condo_Insurance_20250102_120000.txt"), _known(stored))
+    assert decision["action"] == "duplicate"
+    assert decision["duplicate_of"] == stored["file"]
+
+
+def test_formatting_changes_do_not_count():
+    stored = _doc("Home_Insurance_20250101_120000.txt")
+    doc = _doc("Condo_Insurance_20250102_120000.txt", "  " + TEXT.upper().replace(" ", "\n"))
+    assert classify(doc, _known(stored))["action"] == "duplicate"
+
+
+def test_small_edit_is_near_duplicate():
+    stored = _doc("Home_Insurance_20250101_120000.txt")
+    edited = TEXT.replace("word200", "changed")
+    decision = classify(_doc("Condo_Insurance_20250102_120000.txt", edited), _known(stored))
+    assert decision["action"] == "near_duplicate"
+    assert decision["duplicate_of"] == stored["file"]
+    assert decision["similarity"] >= 0.9
+
+
+def test_unrelated_text_is_new():
+    stored = _doc("Home_Insurance_20250101_120000.txt")
+    other = " ".join(f"term{i}" for i in range(400))
+    assert classify(_doc("Condo_Insurance_20250102_120000.txt", other), _known(stored))["action"] == "new"
+
+
+def test_newer_version_supersedes_older():
+    older = _doc("Home_Insurance_20250101_120000.txt")
+    newer = _doc("Home_Insurance_20250301_120000.txt", TEXT.replace("word10", "updated"))
+    decision = classify(newer, _known(older))
+    assert decision["action"] == "new"
+    assert decision["supersedes"] == [older["file"]]
+
+
+def test_older_version_is_superseded():
+    newer = _doc("Home_Insurance_20250301_120000.txt")
+    older = _doc("Home_Insurance_20250101_120000.txt", "different older text")
+    decision = classify(older, _known(newer))
+    assert decision["action"] == "superseded"
+    assert decision["duplicate_of"] == newer["file"]
+    assert not decision["stale"]
+
+
+def test_stored_older_version_is_superseded_and_stale():
+    older = _doc("Home_Insurance_20250101_120000.txt")
+    newer = _doc("Home_Insurance_20250301_120000.txt", "newer text")
+    decision = classify(older, _known(older, newer))
+    assert decision["action"] == "superseded"
+    assert decision["stale"]
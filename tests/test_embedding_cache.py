@@ -0,0 +1,80 @@
+# === File: tests/test_embedding_cache.py ===
+# EmbeddingCache: hits, eviction by last use across workers, slot reuse
+
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache, cache_key
+
+DIM = 4
+
+
+def _key(i):
+    return cache_key("test-model", f"text {i}")
+
+
+def _vector(i):
+    return np.full((1, DIM), i, dtype="float32")
+
+
+def _put(cache, i):
+    cache.put_many([_key(i)], _vector(i))
+
+
+def test_hits_and_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), capacity=4)
+    assert cache.get_many([_key(1)]) == [None]
+    _put(cache, 1)
+    hit, miss = cache.get_many([_key(1), _key(2)])
+    np.testing.assert_array_equal(hit, _vector(1)[0])
+    assert miss is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_full_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), capacity=3)
+    for i in range(3):
+        _put(cache, i)
+    cache.get_many([_key(0)])  # 1 is now the least recently used
+    _put(cache, 3)
+    found = cache.get_many([_key(i) for i in range(4)])
+    assert [f is not None for f in found] == [True, False, True, True]
+    assert cache.stats()["entries"] == 3
+
+
+def test_recency_is_shared_between_workers(tmp_path):
+    reader = EmbeddingCache(str(tmp_path), capacity=3)
+    writer = EmbeddingCache(str(tmp_path), capacity=3)
+    for i in range(3):
+        _put(writer, i)
+    # Another worker's hit protects the entry from this worker's eviction
+    reader.get_many([_key(0)])
+    _put(writer, 3)
+    assert writer.get_many([_key(0)])[0] is not None
+    assert writer.get_many([_key(1)])[0] is None
+
+
+def test_reused_slot_is_a_miss_for_the_old_key(tmp_path):
+    reader = EmbeddingCache(str(tmp_path), capacity=1)
+    writer = EmbeddingCache(str(tmp_path), capacity=1)
+    _put(writer, 1)
+    np.testing.assert_array_equal(reader.get_many([_key(1)])[0], _vector(1)[0])
+    _put(writer, 2)  # reuses the only slot
+    old, new = reader.get_many([_key(1), _key(2)])
+    assert old is None
+    np.testing.assert_array_equal(new, _vector(2)[0])
+
+
+def test_storing_an_existing_key_updates_it_in_place(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), capacity=2)
+    _put(cache, 1)
+    cache.put_many([_key(1)], _vector(7))
+    _put(cache, 2)
+    assert cache.stats()["entries"] == 2
+    np.testing.assert_array_equal(cache.get_many([_key(1)])[0], _vector(7)[0])
+
+
+def test_cache_survives_reopening(tmp_path):
+    _put(EmbeddingCache(str(tmp_path), capacity=2), 5)
+    reopened = EmbeddingCache(str(tmp_path), capacity=99)
+    np.testing.assert_array_equal(reopened.get_many([_key(5)])[0], _vector(5)[0])
+    assert reopened.capacity == 2
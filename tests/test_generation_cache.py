@@ -0,0 +1,98 @@
+# === File: tests/test_generation_cache.py ===
+# Generation cache: keys, TTL, LRU bound and the per-request bypass
+
+import os
+import time
+
+import pytest
+
+from app.services import generation_cache, seo_generator
+from app.services.generation_cache import GenerationCache, make_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GenerationCache(str(tmp_path), ttl=60, max_entries=3)
+
+
+@pytest.fixture
+def enabled_cache(cache, monkeypatch):
+    monkeypatch.setattr(generation_cache, "GENERATION_CACHE_ENABLED", True)
+    monkeypatch.setattr(generation_cache, "_cache", cache)
+    return cache
+
+
+def test_key_ignores_whitespace_and_case_but_not_parameters():
+    key = make_key("seo", "Write about  Home\nInsurance", model="m", temperature=0.7)
+    assert key == make_key("seo", "write about home insurance ", model="m", temperature=0.7)
+    assert key != make_key("seo", "write about home insurance", model="m", temperature=0.2)
+    assert key != make_key("marketing", "write about home insurance", model="m", temperature=0.7)
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    cache.set("k", {"content": "article"})
+    assert cache.get("k") == {"content": "article"}
+    later = time.time() + 61
+    monkeypatch.setattr(generation_cache.time, "time", lambda: later)
+    assert cache.get("k") is None
+    assert not os.path.exists(os.path.join(cache.directory, "k.json"))
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for i, key in enumerate("abc"):
+        cache.set(key, i)
+        os.utime(os.path.join(cache.directory, f"{key}.json"), (1000 + i, 1000 + i))
+    cache.get("a")  # touches a: b is now the oldest
+    cache.set("d", 3)
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == [0, 2, 3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_is_skipped(monkeypatch):
+    monkeypatch.setattr(generation_cache, "GENERATION_CACHE_ENABLED", False)
+    generation_cache.cached_store("k", 1)
+    assert generation_cache.cached_lookup("k") is None
+    assert generation_cache.cache_stats() == {"enabled": False}
+
+
+def test_bypass_skips_the_lookup_but_stores(enabled_cache):
+    generation_cache.cached_store("k", "old")
+    assert generation_cache.cached_lookup("k", bypass=True) is None
+    assert generation_cache.cached_lookup("k") == "old"
+
+
+def test_seo_agent_hit_and_no_cache(enabled_cache, monkeypatch):
+    calls = []
+
+    def fake_generate(prompt):
+        calls.append(prompt)
+        return f"article {len(calls)}"
+
+    monkeypatch.setattr(seo_generator, "generate_content", fake_generate)
+    monkeypatch.setattr(
+        seo_generator, "save_seo_output",
+        lambda payload, prompt, topic, context, output: {"content": output, "download_url": "/download/x.txt"}
+    )
+    payload = {"input": {"topic": "Home Insurance"}}
+
+    first = seo_generator.run_seo_agent(payload)
+    again = seo_generator.run_seo_agent(payload)
+    assert len(calls) == 1
+    assert again == {**first, "cached": True}
+
+    fresh = seo_generator.run_seo_agent({**payload, "no_cache": True})
+    assert len(calls) == 2 and fresh["content"] == "article 2"
+    # The fresh result replaced the cached one
+    assert seo_generator.run_seo_agent(payload)["content"] == "article 2"
+
+
+def test_failed_generation_is_not_cached(enabled_cache, monkeypatch):
+    monkeypatch.setattr(seo_generator, "generate_content", lambda prompt: None)
+    monkeypatch.setattr(
+        seo_generator, "save_seo_output",
+        lambda payload, prompt, topic, context, output: {"content": output, "download_url": "/download/x.txt"}
+    )
+    seo_generator.run_seo_agent({"input": {"topic": "Condo"}})
+    assert enabled_cache.stats()["stores"] == 0
@@ -0,0 +1,104 @@
+# === File: tests/test_index_manager.py ===
+# IndexManager: compaction under concurrent readers, removal and hidden ids
+
+import threading
+
+import numpy as np
+import pytest
+
+from app.services import ann_index
+from tests.conftest import entries, random_vectors
+
+
+def _top_ids(manager, vectors, k):
+    _, I, _ = manager.search(vectors, k)
+    return I
+
+
+def test_compaction_while_another_instance_reads(make_manager):
+    writer = make_manager()
+    reader = make_manager()
+    writer.add(random_vectors(8, seed=0), entries(8))
+    errors = []
+    searches = []
+    stop = threading.Event()
+
+    def read():
+        queries = random_vectors(4, seed=99)
+        while not stop.is_set():
+            try:
+                D, I, meta = reader.search(queries, 3)
+                # Metadata goes first on remove, so only removed ids (0-9) may lack it
+                assert all(i in meta or i < 10 for i in I.ravel().tolist() if i >= 0)
+                searches.append(1)
+            except Exception as e:  # surfaced in the main thread
+                errors.append(e)
+                return
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    try:
+        for round_ in range(10):
+            writer.add(random_vectors(5, seed=round_ + 1), entries(5, f"r{round_}"))
+            writer.remove([round_])
+            writer.compact()
+    finally:
+        stop.set()
+        thread.join()
+
+    assert not errors
+    assert searches
+    assert reader.refresh()
+    assert reader.version == writer.version
+    assert reader.live_ids().tolist() == writer.live_ids().tolist()
+    assert reader.ntotal == 8 + 50 - 10
+
+
+def test_removed_ids_stay_gone_after_compaction(make_manager):
+    writer = make_manager()
+    vectors = random_vectors(10, seed=3)
+    writer.add(vectors, entries(10))
+    writer.remove([2, 5])
+    writer.compact()
+
+    reader = make_manager()
+    assert reader.refresh()
+    assert 2 not in reader.live_ids() and 5 not in reader.live_ids()
+    assert reader.ntotal == 8
+    assert not {2, 5} & set(_top_ids(reader, vectors[[2, 5]], 8).ravel().tolist())
+    assert reader.meta.get([2, 5]) == {}
+    # Ids are never reused
+    writer.add(random_vectors(1, seed=4), entries(1, "new"))
+    assert writer.live_ids().tolist()[-1] == 10
+
+
+@pytest.fixture
+def hnsw_only(monkeypatch):
+    monkeypatch.setattr(ann_index, "INDEX_TYPE", "hnsw")
+
+
+def test_hnsw_hides_removed_ids_until_compaction(make_manager, hnsw_only):
+    writer = make_manager()
+    vectors = random_vectors(20, seed=5)
+    writer.add(vectors, entries(20))
+    assert writer.kind == "hnsw"
+    writer.remove([3])
+
+    reader = make_manager()
+    assert reader.refresh()
+    # HNSW cannot remove in place: id 3 is still in the index but filtered out
+    assert reader.removed_rows == 1
+    assert reader.ntotal == 19
+    top = _top_ids(reader, vectors[3:4], 5)
+    assert 3 not in top.ravel().tolist()
+    assert len(top[0]) == 5
+
+    writer.compact()
+    assert reader.refresh()
+    assert reader.removed_rows == 0
+    assert reader.kind == "hnsw"
+    assert reader.ntotal == 19
+    assert 3 not in reader.live_ids()
+    assert 3 not in _top_ids(reader, vectors[3:4], 19).ravel().tolist()
+    # The rebuilt index keeps the surviving ids
+    np.testing.assert_array_equal(reader.live_ids(), np.delete(np.arange(20), 3))
@@ -0,0 +1,121 @@
+# === File: tests/test_job_queue.py ===
+# JobQueue: claims, lease expiry and retries
+
+import pytest
+
+from app.services import job_queue
+from app.services.job_queue import JobPayloadError, JobQueue, JobWorkerPool
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def expired_leases(monkeypatch):
+    """Every claim gets a lease that has already run out."""
+    monkeypatch.setattr(job_queue, "JOB_LEASE_SECONDS", -1)
+
+
+def test_claim_takes_oldest_and_leases_it(queue):
+    first = queue.submit("x", {"n": 1})
+    queue.submit("x", {"n": 2})
+    job_id, kind, payload = queue.claim("worker-a")
+    assert (job_id, kind, payload) == (first, "x", {"n": 1})
+    job = queue.get(first)
+    assert job["status"] == "running" and job["attempts"] == 1
+    # The leased job is not handed out again
+    assert queue.claim("worker-b")[0] != first
+
+
+def test_claim_returns_none_when_empty(queue):
+    assert queue.claim("worker-a") is None
+
+
+def test_expired_lease_is_claimed_again(queue, expired_leases):
+    job_id = queue.submit("x", {})
+    assert queue.claim("worker-a")[0] == job_id
+    assert queue.claim("worker-b")[0] == job_id
+    assert queue.get(job_id)["attempts"] == 2
+
+
+def test_expired_lease_without_attempts_left_fails(queue, expired_leases, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 2)
+    job_id = queue.submit("x", {})
+    queue.claim("worker-a")
+    queue.claim("worker-b")
+    # Both attempts were lost with their workers: no third claim
+    assert queue.claim("worker-c") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert "Lease expired" in job["error"] and job["finished_at"] is not None
+
+
+def test_stale_worker_cannot_complete_or_fail(queue, expired_leases):
+    job_id = queue.submit("x", {})
+    queue.claim("worker-a")
+    queue.claim("worker-b")
+    assert not queue.complete(job_id, "worker-a", {"late": True})
+    assert not queue.fail(job_id, "worker-a", "late")
+    assert queue.get(job_id)["status"] == "running"
+    assert queue.complete(job_id, "worker-b", {"ok": True})
+    job = queue.get(job_id)
+    assert job["status"] == "succeeded" and job["finished_at"] is not None
+
+
+def test_fail_requeues_until_attempts_run_out(queue, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 2)
+    job_id = queue.submit("x", {})
+    queue.claim("worker-a")
+    assert queue.fail(job_id, "worker-a", "first")
+    job = queue.get(job_id)
+    assert job["status"] == "queued" and job["finished_at"] is None and job["error"] == "first"
+
+    assert queue.claim("worker-b")[0] == job_id
+    assert queue.fail(job_id, "worker-b", "second")
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["finished_at"] is not None
+    assert queue.claim("worker-c") is None
+
+
+def test_heartbeat_extends_only_own_lease(queue):
+    job_id = queue.submit("x", {})
+    queue.claim("worker-a")
+    queue.heartbeat(job_id, "worker-a", {"step": 1})
+    queue.heartbeat(job_id, "worker-b", {"step": 99})
+    assert queue.get(job_id)["progress"] == {"step": 1}
+
+
+def test_fail_without_retry_is_final(queue):
+    job_id = queue.submit("x", {})
+    queue.claim("worker-a")
+    assert queue.fail(job_id, "worker-a", "bad payload", retry=False)
+    assert queue.get(job_id)["status"] == "failed"
+    assert queue.claim("worker-b") is None
+
+
+def _run(queue, handler):
+    pool = JobWorkerPool(queue, size=0, handlers={"x": handler})
+    job_id = queue.submit("x", {})
+    assert pool.run_one("worker-a")
+    return queue.get(job_id)
+
+
+def test_payload_errors_are_not_retried(queue):
+    def handler(payload):
+        raise JobPayloadError("Missing topic")
+    job = _run(queue, handler)
+    assert job["status"] == "failed" and job["attempts"] == 1 and job["error"] == "Missing topic"
+
+
+def test_other_errors_are_retried(queue):
+    def handler(payload):
+        raise RuntimeError("API timeout")
+    job = _run(queue, handler)
+    assert job["status"] == "queued" and job["finished_at"] is None
+
+
+def test_successful_job_stores_result(queue):
+    job = _run(queue, lambda payload: {"ok": True})
+    assert job["status"] == "succeeded" and job["result"] == {"ok": True}
@@ -0,0 +1,50 @@
+# === File: tests/test_output_catalog.py ===
+# OutputCatalog: path form, version ordering and the cross-worker journal
+
+import os
+
+from app.utils.output_catalog import OutputCatalog, get_output_catalog, journal_written
+
+
+def _write(directory, name, text="article", mtime=None):
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_paths_are_absolute_whichever_form_created_the_catalog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write("outputs", "Home_Insurance_20250101_120000.txt")
+    relative = get_output_catalog("outputs")
+    assert get_output_catalog(str(tmp_path / "outputs")) is relative
+    expected = str(tmp_path / "outputs" / "Home_Insurance_20250101_120000.txt")
+    assert relative.resolve("Home_Insurance_20250101_120000.txt") == expected
+    assert relative.latest_for_topic("Home Insurance") == expected
+
+
+def test_latest_version_follows_the_filename_timestamp(tmp_path):
+    directory = str(tmp_path)
+    # The older generation was copied last, so it has the newer mtime
+    _write(directory, "Home_Insurance_20250301_120000.txt", mtime=1_000_000)
+    _write(directory, "Home_Insurance_20250101_120000.txt", mtime=2_000_000)
+    catalog = OutputCatalog(directory)
+    assert catalog.latest_for_topic("home insurance").endswith("Home_Insurance_20250301_120000.txt")
+
+
+def test_other_workers_files_are_read_from_the_journal(tmp_path):
+    directory = str(tmp_path)
+    reader = OutputCatalog(directory)
+    assert reader.files() == []
+    for name in ("Café_Insurance_20250101_120000.txt", "Condo_Insurance_20250102_120000.txt"):
+        journal_written(directory, _write(directory, os.path.join("2025", "01", "01", "ab", name)))
+    assert reader.resolve("Café_Insurance_20250101_120000.txt") == os.path.join(
+        directory, "2025", "01", "01", "ab", "Café_Insurance_20250101_120000.txt"
+    )
+    assert len(reader.files()) == 2
+    # The offset is a byte position: nothing is read twice or skipped after non-ASCII names
+    journal_written(directory, _write(directory, "Umbrella_Insurance_20250103_120000.txt"))
+    assert len(reader.files()) == 3
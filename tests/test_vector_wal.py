@@ -0,0 +1,74 @@
+# === File: tests/test_vector_wal.py ===
+# WAL replay: torn or corrupt tail records are ignored and cut off by the next writer
+
+import os
+
+import numpy as np
+
+from app.services import vector_wal
+from tests.conftest import DIM, entries, random_vectors
+
+
+def test_read_records_stops_at_truncated_tail(tmp_path):
+    path = str(tmp_path / "wal.log")
+    vector_wal.append_record(path, 0, random_vectors(3, seed=1))
+    first_end = os.path.getsize(path)
+    vector_wal.append_record(path, 3, random_vectors(2, seed=2))
+    vector_wal.truncate(path, os.path.getsize(path) - 5)
+
+    records, end = vector_wal.read_records(path)
+    assert [(op, base, len(data)) for op, base, data in records] == [("add", 0, 3)]
+    assert end == first_end
+
+
+def test_read_records_stops_at_bad_checksum(tmp_path):
+    path = str(tmp_path / "wal.log")
+    vector_wal.append_record(path, 0, random_vectors(3, seed=1))
+    first_end = os.path.getsize(path)
+    vector_wal.append_removal(path, [1])
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+    records, end = vector_wal.read_records(path)
+    assert len(records) == 1 and records[0][0] == "add"
+    assert end == first_end
+
+
+def test_replay_ignores_torn_tail_and_next_add_overwrites_it(make_manager):
+    writer = make_manager()
+    writer.add(random_vectors(4, seed=1), entries(4))  # snapshot
+    writer.add(random_vectors(2, seed=2), entries(2, "a"))  # WAL record, ids 4-5
+    writer.add(random_vectors(3, seed=3), entries(3, "b"))  # WAL record, ids 6-8
+    vector_wal.truncate(writer.wal_path, vector_wal.wal_size(writer.wal_path) - 7)
+
+    reader = make_manager()
+    assert reader.refresh()
+    assert reader.ntotal == 6
+    assert reader.live_ids().tolist() == list(range(6))
+
+    # A new writer cuts the torn record and continues from the last valid id
+    vectors = random_vectors(1, seed=4)
+    make_manager().add(vectors, entries(1, "c"))
+    assert reader.refresh()
+    assert reader.live_ids().tolist() == list(range(7))
+    D, I, meta = reader.search(vectors, 1)
+    assert I[0][0] == 6
+    assert meta[6]["topic"] == "c 0"
+    _, end = vector_wal.read_records(reader.wal_path)
+    assert end == vector_wal.wal_size(reader.wal_path)
+
+
+def test_replay_ignores_corrupt_record(make_manager):
+    writer = make_manager()
+    writer.add(random_vectors(4, seed=1), entries(4))
+    writer.add(random_vectors(2, seed=2), entries(2, "a"))
+    with open(writer.wal_path, "r+b") as f:
+        f.seek(vector_wal._HEADER.size + DIM * 4)  # inside the first vector payload
+        f.write(np.float32(123.0).tobytes())
+
+    reader = make_manager()
+    assert reader.refresh()
+    assert reader.ntotal == 4